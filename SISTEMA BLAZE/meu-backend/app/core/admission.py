@@ -0,0 +1,267 @@
+import asyncio
+import hmac
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from app.core.metrics import counter, gauge, histogram
+
+# Controle de admissão no próprio processo, antes de a rota rodar.
+#
+# Cada requisição cai numa classe de rota:
+#   ingest    POST /update_status (scraper): fila própria, sem limite de taxa
+#   analitico relatórios e consultas pesadas: poucas vagas e fila curta
+#   leitura   demais GETs públicos (/events/status, /origens...)
+#   padrao    resto (auth, apostas, carteira)
+#
+# Por classe: token bucket por cliente (rps/burst, 0 = sem limite) e um teto
+# de requisições simultâneas com fila limitada. Cheio -> 503 na hora, em vez
+# de empilhar threads; estourou a taxa -> 429. Com analíticos limitados a
+# poucas vagas, uma enxurrada de relatórios não toma o threadpool, o GIL e
+# o banco da ingestão ao vivo.
+#
+# Nos analíticos quem protege é o teto + fila, não a taxa por IP: um único
+# carregamento do painel dispara várias rotas analíticas de uma vez, e um
+# balde por IP pequeno devolvia 429 para o próprio painel. A taxa fica
+# desligada por padrão (ADMISSAO_ANALITICO_RPS para ligar).
+#
+# Cliente = IP do scope ASGI. Atrás de proxy (Render) o start.sh e o
+# Dockerfile sobem o uvicorn com --proxy-headers --forwarded-allow-ips='*'
+# para o IP real chegar aqui; sem isso todo mundo divide o balde do proxy.
+
+INGEST_TOKEN = os.getenv("INGEST_TOKEN") or None
+INGEST_HEADER = "x-ingest-token"
+ADMISSAO_ATIVA = os.getenv("ADMISSAO_ATIVA", "True") == "True"
+MAX_CLIENTES = int(os.getenv("ADMISSAO_MAX_CLIENTES", 10000))
+
+ROTAS_ANALITICAS = {
+    "/historico/filtrado",
+    "/estatisticas/por-horario",
+    "/analise/melhores-horarios",
+    "/relatorio/30-dias",
+    "/simulacao/estrategias",
+    "/horarios/otimizar",
+    "/analise/lote",
+}
+ROTAS_ISENTAS = ("/metrics", "/debug/")
+
+ADMISSION_REJECTED = counter(
+    "blaze_admission_rejected_total",
+    "Requisições recusadas pelo controle de admissão por classe e motivo",
+)
+ADMISSION_WAIT_SECONDS = histogram(
+    "blaze_admission_wait_seconds",
+    "Espera na fila da classe até ganhar vaga",
+)
+ADMISSION_IN_USE = gauge(
+    "blaze_admission_in_use",
+    "Vagas ocupadas por classe de rota",
+)
+
+
+@dataclass
+class ConfigClasse:
+    rps: float          # tokens por segundo por cliente (0 = sem limite de taxa)
+    burst: float        # tamanho do balde
+    concorrencia: int   # vagas simultâneas (0 = sem teto)
+    fila: int           # quantas podem esperar vaga
+    espera_seg: float   # tempo máximo na fila
+
+
+def _config(nome: str, rps: float, burst: float, concorrencia: int, fila: int, espera_seg: float) -> ConfigClasse:
+    prefixo = f"ADMISSAO_{nome.upper()}_"
+    return ConfigClasse(
+        rps=float(os.getenv(prefixo + "RPS", rps)),
+        burst=float(os.getenv(prefixo + "BURST", burst)),
+        concorrencia=int(os.getenv(prefixo + "CONCORRENCIA", concorrencia)),
+        fila=int(os.getenv(prefixo + "FILA", fila)),
+        espera_seg=float(os.getenv(prefixo + "ESPERA_SEG", espera_seg)),
+    )
+
+
+CLASSES: Dict[str, ConfigClasse] = {
+    "ingest": _config("ingest", rps=0, burst=0, concorrencia=8, fila=256, espera_seg=5),
+    "analitico": _config("analitico", rps=0, burst=0, concorrencia=2, fila=8, espera_seg=10),
+    "leitura": _config("leitura", rps=20, burst=40, concorrencia=64, fila=256, espera_seg=2),
+    "padrao": _config("padrao", rps=10, burst=20, concorrencia=0, fila=0, espera_seg=0),
+}
+
+
+def classificar(method: str, path: str) -> Optional[str]:
+    """Classe de admissão da requisição (None = isenta)."""
+    if path.startswith(ROTAS_ISENTAS):
+        return None
+    if path == "/update_status" and method == "POST":
+        return "ingest"
+    if path in ROTAS_ANALITICAS:
+        return "analitico"
+    if method in ("GET", "HEAD"):
+        return "leitura"
+    return "padrao"
+
+
+class TokenBuckets:
+    """Um balde por cliente (LRU limitado). Só o event loop mexe aqui: sem lock."""
+
+    def __init__(self, rps: float, burst: float, max_clientes: int = MAX_CLIENTES):
+        self.rps = rps
+        self.burst = max(burst, 1.0)
+        self.max_clientes = max_clientes
+        self._baldes: "OrderedDict[str, list]" = OrderedDict()
+
+    def consumir(self, cliente: str) -> float:
+        """0 se liberou; senão, segundos até o próximo token."""
+        agora = time.monotonic()
+        balde = self._baldes.get(cliente)
+        if balde is None:
+            balde = self._baldes[cliente] = [self.burst, agora]
+            if len(self._baldes) > self.max_clientes:
+                self._baldes.popitem(last=False)
+        else:
+            self._baldes.move_to_end(cliente)
+            balde[0] = min(self.burst, balde[0] + (agora - balde[1]) * self.rps)
+            balde[1] = agora
+
+        if balde[0] >= 1.0:
+            balde[0] -= 1.0
+            return 0.0
+        return (1.0 - balde[0]) / self.rps
+
+
+class Vagas:
+    """Semáforo com fila limitada e espera máxima."""
+
+    def __init__(self, limite: int, fila: int, espera_seg: float):
+        self.limite = limite
+        self.fila = fila
+        self.espera_seg = espera_seg
+        self.em_uso = 0
+        self.esperando = 0
+        self._sem: Optional[asyncio.Semaphore] = None
+
+    async def entrar(self) -> Optional[str]:
+        """None se ganhou vaga; senão o motivo da recusa."""
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.limite)
+
+        if self._sem.locked():
+            if self.esperando >= self.fila:
+                return "fila_cheia"
+            self.esperando += 1
+            try:
+                await asyncio.wait_for(self._sem.acquire(), self.espera_seg)
+            except asyncio.TimeoutError:
+                return "espera_esgotada"
+            finally:
+                self.esperando -= 1
+        else:
+            await self._sem.acquire()
+
+        self.em_uso += 1
+        return None
+
+    def sair(self) -> None:
+        self.em_uso -= 1
+        self._sem.release()
+
+
+class _Classe:
+    def __init__(self, nome: str, cfg: ConfigClasse):
+        self.nome = nome
+        self.cfg = cfg
+        self.baldes = TokenBuckets(cfg.rps, cfg.burst) if cfg.rps > 0 else None
+        self.vagas = Vagas(cfg.concorrencia, cfg.fila, cfg.espera_seg) if cfg.concorrencia > 0 else None
+
+
+_classes: Dict[str, _Classe] = {nome: _Classe(nome, cfg) for nome, cfg in CLASSES.items()}
+
+
+def estado_admissao() -> Dict[str, Any]:
+    return {
+        "ativa": ADMISSAO_ATIVA,
+        "ingest_token": INGEST_TOKEN is not None,
+        "classes": {
+            nome: {
+                "rps": c.cfg.rps,
+                "burst": c.cfg.burst,
+                "concorrencia": c.cfg.concorrencia,
+                "fila": c.cfg.fila,
+                "em_uso": c.vagas.em_uso if c.vagas else None,
+                "esperando": c.vagas.esperando if c.vagas else None,
+                "clientes": len(c.baldes._baldes) if c.baldes else None,
+            }
+            for nome, c in _classes.items()
+        },
+    }
+
+
+def _header(scope, nome: str) -> Optional[str]:
+    alvo = nome.encode("latin-1")
+    for k, v in scope.get("headers") or ():
+        if k == alvo:
+            return v.decode("latin-1")
+    return None
+
+
+async def _responder(send, status: int, detalhe: str, retry_after: Optional[float] = None) -> None:
+    corpo = json.dumps({"detail": detalhe}).encode("utf-8")
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(corpo)).encode())]
+    if retry_after is not None:
+        headers.append((b"retry-after", str(max(1, int(retry_after + 0.999))).encode()))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": corpo})
+
+
+class AdmissionMiddleware:
+    """Middleware ASGI: token bucket por cliente + vagas por classe de rota."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ADMISSAO_ATIVA:
+            await self.app(scope, receive, send)
+            return
+
+        nome = classificar(scope.get("method", "GET"), scope.get("path", ""))
+        if nome is None:
+            await self.app(scope, receive, send)
+            return
+
+        if nome == "ingest" and INGEST_TOKEN is not None:
+            token = _header(scope, INGEST_HEADER) or ""
+            if not hmac.compare_digest(token, INGEST_TOKEN):
+                ADMISSION_REJECTED.inc(classe=nome, motivo="token")
+                await _responder(send, 401, "X-Ingest-Token inválido")
+                return
+
+        classe = _classes[nome]
+        if classe.baldes is not None:
+            cliente = (scope.get("client") or ("?", 0))[0]
+            espera = classe.baldes.consumir(cliente)
+            if espera > 0:
+                ADMISSION_REJECTED.inc(classe=nome, motivo="taxa")
+                await _responder(send, 429, "Muitas requisições, tente novamente em instantes", espera)
+                return
+
+        if classe.vagas is None:
+            await self.app(scope, receive, send)
+            return
+
+        t0 = time.perf_counter()
+        motivo = await classe.vagas.entrar()
+        if motivo is not None:
+            ADMISSION_REJECTED.inc(classe=nome, motivo=motivo)
+            await _responder(send, 503, "Servidor ocupado, tente novamente em instantes", classe.cfg.espera_seg)
+            return
+
+        ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - t0, classe=nome)
+        ADMISSION_IN_USE.inc(classe=nome)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            classe.vagas.sair()
+            ADMISSION_IN_USE.dec(classe=nome)
@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.models.user import User
+
+
+class TTLCache:
+    """LRU com expiração por entrada. Thread-safe (rotas sync rodam no threadpool)."""
+
+    def __init__(self, max_entries: int, ttl_sec: float):
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires <= now:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl_sec: Optional[float] = None) -> None:
+        ttl = self.ttl_sec if ttl_sec is None else min(ttl_sec, self.ttl_sec)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Snapshot do usuário autenticado (não é objeto ORM: pode sair da sessão e ir para o cache)."""
+    id: int
+    username: str
+    is_admin: bool
+
+
+# token -> user_id (claims já verificados; TTL nunca passa do exp do token)
+token_cache = TTLCache(settings.AUTH_CACHE_MAX_ENTRIES, settings.AUTH_CACHE_TTL_SEC)
+# user_id -> CurrentUser
+user_cache = TTLCache(settings.AUTH_CACHE_MAX_ENTRIES, settings.AUTH_CACHE_TTL_SEC)
+
+
+def cache_token(token: str, user_id: int, exp: Optional[float]) -> None:
+    ttl = None if exp is None else exp - time.time()
+    token_cache.set(token, user_id, ttl)
+
+
+def cached_user_id(token: str) -> Optional[int]:
+    return token_cache.get(token)
+
+
+def cache_user(user: User) -> CurrentUser:
+    current = CurrentUser(id=user.id, username=user.username, is_admin=bool(user.is_admin))
+    user_cache.set(user.id, current)
+    return current
+
+
+def cached_user(user_id: int) -> Optional[CurrentUser]:
+    return user_cache.get(user_id)
+
+
+def invalidate_user(user_id: int) -> None:
+    user_cache.pop(user_id)
+
+
+# qualquer alteração/remoção de User pela ORM derruba a entrada do cache
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_on_change(mapper, connection, target):
+    invalidate_user(target.id)
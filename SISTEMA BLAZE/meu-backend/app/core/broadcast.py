@@ -0,0 +1,136 @@
+import asyncio
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from app.core.metrics import counter, gauge
+
+# Push ao vivo por WebSocket. Cada conexão tem uma fila limitada e uma task
+# escritora: publicar só serializa a mensagem uma vez e faz put_nowait em
+# cada fila, então um cliente lento nunca segura o /update_status. Fila
+# cheia = cliente atrasado demais: a conexão é fechada e ele reconecta
+# recebendo o estado completo.
+
+WS_FILA_MAX = int(os.getenv("WS_FILA_MAX", 64))
+WS_ENVIO_TIMEOUT_SEC = float(os.getenv("WS_ENVIO_TIMEOUT_SEC", 10))
+
+WS_CONNECTIONS = gauge(
+    "blaze_ws_connections",
+    "Conexões WebSocket abertas por canal",
+)
+WS_MESSAGES = counter(
+    "blaze_ws_messages_total",
+    "Mensagens enfileiradas para clientes WebSocket por canal e resultado",
+)
+
+
+def serializar(mensagem: Any) -> str:
+    return json.dumps(mensagem, ensure_ascii=False, separators=(",", ":"))
+
+
+class Assinante:
+    def __init__(self, websocket, canal: str):
+        self.websocket = websocket
+        self.canal = canal
+        self.fila: "asyncio.Queue[str]" = asyncio.Queue(maxsize=WS_FILA_MAX)
+        self.escritor: Optional[asyncio.Task] = None
+
+    def enfileirar(self, texto: str) -> bool:
+        try:
+            self.fila.put_nowait(texto)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def escrever(self) -> None:
+        """Task escritora: drena a fila até a conexão cair ou a task ser cancelada."""
+        while True:
+            texto = await self.fila.get()
+            await asyncio.wait_for(self.websocket.send_text(texto), WS_ENVIO_TIMEOUT_SEC)
+
+    def derrubar(self) -> None:
+        if self.escritor is not None:
+            self.escritor.cancel()
+
+
+class Hub:
+    def __init__(self):
+        self._canais: Dict[str, Set[Assinante]] = {}
+
+    def entrar(self, assinante: Assinante) -> None:
+        self._canais.setdefault(assinante.canal, set()).add(assinante)
+        WS_CONNECTIONS.inc(canal=assinante.canal)
+
+    def sair(self, assinante: Assinante) -> None:
+        assinantes = self._canais.get(assinante.canal)
+        if assinantes and assinante in assinantes:
+            assinantes.discard(assinante)
+            WS_CONNECTIONS.dec(canal=assinante.canal)
+
+    def assinantes(self, canal: str) -> int:
+        return len(self._canais.get(canal) or ())
+
+    def publicar(self, canal: str, mensagem: Any) -> int:
+        """Enfileira para todos do canal; devolve quantos receberam. Só no event loop."""
+        assinantes = self._canais.get(canal)
+        if not assinantes:
+            return 0
+        return self.publicar_texto(canal, serializar(mensagem), assinantes)
+
+    def publicar_texto(self, canal: str, texto: str, assinantes) -> int:
+        entregues = 0
+        for assinante in list(assinantes):
+            if assinante.enfileirar(texto):
+                entregues += 1
+                continue
+            WS_MESSAGES.inc(canal=canal, resultado="descartada")
+            self.sair(assinante)
+            assinante.derrubar()
+        WS_MESSAGES.inc(entregues, canal=canal, resultado="enfileirada")
+        return entregues
+
+
+hub = Hub()
+
+
+async def atender(
+    websocket,
+    canal: Optional[str],
+    inicial: Any = None,
+    ao_receber: Optional[Callable[[Assinante, str], Awaitable[None]]] = None,
+    ao_sair: Optional[Callable[[Assinante], None]] = None,
+) -> None:
+    """
+    Mantém uma conexão já aceita até o cliente sair. Com `canal`, recebe o
+    que for publicado nele; `ao_receber` trata as mensagens do cliente (sem
+    ele, elas só servem de keep-alive).
+    """
+    assinante = Assinante(websocket, canal or "")
+    if inicial is not None:
+        assinante.enfileirar(serializar(inicial))
+    if canal:
+        hub.entrar(assinante)
+    escritor = assinante.escritor = asyncio.create_task(assinante.escrever())
+    leitor = asyncio.create_task(_ler_ate_fechar(websocket, assinante, ao_receber))
+    try:
+        await asyncio.wait({escritor, leitor}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        hub.sair(assinante)
+        if ao_sair is not None:
+            ao_sair(assinante)
+        for task in (escritor, leitor):
+            task.cancel()
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
+
+async def _ler_ate_fechar(websocket, assinante: Assinante, ao_receber) -> None:
+    try:
+        while True:
+            texto = await websocket.receive_text()
+            if ao_receber is not None:
+                await ao_receber(assinante, texto)
+    except Exception:
+        return
@@ -0,0 +1,138 @@
+import gzip
+import os
+from typing import List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.metrics import counter
+
+try:
+    import brotli
+except ImportError:  # opcional: sem o módulo, só gzip
+    brotli = None
+
+# Compressão negociada (Accept-Encoding) das respostas acima de um tamanho
+# mínimo. Prefere brotli quando o cliente aceita e o módulo está instalado.
+# Corpos grandes são comprimidos no threadpool (zlib/brotli soltam o GIL):
+# um histórico de vários MB não segura o event loop da ingestão.
+
+COMPRESSAO_MIN_BYTES = int(os.getenv("COMPRESSAO_MIN_BYTES", 1024))
+COMPRESSAO_GZIP_NIVEL = int(os.getenv("COMPRESSAO_GZIP_NIVEL", 6))
+COMPRESSAO_BROTLI_QUALIDADE = int(os.getenv("COMPRESSAO_BROTLI_QUALIDADE", 5))
+# acima disso a compressão vai para o threadpool
+COMPRESSAO_THREAD_BYTES = int(os.getenv("COMPRESSAO_THREAD_BYTES", 64 * 1024))
+
+TIPOS_COMPRESSIVEIS = (b"application/json", b"text/")
+
+RESPONSE_BYTES = counter(
+    "blaze_http_response_bytes_total",
+    "Bytes de corpo das respostas, antes e depois da compressão",
+)
+
+
+def escolher_codificacao(accept_encoding: str) -> Optional[str]:
+    aceitas = set()
+    for parte in accept_encoding.lower().split(","):
+        nome, _, params = parte.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        aceitas.add(nome.strip())
+    if brotli is not None and "br" in aceitas:
+        return "br"
+    if "gzip" in aceitas or "*" in aceitas:
+        return "gzip"
+    return None
+
+
+def comprimir(corpo: bytes, codificacao: str) -> bytes:
+    if codificacao == "br":
+        return brotli.compress(corpo, quality=COMPRESSAO_BROTLI_QUALIDADE)
+    return gzip.compress(corpo, compresslevel=COMPRESSAO_GZIP_NIVEL, mtime=0)
+
+
+def _header(headers, nome: bytes) -> Optional[bytes]:
+    for k, v in headers:
+        if k.lower() == nome:
+            return v
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI: acumula o corpo da resposta e comprime se o cliente
+    aceitar, o tipo for texto/JSON e o tamanho passar do mínimo. Respostas
+    em streaming (mais de um pedaço) passam sem compressão.
+    """
+
+    def __init__(self, app, min_bytes: int = COMPRESSAO_MIN_BYTES):
+        self.app = app
+        self.min_bytes = min_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        accept = (_header(scope.get("headers") or (), b"accept-encoding") or b"").decode("latin-1")
+        codificacao = escolher_codificacao(accept)
+        if codificacao is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio: dict = {}
+        pedacos: List[bytes] = []
+        streaming = [False]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                inicio.update(message)
+                return
+
+            if message["type"] != "http.response.body" or streaming[0]:
+                await send(message)
+                return
+
+            if message.get("more_body", False) and not pedacos:
+                # streaming: devolve o que veio até aqui e segue sem comprimir
+                streaming[0] = True
+                await send(inicio)
+                await send(message)
+                return
+
+            pedacos.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            await self._enviar(send, inicio, b"".join(pedacos), codificacao)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _enviar(self, send, inicio: dict, corpo: bytes, codificacao: str) -> None:
+        headers = [(k, v) for k, v in inicio.get("headers", []) if k.lower() != b"content-length"]
+        tipo = _header(headers, b"content-type") or b""
+
+        if (
+            len(corpo) < self.min_bytes
+            or _header(headers, b"content-encoding") is not None
+            or not tipo.startswith(TIPOS_COMPRESSIVEIS)
+        ):
+            headers.append((b"content-length", str(len(corpo)).encode()))
+            await send({**inicio, "headers": headers})
+            await send({"type": "http.response.body", "body": corpo})
+            return
+
+        if len(corpo) >= COMPRESSAO_THREAD_BYTES:
+            comprimido = await run_in_threadpool(comprimir, corpo, codificacao)
+        else:
+            comprimido = comprimir(corpo, codificacao)
+        RESPONSE_BYTES.inc(len(corpo), fase="original")
+        RESPONSE_BYTES.inc(len(comprimido), fase=codificacao)
+
+        vary = _header(headers, b"vary")
+        headers = [(k, v) for k, v in headers if k.lower() != b"vary"]
+        headers += [
+            (b"content-encoding", codificacao.encode()),
+            (b"content-length", str(len(comprimido)).encode()),
+            (b"vary", (vary + b", Accept-Encoding") if vary else b"Accept-Encoding"),
+        ]
+        await send({**inicio, "headers": headers})
+        await send({"type": "http.response.body", "body": comprimido})
@@ -12,4 +12,21 @@ class Settings:
 
     DATABASE_URL = os.getenv("DATABASE_URL")
 
+    # cache de autenticação (claims do token e usuário)
+    AUTH_CACHE_TTL_SEC = int(os.getenv("AUTH_CACHE_TTL_SEC", 60))
+    AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", 10000))
+
+    # bcrypt fora do event loop / threadpool
+    BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", 2))
+    BCRYPT_MAX_PENDING = int(os.getenv("BCRYPT_MAX_PENDING", 32))
+
+    # ledger da carteira: snapshot de saldo a cada N lançamentos por usuário
+    WALLET_SNAPSHOT_EVERY = int(os.getenv("WALLET_SNAPSHOT_EVERY", 100))
+
+    # apostas em micro-lotes (uma thread escritora, um commit por lote/evento)
+    BET_BATCH_ENABLED = os.getenv("BET_BATCH_ENABLED", "True") == "True"
+    BET_BATCH_WINDOW_MS = float(os.getenv("BET_BATCH_WINDOW_MS", 5))
+    BET_BATCH_MAX = int(os.getenv("BET_BATCH_MAX", 500))
+    BET_BATCH_TIMEOUT_SEC = float(os.getenv("BET_BATCH_TIMEOUT_SEC", 10))
+
 settings = Settings()
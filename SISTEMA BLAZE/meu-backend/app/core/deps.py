@@ -1,10 +1,10 @@
-from app.core.database import SessionLocal
-from sqlalchemy.orm import Session
-from fastapi import Depends
+from app.core.database import AsyncSessionLocal
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_async_db():
+    """
+    Sessão async para as rotas ORM. Funções de serviço síncronas (as mesmas
+    usadas pelas threads de lote) rodam com await db.run_sync(fn, ...): o
+    I/O passa pelo driver async, sem ocupar o threadpool.
+    """
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
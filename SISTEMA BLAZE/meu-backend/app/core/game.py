@@ -1,11 +1,24 @@
 import random
 
-def sortear_resultado():
-    r = random.random()
+# Double: números 0-14 equiprováveis; 0 = branco, 1-7 = vermelho, 8-14 = preto
+NUMEROS = 15
+CORES = ("red", "black", "white")
 
-    if r < 0.47:
-        return "red"
-    elif r < 0.94:
-        return "black"
-    else:
+
+def cor_do_numero(n: int) -> str:
+    if n == 0:
         return "white"
+    if 1 <= n <= 7:
+        return "red"
+    return "black"
+
+
+def sortear_resultado():
+    return cor_do_numero(random.randrange(NUMEROS))
+
+# multiplicador pago por cor no Double
+PAGAMENTOS = {
+    "red": 2,
+    "black": 2,
+    "white": 14,
+}
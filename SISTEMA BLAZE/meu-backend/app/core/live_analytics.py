@@ -0,0 +1,108 @@
+import os
+from typing import Dict, List, Optional
+
+from app.core.game import CORES
+
+# Métricas ao vivo por origem, atualizadas em O(1) a cada rodada:
+# sequência atual (cor e tamanho), recorde de sequência, rodadas desde a
+# última de cada cor e frequência das cores nas últimas N rodadas.
+#
+# As janelas deslizantes usam um buffer circular com as cores das últimas
+# max(N) rodadas e um contador por janela: entra a cor nova, sai a que
+# estava N posições atrás. O resumo servido nas rotas é montado uma vez por
+# rodada; leitura não recalcula nada.
+
+JANELAS = tuple(sorted({int(j) for j in os.getenv("ANALISE_JANELAS", "50,100,500").split(",") if j.strip()}))
+
+
+class AnaliseAoVivo:
+    def __init__(self, janelas=JANELAS):
+        self.janelas = janelas
+        self.tamanho = max(janelas)
+        self._buffer: List[Optional[str]] = [None] * self.tamanho
+        self._pos = 0
+        self.total = 0
+        self._contagens: Dict[int, Dict[str, int]] = {j: dict.fromkeys(CORES, 0) for j in janelas}
+        self._ultima: Dict[str, Optional[int]] = dict.fromkeys(CORES)
+        self.sequencia_cor: Optional[str] = None
+        self.sequencia = 0
+        self.recorde = {"cor": None, "tamanho": 0}
+        self.resumo: dict = self._montar_resumo()
+
+    def registrar(self, cor: str) -> dict:
+        """Conta uma rodada; devolve o resumo já montado."""
+        if cor not in self._ultima:
+            return self.resumo
+
+        for janela, contagem in self._contagens.items():
+            if self.total >= janela:
+                contagem[self._buffer[(self._pos - janela) % self.tamanho]] -= 1
+            contagem[cor] += 1
+
+        self._buffer[self._pos] = cor
+        self._pos = (self._pos + 1) % self.tamanho
+        self._ultima[cor] = self.total
+        self.total += 1
+
+        if cor == self.sequencia_cor:
+            self.sequencia += 1
+        else:
+            self.sequencia_cor = cor
+            self.sequencia = 1
+        if self.sequencia > self.recorde["tamanho"]:
+            self.recorde = {"cor": cor, "tamanho": self.sequencia}
+
+        self.resumo = self._montar_resumo()
+        return self.resumo
+
+    def _montar_resumo(self) -> dict:
+        frequencias = {}
+        for janela, contagem in self._contagens.items():
+            n = min(self.total, janela)
+            frequencias[str(janela)] = {
+                "rodadas": n,
+                **{cor: {"n": c, "pct": round(c / n * 100, 1) if n else 0.0} for cor, c in contagem.items()},
+            }
+
+        return {
+            "rodadas": self.total,
+            "sequencia": {"cor": self.sequencia_cor, "tamanho": self.sequencia},
+            "recorde_sequencia": dict(self.recorde),
+            "desde_ultima": {
+                cor: (self.total - 1 - idx) if idx is not None else None
+                for cor, idx in self._ultima.items()
+            },
+            "frequencias": frequencias,
+        }
+
+    def exportar(self) -> dict:
+        """Estado mínimo para o snapshot: cores da janela maior (mais antiga primeiro)."""
+        n = min(self.total, self.tamanho)
+        cores = [self._buffer[(self._pos - n + i) % self.tamanho] for i in range(n)]
+        return {
+            "cores": "".join(c[0] for c in cores),
+            "total": self.total,
+            "desde_ultima": self.resumo["desde_ultima"],
+            "recorde": self.recorde,
+        }
+
+    @classmethod
+    def importar(cls, salvo: dict) -> "AnaliseAoVivo":
+        analise = cls()
+        por_letra = {c[0]: c for c in CORES}
+        for letra in salvo.get("cores") or "":
+            if letra in por_letra:
+                analise.registrar(por_letra[letra])
+
+        # contadores que vão além da janela guardada
+        total = int(salvo.get("total") or 0)
+        if total > analise.total:
+            desde = salvo.get("desde_ultima") or {}
+            analise.total = total
+            for cor in CORES:
+                analise._ultima[cor] = total - 1 - desde[cor] if desde.get(cor) is not None else None
+        recorde = salvo.get("recorde") or {}
+        if int(recorde.get("tamanho") or 0) > analise.recorde["tamanho"]:
+            analise.recorde = {"cor": recorde.get("cor"), "tamanho": int(recorde["tamanho"])}
+        analise.resumo = analise._montar_resumo()
+        return analise
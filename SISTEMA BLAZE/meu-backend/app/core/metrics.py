@@ -0,0 +1,246 @@
+import bisect
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+# Métricas em memória no formato texto do Prometheus (sem dependência externa).
+# Compartilhadas entre API e scraper: cada processo expõe as suas.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(key: LabelKey, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_fmt_labels(k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = float(value)
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        # por label: (contagem por bucket, soma, total)
+        self._series: Dict[LabelKey, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            serie = self._series.get(key)
+            if serie is None:
+                serie = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][idx] += 1
+            serie[1] += value
+            serie[2] += 1
+
+    def snapshot(self, **labels) -> Dict[str, float]:
+        serie = self._series.get(_label_key(labels))
+        if not serie:
+            return {"count": 0, "sum": 0.0}
+        return {"count": serie[2], "sum": serie[1]}
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+
+        lines = []
+        for key, (counts, total_sum, count) in items:
+            acc = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                acc += c
+                lines.append(f"{self.name}_bucket{_fmt_labels(key, [('le', _fmt_value(bound))])} {acc}")
+            lines.append(f"{self.name}_sum{_fmt_labels(key)} {_fmt_value(total_sum)}")
+            lines.append(f"{self.name}_count{_fmt_labels(key)} {count}")
+        return lines
+
+
+_REGISTRY: Dict[str, object] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def _register(metric):
+    with _REGISTRY_LOCK:
+        existing = _REGISTRY.get(metric.name)
+        if existing is not None:
+            return existing
+        _REGISTRY[metric.name] = metric
+        return metric
+
+
+def counter(name: str, help: str) -> Counter:
+    return _register(Counter(name, help))
+
+
+def gauge(name: str, help: str) -> Gauge:
+    return _register(Gauge(name, help))
+
+
+def histogram(name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help, buckets))
+
+
+def render_prometheus() -> str:
+    with _REGISTRY_LOCK:
+        metrics = list(_REGISTRY.values())
+
+    out = []
+    for m in metrics:
+        out.append(f"# HELP {m.name} {m.help}")
+        out.append(f"# TYPE {m.name} {m.kind}")
+        out.extend(m.render())
+    return "\n".join(out) + "\n"
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def serve_metrics(port: int, host: str = "0.0.0.0"):
+    """Sobe GET /metrics numa thread daemon (processos sem FastAPI, ex: scraper)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+# =========================
+#  LATÊNCIA DAS RODADAS (site -> commit)
+# =========================
+ROUND_DETECT_TO_POST = histogram(
+    "blaze_round_detect_to_post_seconds",
+    "Da detecção da rodada no DOM (scraper) até o envio do POST /update_status",
+)
+ROUND_POST_TO_ACK = histogram(
+    "blaze_round_post_to_ack_seconds",
+    "Do envio do POST pelo scraper até o recebimento na API",
+)
+ROUND_ACK_TO_COMMIT = histogram(
+    "blaze_round_ack_to_commit_seconds",
+    "Do recebimento na API até o commit do resultado no banco",
+)
+STARTUP_SECONDS = gauge(
+    "blaze_startup_seconds",
+    "Tempo de boot da API por fase (import, startup, pronto)",
+)
+ROUNDS_RECEIVED = counter(
+    "blaze_rounds_received_total",
+    "Rodadas recebidas em /update_status por origem",
+)
+
+SCHEDULE_FANOUT_USERS = histogram(
+    "blaze_schedule_fanout_users",
+    "Usuários com a agenda liberada no minuto de cada rodada recebida",
+    buckets=(0, 1, 10, 100, 1000, 10000, 100000),
+)
+
+# =========================
+#  APOSTAS
+# =========================
+EVENT_SETTLEMENT_SECONDS = histogram(
+    "blaze_event_settlement_seconds",
+    "Duração da liquidação set-based de um evento",
+)
+BETS_SETTLED = counter(
+    "blaze_bets_settled_total",
+    "Apostas liquidadas",
+)
+BET_BATCH_SIZE = histogram(
+    "blaze_bet_batch_size",
+    "Apostas por micro-lote gravado",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+BET_BATCH_SECONDS = histogram(
+    "blaze_bet_batch_seconds",
+    "Duração da gravação de um micro-lote de apostas",
+)
+
+# =========================
+#  SCRAPER
+# =========================
+SCRAPER_LOOP_SECONDS = histogram(
+    "blaze_scraper_loop_iteration_seconds",
+    "Duração de cada volta do loop do scraper",
+)
+SCRAPER_POST_SECONDS = histogram(
+    "blaze_scraper_post_seconds",
+    "Round-trip do POST /update_status visto pelo scraper",
+)
+WEBDRIVER_CALLS = counter(
+    "blaze_scraper_webdriver_calls_total",
+    "Comandos enviados ao WebDriver por tipo",
+)
+SCRAPER_RESTARTS = counter(
+    "blaze_scraper_restarts_total",
+    "Reinícios do scraper embutido na API pela supervisão",
+)
@@ -0,0 +1,30 @@
+import base64
+import json
+
+from fastapi import HTTPException
+
+# Paginação por keyset: o cursor carrega a chave de ordenação do último item
+# da página (ex.: [created_at, id]); a próxima página começa estritamente
+# depois dela, usando o índice em vez de OFFSET.
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 500
+
+
+def encode_cursor(*chave) -> str:
+    raw = json.dumps(chave, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, tamanho: int) -> list:
+    """Devolve a chave do cursor; o último elemento é sempre o id (int)."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        chave = json.loads(raw)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    if not isinstance(chave, list) or len(chave) != tamanho or not isinstance(chave[-1], int):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return chave
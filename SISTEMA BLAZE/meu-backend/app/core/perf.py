@@ -0,0 +1,374 @@
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter as _Counter, OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from app.core.metrics import gauge, histogram
+
+# =========================
+#  CONFIG
+# =========================
+SLOW_QUERY_MS = float(os.getenv("PERF_SLOW_QUERY_MS", 100))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("PERF_SLOW_QUERY_LOG_SIZE", 200))
+# /debug/perf expõe SQL com parâmetros: só liga explicitamente
+DEBUG_ENDPOINT = os.getenv("PERF_DEBUG", "False").strip().lower() in ("1", "true", "yes", "on")
+
+RESERVOIR = 512
+
+HTTP_REQUEST_SECONDS = histogram(
+    "blaze_http_request_seconds",
+    "Latência por rota (template), método e status",
+)
+HTTP_IN_FLIGHT = gauge(
+    "blaze_http_requests_in_flight",
+    "Requisições em andamento por rota",
+)
+SQL_STATEMENT_SECONDS = histogram(
+    "blaze_sql_statement_seconds",
+    "Duração do execute de cada statement SQL (sem a leitura das linhas pelo chamador)",
+)
+
+
+def _percentis(valores) -> Dict[str, Optional[float]]:
+    ordenados = sorted(valores)
+    if not ordenados:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+
+    def pct(p):
+        return round(ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))] * 1000, 3)
+
+    return {"p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99)}
+
+
+# =========================
+#  ROTAS
+# =========================
+class _RouteStats:
+    __slots__ = ("count", "errors", "total", "max", "in_flight", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.in_flight = 0
+        self.recent: Deque[float] = deque(maxlen=RESERVOIR)
+
+
+_route_stats: Dict[str, _RouteStats] = {}
+_route_lock = threading.Lock()
+
+
+SEM_ROTA = "<sem rota>"
+
+
+def _route_key(method: str, template: str) -> str:
+    return f"{method} {template}"
+
+
+def _route_enter(key: str) -> None:
+    with _route_lock:
+        st = _route_stats.get(key)
+        if st is None:
+            st = _route_stats[key] = _RouteStats()
+        st.in_flight += 1
+    HTTP_IN_FLIGHT.inc(route=key)
+
+
+def _route_exit(entrada: str, key: str, method: str, template: str, status: int, dt: float) -> None:
+    """`entrada` é a chave usada em _route_enter (em andamento); `key` é a rota resolvida."""
+    with _route_lock:
+        _route_stats[entrada].in_flight -= 1
+        st = _route_stats.get(key)
+        if st is None:
+            st = _route_stats[key] = _RouteStats()
+        st.count += 1
+        st.total += dt
+        st.max = max(st.max, dt)
+        st.recent.append(dt)
+        if status >= 500:
+            st.errors += 1
+    HTTP_IN_FLIGHT.dec(route=entrada)
+    HTTP_REQUEST_SECONDS.observe(dt, route=template, method=method, status=str(status))
+
+
+class PerfMiddleware:
+    """
+    Middleware ASGI: latência e requisições em andamento por template de rota
+    (/events/status, /events/{event_id}/finish...), não por URL crua.
+
+    A rota vem de scope["route"], que o router preenche ao despachar: vale
+    também para os routers incluídos (auth, carteira, apostas...), que no
+    app.router.routes aparecem como um nó sem `path`. Na primeira vez que
+    uma URL aparece, o "em andamento" usa o casamento no nível de cima; dali
+    em diante o template aprendido fica no cache.
+    """
+
+    def __init__(self, app, cache_size: int = 1024):
+        self.app = app
+        self.cache_size = cache_size
+        self._templates: "OrderedDict[tuple, str]" = OrderedDict()
+
+    def _template(self, scope) -> str:
+        key = (scope.get("method"), scope.get("path"))
+        tpl = self._templates.get(key)
+        if tpl is not None:
+            self._templates.move_to_end(key)
+            return tpl
+
+        tpl = SEM_ROTA
+        router = scope.get("app").router if scope.get("app") is not None else None
+        if router is not None:
+            from starlette.routing import Match
+
+            for route in router.routes:
+                match, _ = route.matches(scope)
+                if match == Match.FULL:
+                    tpl = getattr(route, "path", tpl)
+                    break
+        return tpl
+
+    def _aprender(self, scope) -> str:
+        """Template pelo route que atendeu (depois de self.app); guarda no cache."""
+        route = scope.get("route")
+        tpl = getattr(route, "path", None) or SEM_ROTA
+        key = (scope.get("method"), scope.get("path"))
+        self._templates[key] = tpl
+        self._templates.move_to_end(key)
+        if len(self._templates) > self.cache_size:
+            self._templates.popitem(last=False)
+        return tpl
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "GET")
+        entrada = _route_key(method, self._template(scope))
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        _route_enter(entrada)
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            dt = time.perf_counter() - t0
+            template = self._aprender(scope)
+            _route_exit(entrada, _route_key(method, template), method, template, status["code"], dt)
+
+
+def route_report() -> List[Dict[str, Any]]:
+    with _route_lock:
+        items = [(k, st.count, st.errors, st.total, st.max, st.in_flight, list(st.recent)) for k, st in _route_stats.items()]
+
+    out = []
+    for key, count, errors, total, mx, in_flight, recent in items:
+        if not count and not in_flight:
+            continue  # chave provisória de "em andamento" que nunca concluiu nada
+        linha = {
+            "rota": key,
+            "requisicoes": count,
+            "erros_5xx": errors,
+            "em_andamento": in_flight,
+            "media_ms": round(total / count * 1000, 3) if count else None,
+            "max_ms": round(mx * 1000, 3),
+        }
+        linha.update(_percentis(recent))
+        out.append(linha)
+    return sorted(out, key=lambda x: -(x["media_ms"] or 0) * x["requisicoes"])
+
+
+# =========================
+#  SQL
+# =========================
+_WS = re.compile(r"\s+")
+
+_slow_queries: Deque[Dict[str, Any]] = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+_statement_stats: "OrderedDict[str, list]" = OrderedDict()
+_sql_lock = threading.Lock()
+MAX_STATEMENTS = 500
+
+
+def _normalizar_sql(sql: str) -> str:
+    return _WS.sub(" ", sql or "").strip()
+
+
+def _params_repr(params) -> str:
+    r = repr(params)
+    return r if len(r) <= 500 else r[:500] + "..."
+
+
+def record_statement(source: str, sql: str, params, dt: float, explain=None) -> None:
+    """
+    Registra um statement; acima de PERF_SLOW_QUERY_MS entra no log de lentas
+    com parâmetros e plano (explain: callable que devolve o plano ou None).
+    """
+    norm = _normalizar_sql(sql)
+    kind = norm.split(" ", 1)[0].upper() if norm else "?"
+    SQL_STATEMENT_SECONDS.observe(dt, source=source, kind=kind)
+
+    with _sql_lock:
+        st = _statement_stats.get(norm)
+        if st is None:
+            st = _statement_stats[norm] = [0, 0.0, 0.0, source]
+            if len(_statement_stats) > MAX_STATEMENTS:
+                _statement_stats.popitem(last=False)
+        else:
+            _statement_stats.move_to_end(norm)
+        st[0] += 1
+        st[1] += dt
+        st[2] = max(st[2], dt)
+
+    if dt * 1000 < SLOW_QUERY_MS:
+        return
+
+    plan = None
+    if explain is not None:
+        try:
+            plan = explain()
+        except Exception as e:
+            plan = [f"EXPLAIN falhou: {e}"]
+
+    with _sql_lock:
+        _slow_queries.appendleft({
+            "quando": time.time(),
+            "origem": source,
+            "ms": round(dt * 1000, 3),
+            "sql": norm,
+            "params": _params_repr(params),
+            "plano": plan,
+        })
+
+
+def _sqlite_plan(conn: sqlite3.Connection, sql: str, params) -> List[str]:
+    cur = sqlite3.Cursor(conn)
+    try:
+        cur.execute("EXPLAIN QUERY PLAN " + sql, params or ())
+        return [row[-1] for row in cur.fetchall()]
+    finally:
+        cur.close()
+
+
+def instrument_engine(engine) -> None:
+    """Cronometra todo statement emitido por um Engine do SQLAlchemy."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("perf_t0", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("perf_t0")
+        if not stack:
+            return
+        dt = time.perf_counter() - stack.pop()
+        dialect = conn.dialect.name
+
+        def explain():
+            raw = cursor.connection
+            if dialect == "sqlite":
+                return _sqlite_plan(raw, statement, parameters)
+            cur = raw.cursor()
+            try:
+                cur.execute("EXPLAIN " + statement, parameters)
+                return [row[0] for row in cur.fetchall()]
+            finally:
+                cur.close()
+
+        record_statement(
+            f"sqlalchemy:{dialect}",
+            statement,
+            "<executemany>" if executemany else parameters,
+            dt,
+            # driver async (aiosqlite/asyncpg): a conexão crua não roda EXPLAIN síncrono
+            explain=None if executemany or conn.dialect.is_async else explain,
+        )
+
+
+def sql_report(top: int = 20) -> Dict[str, Any]:
+    with _sql_lock:
+        stats = [(sql, st[0], st[1], st[2], st[3]) for sql, st in _statement_stats.items()]
+        lentas = list(_slow_queries)
+
+    stats.sort(key=lambda x: -x[2])
+    return {
+        "limite_lenta_ms": SLOW_QUERY_MS,
+        "top_por_tempo_total": [
+            {
+                "sql": sql,
+                "origem": src,
+                "execucoes": n,
+                "total_ms": round(total * 1000, 3),
+                "media_ms": round(total / n * 1000, 3),
+                "max_ms": round(mx * 1000, 3),
+            }
+            for sql, n, total, mx, src in stats[:top]
+        ],
+        "lentas": lentas,
+    }
+
+
+# =========================
+#  PROFILER POR AMOSTRAGEM
+# =========================
+_profile_lock = threading.Lock()
+
+
+def sample_stacks(seconds: float = 5.0, interval: float = 0.005, top: int = 30, skip_thread: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Amostra as pilhas de todas as threads (sys._current_frames) por `seconds`.
+    Devolve pilhas colapsadas "arquivo:função:linha;..." (formato flamegraph) mais frequentes.
+    Uma amostragem por vez.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError("Já existe uma amostragem em andamento")
+
+    try:
+        me = threading.get_ident()
+        nomes = {t.ident: t.name for t in threading.enumerate()}
+        pilhas: _Counter = _Counter()
+        funcoes: _Counter = _Counter()
+        amostras = 0
+        fim = time.perf_counter() + seconds
+
+        while time.perf_counter() < fim:
+            for tid, frame in sys._current_frames().items():
+                if tid in (me, skip_thread):
+                    continue
+                partes = []
+                f = frame
+                while f is not None:
+                    code = f.f_code
+                    partes.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{f.f_lineno}")
+                    f = f.f_back
+                partes.reverse()
+                if partes:
+                    funcoes[partes[-1]] += 1
+                pilhas[f"{nomes.get(tid, tid)};" + ";".join(partes)] += 1
+            amostras += 1
+            time.sleep(interval)
+
+        return {
+            "segundos": seconds,
+            "intervalo_ms": interval * 1000,
+            "amostras": amostras,
+            "topo_por_funcao": [{"frame": k, "amostras": v} for k, v in funcoes.most_common(top)],
+            "pilhas": [{"pilha": k, "amostras": v} for k, v in pilhas.most_common(top)],
+        }
+    finally:
+        _profile_lock.release()
+
+
+def perf_report() -> Dict[str, Any]:
+    return {"rotas": route_report(), "sql": sql_report()}
@@ -0,0 +1,41 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+# Projeção (?fields=a,b,c) e formato compacto (?formato=colunas) para as
+# rotas de listas. "colunas" manda os nomes uma vez e cada linha como lista:
+#   {"colunas": ["hora", "cor"], "linhas": [["14:00", "red"], ...]}
+
+FORMATOS = ("objetos", "colunas")
+FORMATO_PADRAO = "objetos"
+FORMATO_PATTERN = "^(objetos|colunas)$"
+
+
+def parse_fields(fields: Optional[str], permitidos: Sequence[str]) -> Optional[List[str]]:
+    """'a,b' -> ['a', 'b'] na ordem pedida (None = todas). ValueError se houver campo desconhecido."""
+    if not fields:
+        return None
+    campos = []
+    for campo in fields.split(","):
+        campo = campo.strip()
+        if campo and campo not in campos:
+            campos.append(campo)
+    desconhecidos = [c for c in campos if c not in permitidos]
+    if desconhecidos:
+        raise ValueError(f"Campos desconhecidos: {', '.join(desconhecidos)} (disponíveis: {', '.join(permitidos)})")
+    return campos or None
+
+
+def projetar(linhas: Iterable[Dict[str, Any]], campos: Optional[Sequence[str]]) -> List[Dict[str, Any]]:
+    if campos is None:
+        return list(linhas)
+    return [{c: linha[c] for c in campos} for linha in linhas]
+
+
+def colunar(linhas: Iterable[Dict[str, Any]], campos: Sequence[str]) -> Dict[str, Any]:
+    return {"colunas": list(campos), "linhas": [[linha[c] for c in campos] for linha in linhas]}
+
+
+def formatar_lista(linhas: List[Dict[str, Any]], campos: Optional[Sequence[str]], permitidos: Sequence[str], formato: str):
+    """Lista de dicts -> objetos projetados ou bloco colunar."""
+    if formato == "colunas":
+        return colunar(linhas, campos or permitidos)
+    return projetar(linhas, campos)
@@ -0,0 +1,95 @@
+import re
+import threading
+from typing import Dict, Iterable, Iterator, List, Set
+
+# Agendas por usuário como bitmap de minutos do dia (int de 1440 bits) e um
+# índice invertido minuto -> usuários. A busca de quem está liberado num
+# minuto é O(inscritos); mudar a agenda de um usuário mexe só nos minutos
+# que mudaram (XOR entre o bitmap antigo e o novo).
+
+MINUTOS_DIA = 24 * 60
+# HH:MM válido: horários globais, agendas por usuário e janelas de consulta
+HORARIO_RE = re.compile(r"^([01]\d|2[0-3]):[0-5]\d$")
+BITMAP_BYTES = MINUTOS_DIA // 8
+
+
+def minuto_do_dia(hhmm: str) -> int:
+    h, m = hhmm.split(":")
+    return int(h) * 60 + int(m)
+
+
+def hhmm(minuto: int) -> str:
+    return f"{minuto // 60:02d}:{minuto % 60:02d}"
+
+
+def bits(bitmap: int) -> Iterator[int]:
+    """Posições dos bits ligados, em ordem; custa O(bits ligados)."""
+    while bitmap:
+        menor = bitmap & -bitmap
+        yield menor.bit_length() - 1
+        bitmap ^= menor
+
+
+def bitmap_de_horarios(horarios: Iterable[str]) -> int:
+    bitmap = 0
+    for h in horarios:
+        bitmap |= 1 << minuto_do_dia(h)
+    return bitmap
+
+
+def horarios_do_bitmap(bitmap: int) -> List[str]:
+    return [hhmm(m) for m in bits(bitmap)]
+
+
+def bitmap_para_bytes(bitmap: int) -> bytes:
+    return bitmap.to_bytes(BITMAP_BYTES, "little")
+
+
+def bitmap_de_bytes(dados: bytes) -> int:
+    return int.from_bytes(dados or b"", "little")
+
+
+class IndiceHorarios:
+    """Índice invertido minuto -> user_ids. Thread-safe (rotas sync rodam no threadpool)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bitmaps: Dict[int, int] = {}
+        self._por_minuto: List[Set[int]] = [set() for _ in range(MINUTOS_DIA)]
+
+    def definir(self, user_id: int, bitmap: int) -> None:
+        """Troca a agenda do usuário (0 = sem entradas), atualizando só os minutos alterados."""
+        with self._lock:
+            antigo = self._bitmaps.get(user_id, 0)
+            mudou = antigo ^ bitmap
+            for m in bits(mudou & bitmap):
+                self._por_minuto[m].add(user_id)
+            for m in bits(mudou & antigo):
+                self._por_minuto[m].discard(user_id)
+            if bitmap:
+                self._bitmaps[user_id] = bitmap
+            else:
+                self._bitmaps.pop(user_id, None)
+
+    def remover(self, user_id: int) -> None:
+        self.definir(user_id, 0)
+
+    def inscritos(self, minuto: int) -> List[int]:
+        with self._lock:
+            return list(self._por_minuto[minuto % MINUTOS_DIA])
+
+    def permitido(self, user_id: int, minuto: int) -> bool:
+        with self._lock:
+            return bool(self._bitmaps.get(user_id, 0) >> (minuto % MINUTOS_DIA) & 1)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._bitmaps.clear()
+            for s in self._por_minuto:
+                s.clear()
+
+    def __len__(self) -> int:
+        return len(self._bitmaps)
+
+
+indice_horarios = IndiceHorarios()
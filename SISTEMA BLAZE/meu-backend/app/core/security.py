@@ -1,3 +1,6 @@
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from jose import jwt
@@ -19,3 +22,49 @@ def create_access_token(data: dict):
     )
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
+
+# =========================
+#  BCRYPT EM POOL DE PROCESSOS
+# =========================
+# Um pico de logins ocupa só os processos do pool; acima de BCRYPT_MAX_PENDING
+# tarefas na fila a requisição é recusada em vez de enfileirar sem limite.
+
+class BcryptBusy(Exception):
+    pass
+
+_pool = None
+_pool_lock = threading.Lock()
+_pending = 0
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=settings.BCRYPT_WORKERS)
+        return _pool
+
+async def _run_bcrypt(fn, *args):
+    global _pending
+    with _pool_lock:
+        if _pending >= settings.BCRYPT_MAX_PENDING:
+            raise BcryptBusy("Muitas autenticações em andamento")
+        _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_pool(), fn, *args)
+    finally:
+        with _pool_lock:
+            _pending -= 1
+
+async def hash_password_async(password: str) -> str:
+    return await _run_bcrypt(hash_password, password)
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    return await _run_bcrypt(verify_password, password, hashed)
+
+def shutdown_bcrypt_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
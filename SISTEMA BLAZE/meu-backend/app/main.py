@@ -1,17 +1,52 @@
 import time
+
+# marco zero do boot: mede o tempo de import até o app estar pronto
+_BOOT_T0 = time.perf_counter()
+
+import asyncio
+import importlib
 import json
 import os
-import re
-from datetime import datetime, timedelta
-from typing import List, Optional
-import sqlite3
+import sys
+from datetime import datetime
+from typing import List, Literal, Optional
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, Query
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import Response
+from pydantic import BaseModel, Field
+
+from app.core.metrics import (
+    PROMETHEUS_CONTENT_TYPE,
+    STARTUP_SECONDS,
+    ROUND_ACK_TO_COMMIT,
+    ROUND_DETECT_TO_POST,
+    ROUND_POST_TO_ACK,
+    ROUNDS_RECEIVED,
+    SCHEDULE_FANOUT_USERS,
+    render_prometheus,
+)
+from app.core.admission import AdmissionMiddleware, estado_admissao
+from app.core.broadcast import atender, hub, serializar
+from app.core.compression import CompressionMiddleware
+from app.core.database import Base, async_engine, engine
+from app.core.game import CORES, NUMEROS, cor_do_numero
+from app.core.live_analytics import AnaliseAoVivo
+from app.core.perf import DEBUG_ENDPOINT, PerfMiddleware, perf_report, sample_stacks
+from app.core.projection import FORMATO_PADRAO, FORMATO_PATTERN, colunar, formatar_lista, parse_fields, projetar
+from app.core.schedule_index import HORARIO_RE, minuto_do_dia
+from app.core.security import shutdown_bcrypt_pool
+from app.repositories import rounds as rodadas
+from app.routes import auth, bets, event, users, wallet
+from app.services.bet_service import shutdown_bet_batcher
+from app.services.live_queries import consultas_ao_vivo
+from app.services.schedule_service import carregar_indice, usuarios_no_minuto
 
 app = FastAPI()
 
+# admissão por dentro do CORS/perf: 429/503 saem com CORS e entram na latência
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(CompressionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -19,154 +54,138 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(PerfMiddleware)
 
 # =========================
-#  BANCO DE DADOS SQLITE
-# =========================
-DB_FILE = os.path.join(os.path.dirname(__file__), "historico_completo.db")
-
-def init_database():
-    """Inicializa o banco de dados com tabela de histórico"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS historico_resultados (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            numero INTEGER,
-            cor TEXT,
-            hora TEXT,
-            mensagem TEXT,
-            timestamp_recebimento REAL,
-            data_hora_real TEXT,
-            resultado TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-def salvar_resultado_db(numero, cor, hora, mensagem, timestamp, resultado):
-    """Salva um resultado no banco de dados"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    data_hora = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
-    cursor.execute("""
-        INSERT INTO historico_resultados 
-        (numero, cor, hora, mensagem, timestamp_recebimento, data_hora_real, resultado)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (numero, cor, hora, mensagem, timestamp, data_hora, resultado))
-    conn.commit()
-    conn.close()
-
-def obter_historico_filtrado(data_inicio=None, data_fim=None, hora_inicio=None, hora_fim=None, tipo_resultado=None):
+#  BANCO DE DADOS
+# =========================
+# histórico de rodadas fica em app.repositories.rounds, no engine único
+# (DATABASE_URL, SQLite WAL por padrão)
+
+def obter_melhores_horarios(dias=30, min_jogadas=5):
     """
-    Obtém histórico filtrado por período e/ou horário do dia
+    Retorna os horários com melhor performance (sem loss ou menor taxa de loss)
     """
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
+    estatisticas = rodadas.estatisticas_por_horario(dias)
 
-    query = "SELECT * FROM historico_resultados WHERE 1=1"
-    params = []
-
-    if data_inicio:
-        query += " AND DATE(data_hora_real) >= ?"
-        params.append(data_inicio)
-
-    if data_fim:
-        query += " AND DATE(data_hora_real) <= ?"
-        params.append(data_fim)
+    horarios_validos = [e for e in estatisticas if e['total'] >= min_jogadas]
 
-    if hora_inicio and hora_fim:
-        query += " AND TIME(data_hora_real) BETWEEN ? AND ?"
-        params.append(hora_inicio + ":00")
-        params.append(hora_fim + ":59")
+    horarios_ordenados = sorted(
+        horarios_validos,
+        key=lambda x: (x['losses'], -x['taxa_acerto'])
+    )
 
-    if tipo_resultado:
-        if tipo_resultado.lower() == 'win':
-            query += " AND resultado = 'WIN'"
-        elif tipo_resultado.lower() == 'loss':
-            query += " AND resultado = 'LOSS'"
+    return horarios_ordenados
 
-    query += " ORDER BY timestamp_recebimento DESC"
+# =========================
+#  ESTADO GLOBAL DO SISTEMA
+# =========================
+def _novo_estado() -> dict:
+    return {
+        "id": 0,
+        # sequência inteira da última rodada recebida (cada entrada do histórico tem a sua)
+        "seq": 0,
+        "numero": 0,
+        "cor": "white",
+        "hora": "--:--",
+        "mensagem": None,
+        "historico": [],
+        "placar": {
+            "wins": 0,
+            "losses": 0,
+            "hora_registro": datetime.now().hour
+        },
+        # resumo de AnaliseAoVivo, trocado a cada rodada (leitura não recalcula)
+        "analise": AnaliseAoVivo().resumo,
+    }
 
-    cursor.execute(query, params)
-    resultados = cursor.fetchall()
-    conn.close()
+estado_atual = _novo_estado()
 
-    colunas = ['id', 'numero', 'cor', 'hora', 'mensagem', 'timestamp_recebimento', 'data_hora_real', 'resultado']
-    return [dict(zip(colunas, row)) for row in resultados]
+# rodadas mantidas em memória por origem (janela do ?since=)
+HISTORICO_MAX = 120
 
-def obter_estatisticas_por_horario(dias=30):
+def _historico_desde(estado: dict, since: int) -> dict:
     """
-    Retorna estatísticas de Win/Loss agrupadas por horário do dia nos últimos N dias
-    """
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-
-    data_limite = (datetime.now() - timedelta(days=dias)).strftime("%Y-%m-%d")
-
-    query = """
-        SELECT 
-            SUBSTR(TIME(data_hora_real), 1, 2) as hora,
-            SUM(CASE WHEN resultado = 'WIN' THEN 1 ELSE 0 END) as wins,
-            SUM(CASE WHEN resultado = 'LOSS' THEN 1 ELSE 0 END) as losses,
-            COUNT(*) as total
-        FROM historico_resultados
-        WHERE DATE(data_hora_real) >= ?
-        AND resultado IN ('WIN', 'LOSS')
-        GROUP BY hora
-        ORDER BY hora
+    Rodadas com seq > since, mais recentes primeiro. resync=True quando o
+    cliente ficou para trás da janela (ou está à frente: servidor reiniciou
+    sem snapshot); aí vem o histórico inteiro e ele deve substituir o seu.
     """
+    historico = estado["historico"]
+    seq = estado["seq"]
+    mais_antiga = historico[-1]["seq"] if historico else seq + 1
+    if since > seq or since < mais_antiga - 1:
+        return {"seq": seq, "resync": True, "rodadas": historico}
+    # seq é contígua no histórico: as novas são as primeiras seq - since
+    return {"seq": seq, "resync": False, "rodadas": historico[:seq - since]}
 
-    cursor.execute(query, (data_limite,))
-    resultados = cursor.fetchall()
-    conn.close()
+# =========================
+#  ESTADO POR ORIGEM (SCRAPER MULTI-ALVO)
+# =========================
+# A origem padrão é o estado_atual; outras origens (tag de ingestão do scraper)
+# têm estado próprio e não gravam no histórico do banco.
+ORIGEM_PADRAO = "blaze_double"
+estados_por_origem = {}
+
+# Cada origem nova vira estado, análise e entrada no snapshot: só são criadas
+# as que o scraper foi configurado para mandar (nomes de SCRAPER_TARGETS, lido
+# aqui sem importar app.services.scraper_targets, que puxa o selenium). Sem
+# SCRAPER_TARGETS na API, no máximo ORIGENS_MAX origens além da padrão.
+ORIGENS_MAX = int(os.getenv("ORIGENS_MAX", 8))
+
+def _origens_configuradas() -> Optional[frozenset]:
+    raw = (os.getenv("SCRAPER_TARGETS") or "").strip()
+    if not raw:
+        return None
+    try:
+        nomes = [cfg.get("name") for cfg in json.loads(raw)] if raw.startswith("[") else raw.split(",")
+    except (ValueError, TypeError, AttributeError):
+        return None
+    return frozenset(n.strip() for n in nomes if isinstance(n, str) and n.strip())
 
-    estatisticas = []
-    for row in resultados:
-        hora_int = int(row[0])
-        estatisticas.append({
-            'horario': f"{hora_int:02d}:00",
-            'wins': row[1],
-            'losses': row[2],
-            'total': row[3],
-            'taxa_acerto': round((row[1] / row[3] * 100) if row[3] > 0 else 0, 2)
-        })
+ORIGENS_PERMITIDAS = _origens_configuradas()
 
-    return estatisticas
+def _eh_origem_padrao(origem: Optional[str]) -> bool:
+    return not origem or origem == ORIGEM_PADRAO
 
-def obter_melhores_horarios(dias=30, min_jogadas=5):
-    """
-    Retorna os horários com melhor performance (sem loss ou menor taxa de loss)
-    """
-    estatisticas = obter_estatisticas_por_horario(dias)
+def _origem_aceita(origem: str) -> bool:
+    if origem in estados_por_origem:
+        return True
+    if ORIGENS_PERMITIDAS is not None:
+        return origem in ORIGENS_PERMITIDAS
+    return len(estados_por_origem) < ORIGENS_MAX
 
-    horarios_validos = [e for e in estatisticas if e['total'] >= min_jogadas]
+def _estado_da_origem(origem: Optional[str], criar: bool = False) -> Optional[dict]:
+    """criar=True devolve None para origem fora da lista/limite."""
+    if _eh_origem_padrao(origem):
+        return estado_atual
+    if criar and _origem_aceita(origem):
+        return estados_por_origem.setdefault(origem, _novo_estado())
+    return estados_por_origem.get(origem)
 
-    horarios_ordenados = sorted(
-        horarios_validos,
-        key=lambda x: (x['losses'], -x['taxa_acerto'])
-    )
+# =========================
+#  ANÁLISE AO VIVO (SEQUÊNCIAS, FREQUÊNCIAS) E PUSH
+# =========================
+analises = {}
 
-    return horarios_ordenados
+def _chave_origem(origem: Optional[str]) -> str:
+    return ORIGEM_PADRAO if _eh_origem_padrao(origem) else origem
 
-init_database()
+def _analise_da_origem(origem: Optional[str]) -> AnaliseAoVivo:
+    chave = _chave_origem(origem)
+    analise = analises.get(chave)
+    if analise is None:
+        analise = analises[chave] = AnaliseAoVivo()
+    return analise
 
-# =========================
-#  ESTADO GLOBAL DO SISTEMA
-# =========================
-estado_atual = {
-    "id": 0,
-    "numero": 0,
-    "cor": "white",
-    "hora": "--:--",
-    "mensagem": None,
-    "historico": [],
-    "placar": {
-        "wins": 0,
-        "losses": 0,
-        "hora_registro": datetime.now().hour
-    }
-}
+def _cor_da_rodada(numero: int, cor: str) -> Optional[str]:
+    if cor in CORES:
+        return cor
+    if 0 <= numero < NUMEROS:
+        return cor_do_numero(numero)
+    return None
+
+def _canal_status(origem: Optional[str]) -> str:
+    return f"status:{_chave_origem(origem)}"
 
 # =========================
 #  ESTADO GLOBAL DOS HORÁRIOS (CHAVE MESTRA)
@@ -177,7 +196,6 @@ horarios_state = {
 }
 
 STATE_FILE = os.path.join(os.path.dirname(__file__), "horarios_state.json")
-HORARIO_RE = re.compile(r"^([01]\d|2[0-3]):[0-5]\d$")
 
 def _linha_eh_horario_valido(linha: str) -> bool:
     return bool(HORARIO_RE.match((linha or "").strip()))
@@ -217,10 +235,146 @@ def _load_horarios_state():
         horarios_state["ativo"] = False
         horarios_state["horarios"] = []
 
+# =========================
+#  SNAPSHOT DO ESTADO AO VIVO (BOOT QUENTE)
+# =========================
+SNAPSHOT_FILE = os.getenv("SNAPSHOT_FILE") or os.path.join(os.path.dirname(__file__), "estado_snapshot.json")
+SNAPSHOT_INTERVAL_SEC = float(os.getenv("SNAPSHOT_INTERVAL_SEC", 15))
+SNAPSHOT_VERSAO = 1
+
+# versao: incrementada a cada rodada recebida; salva: versão gravada por último
+_snapshot_ctl = {"versao": 0, "salva": 0}
+
+def _serializar_snapshot() -> str:
+    return json.dumps({
+        "v": SNAPSHOT_VERSAO,
+        "salvo_em": time.time(),
+        "estado": estado_atual,
+        "origens": estados_por_origem,
+        "analises": {chave: a.exportar() for chave, a in analises.items()},
+    }, ensure_ascii=False, separators=(",", ":"))
+
+def _gravar_snapshot(conteudo: str):
+    tmp = SNAPSHOT_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(conteudo)
+    os.replace(tmp, SNAPSHOT_FILE)
+
+async def _salvar_snapshot_se_mudou():
+    versao = _snapshot_ctl["versao"]
+    if versao == _snapshot_ctl["salva"]:
+        return
+    # serializa no loop (o estado só muda nele) e grava o arquivo fora dele
+    conteudo = _serializar_snapshot()
+    try:
+        await asyncio.to_thread(_gravar_snapshot, conteudo)
+        _snapshot_ctl["salva"] = versao
+    except Exception:
+        pass
+
+def _restaurar_estado(destino: dict, salvo: dict):
+    for chave in ("id", "numero", "cor", "hora", "mensagem"):
+        if chave in salvo:
+            destino[chave] = salvo[chave]
+    destino["historico"] = list(salvo.get("historico") or [])[:HISTORICO_MAX]
+    destino["seq"] = int(salvo.get("seq") or 0)
+    if any("seq" not in h for h in destino["historico"]):
+        # snapshot anterior à sequência: numera o que veio, mais recente = maior
+        destino["seq"] = max(destino["seq"], len(destino["historico"]))
+        for i, h in enumerate(destino["historico"]):
+            h["seq"] = destino["seq"] - i
+
+    placar = salvo.get("placar") or {}
+    # placar é por hora: só vale se o snapshot é da hora corrente
+    if placar.get("hora_registro") == datetime.now().hour:
+        destino["placar"]["wins"] = int(placar.get("wins", 0))
+        destino["placar"]["losses"] = int(placar.get("losses", 0))
+
+def _load_estado_snapshot():
+    try:
+        if not os.path.exists(SNAPSHOT_FILE):
+            return
+        with open(SNAPSHOT_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("v") != SNAPSHOT_VERSAO:
+            return
+
+        _restaurar_estado(estado_atual, data.get("estado") or {})
+        for origem, salvo in (data.get("origens") or {}).items():
+            estado = _estado_da_origem(origem, criar=True)
+            if estado is not None:
+                _restaurar_estado(estado, salvo)
+        for chave, salvo in (data.get("analises") or {}).items():
+            estado = _estado_da_origem(chave, criar=True)
+            if estado is None:
+                continue  # origem que saiu da configuração
+            analises[chave] = AnaliseAoVivo.importar(salvo)
+            estado["analise"] = analises[chave].resumo
+    except Exception:
+        pass
+
+async def _loop_snapshot():
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL_SEC)
+        await _salvar_snapshot_se_mudou()
+
+# =========================
+#  CARGA TARDIA
+# =========================
+# O import do app é quase todo fastapi/sqlalchemy; daqui só saem módulos que
+# nenhuma outra parte do boot importa (simulador puxa o NumPy, ~140 ms).
+def _modulo_tardio(nome: str):
+    """Importa sob demanda módulos usados só por algumas rotas"""
+    return importlib.import_module(nome)
+
+inicializacao = {"import_ms": None, "startup_ms": None, "pronto_ms": None}
+
+# scraper no mesmo processo da API (thread supervisionada) em vez do
+# `python -m app.services.scraper` separado; só com um worker do uvicorn
+SCRAPER_EMBUTIDO = os.getenv("SCRAPER_EMBUTIDO", "False") == "True"
+
 @app.on_event("startup")
-def on_startup():
+async def on_startup():
+    t0 = time.perf_counter()
     _load_horarios_state()
-    init_database()
+    rodadas.init_schema()
+    Base.metadata.create_all(bind=engine)
+    carregar_indice()
+    consultas_ao_vivo.ultimo_id = rodadas.ultimo_id()
+    _load_estado_snapshot()
+    if SNAPSHOT_INTERVAL_SEC > 0:
+        app.state.snapshot_task = asyncio.create_task(_loop_snapshot())
+    if SCRAPER_EMBUTIDO:
+        # lê horarios_state do módulo a cada volta (o load/upload troca o dict)
+        scraper = _modulo_tardio("app.services.scraper_embutido").ScraperEmbutido(
+            _ingerir_rodada, lambda: horarios_state
+        )
+        scraper.iniciar(asyncio.get_running_loop())
+        app.state.scraper = scraper
+
+    agora = time.perf_counter()
+    inicializacao["startup_ms"] = round((agora - t0) * 1000, 2)
+    inicializacao["pronto_ms"] = round((agora - _BOOT_T0) * 1000, 2)
+    STARTUP_SECONDS.set(agora - t0, fase="startup")
+    STARTUP_SECONDS.set(agora - _BOOT_T0, fase="pronto")
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    task = getattr(app.state, "snapshot_task", None)
+    if task:
+        task.cancel()
+    scraper = getattr(app.state, "scraper", None)
+    if scraper is not None:
+        await asyncio.to_thread(scraper.parar)
+    otimizador = sys.modules.get("app.services.otimizador_horarios")
+    if otimizador is not None:
+        otimizador.shutdown_pool()
+    shutdown_bcrypt_pool()
+    # apostas ainda na fila são gravadas e as rotas recebem a resposta
+    await asyncio.to_thread(shutdown_bet_batcher)
+    await _salvar_snapshot_se_mudou()
+    # conexões do driver async (aiosqlite mantém uma thread por conexão)
+    await async_engine.dispose()
 
 # =========================
 #  MODELS
@@ -233,11 +387,30 @@ class PedraPayload(BaseModel):
     # ✅ compat: caso o scraper mande "horario" (seu código novo antigo)
     horario: Optional[str] = None
     mensagem: Optional[str] = None
+    # tag do alvo no scraper multi-alvo (None = origem padrão)
+    origem: Optional[str] = Field(default=None, max_length=64)
+    # rastreio de latência (epoch, relógio do scraper)
+    detectado_em: Optional[float] = None
+    enviado_em: Optional[float] = None
 
 class HorariosConfigPayload(BaseModel):
     ativo: bool = False
     horarios: List[str] = []
 
+class OtimizadorHorariosPayload(BaseModel):
+    dias: int = Field(default=30, ge=1, le=365)
+    max_minutos: int = Field(default=20, ge=1, le=1440)
+    # distância mínima entre dois horários escolhidos (1 = qualquer minuto)
+    espacamento_min: int = Field(default=1, ge=1, le=720)
+    min_jogadas: int = Field(default=5, ge=1)
+    confianca: float = Field(default=0.95, gt=0, lt=1)
+    # piso do limite inferior de Wilson, em %
+    min_wilson: float = Field(default=0.0, ge=0, le=100)
+    # soma também os sinais a ±N minutos de cada horário
+    tolerancia_min: int = Field(default=0, ge=0, le=30)
+    # grava o resultado na chave mestra (mesmo efeito de /horarios/configurar)
+    aplicar: bool = False
+
 class FiltroHistoricoPayload(BaseModel):
     data_inicio: Optional[str] = None
     data_fim: Optional[str] = None
@@ -245,6 +418,40 @@ class FiltroHistoricoPayload(BaseModel):
     hora_fim: Optional[str] = None
     tipo_resultado: Optional[str] = None
 
+class ConsultaLotePayload(FiltroHistoricoPayload):
+    nome: str = Field(min_length=1, max_length=64)
+    # atalho: hoje + os N dias anteriores (no lugar de data_inicio)
+    dias: Optional[int] = Field(default=None, ge=0, le=3650)
+    agrupar_por: Optional[Literal["hora", "minuto", "dia", "dia_semana", "cor", "numero", "resultado"]] = None
+    metricas: List[Literal["total", "wins", "losses", "taxa_acerto"]] = ["total", "wins", "losses", "taxa_acerto"]
+    min_total: int = Field(default=0, ge=0)
+    # ex.: ["losses", "-taxa_acerto"]
+    ordenar: List[str] = []
+    limite: Optional[int] = Field(default=None, ge=1)
+
+class AnaliseLotePayload(BaseModel):
+    consultas: List[ConsultaLotePayload] = Field(min_length=1, max_length=50)
+
+class EstrategiaPayload(BaseModel):
+    nome: Optional[str] = None
+    cor: Literal["red", "black", "white"] = "red"
+    max_gales: int = Field(default=2, ge=0, le=12)
+    aposta: float = Field(default=1.0, gt=0)
+    progressao: float = Field(default=2.0, ge=1)
+    # entradas só nos minutos listados (HH:MM); gales continuam fora deles
+    horarios: List[str] = []
+    usar_horarios_configurados: bool = False
+
+class SimulacaoPayload(BaseModel):
+    estrategias: List[EstrategiaPayload] = Field(min_length=1, max_length=50)
+    simulacoes: int = Field(default=1000, ge=1, le=100_000)
+    rodadas: int = Field(default=2880, ge=1, le=1_000_000)
+    banca_inicial: float = Field(default=100.0, gt=0)
+    seed: Optional[int] = Field(default=None, ge=0)
+    intervalo_seg: int = Field(default=30, ge=1, le=3600)
+    inicio: str = "00:00"
+    bins: int = Field(default=20, ge=1, le=200)
+
 # =========================
 #  HELPERS (HORA)
 # =========================
@@ -270,6 +477,21 @@ def _normalizar_hora_payload(hora: Optional[str], horario: Optional[str]) -> str
         return h
     return datetime.now().strftime("%H:%M")
 
+# =========================
+#  HELPERS (LATÊNCIA)
+# =========================
+def _registrar_latencias_recebimento(data: PedraPayload, recebido_em: float):
+    """
+    detecção->POST e POST->ack vêm dos carimbos do scraper; relógios diferentes
+    (scraper em outra máquina) podem dar valores negativos, que são zerados.
+    """
+    origem = data.origem or ORIGEM_PADRAO
+    ROUNDS_RECEIVED.inc(origem=origem)
+    if data.detectado_em and data.enviado_em:
+        ROUND_DETECT_TO_POST.observe(max(0.0, data.enviado_em - data.detectado_em), origem=origem)
+    if data.enviado_em:
+        ROUND_POST_TO_ACK.observe(max(0.0, recebido_em - data.enviado_em), origem=origem)
+
 # =========================
 #  ROTAS
 # =========================
@@ -278,20 +500,70 @@ def read_root():
     return {"message": "API Blaze Hunters Rodando 🚀"}
 
 @app.get("/events/status")
-async def get_status():
-    return estado_atual
+async def get_status(origem: Optional[str] = None, since: Optional[int] = Query(default=None, ge=0)):
+    """Com ?since=<seq>, "historico" traz só as rodadas novas (ver "resync")."""
+    estado = _estado_da_origem(origem)
+    if estado is None:
+        raise HTTPException(status_code=404, detail="Origem desconhecida")
+    if since is None:
+        return estado
+    delta = _historico_desde(estado, since)
+    return {**estado, "historico": delta["rodadas"], "resync": delta["resync"]}
+
+@app.websocket("/ws/status")
+async def ws_status(websocket: WebSocket, origem: Optional[str] = None):
+    """Estado completo ao conectar; depois uma mensagem por rodada (rodada, placar, análise)."""
+    estado = _estado_da_origem(origem)
+    if estado is None:
+        await websocket.close(code=4404)
+        return
+    await websocket.accept()
+    await atender(websocket, _canal_status(origem), inicial={"tipo": "estado", "estado": estado})
+
+@app.websocket("/ws/historico")
+async def ws_historico(websocket: WebSocket):
+    """
+    Consultas ao vivo do histórico. O cliente manda
+      {"acao": "assinar", "filtro": {...mesmo corpo do /historico/filtrado}}
+      {"acao": "cancelar", "assinatura": id}
+    e recebe "inicial" com os totais, depois um "delta" por rodada que casa.
+    """
+    await websocket.accept()
+    await atender(websocket, None, ao_receber=_tratar_consulta_ao_vivo, ao_sair=consultas_ao_vivo.encerrar)
+
+async def _tratar_consulta_ao_vivo(assinante, texto: str):
+    try:
+        pedido = json.loads(texto)
+        acao = pedido.get("acao")
+        if acao == "assinar":
+            filtro = FiltroHistoricoPayload.model_validate(pedido.get("filtro") or {})
+            await consultas_ao_vivo.assinar(assinante, filtro.model_dump())
+        elif acao == "cancelar":
+            if consultas_ao_vivo.cancelar(assinante, int(pedido.get("assinatura"))):
+                assinante.enfileirar(serializar({"tipo": "cancelada", "assinatura": int(pedido["assinatura"])}))
+            else:
+                raise ValueError("Assinatura desconhecida")
+        else:
+            raise ValueError("acao deve ser 'assinar' ou 'cancelar'")
+    except (ValueError, TypeError, AttributeError) as e:
+        # ValidationError do pydantic também é ValueError
+        assinante.enfileirar(serializar({"tipo": "erro", "detalhe": str(e)}))
 
 @app.post("/update_status")
 async def update_status(data: PedraPayload):
-    global estado_atual
+    estado = _estado_da_origem(data.origem, criar=True)
+    if estado is None:
+        raise HTTPException(status_code=422, detail="Origem não permitida")
 
+    # novo_id também é o instante de recebimento (ack) usado no rastreio de latência
     novo_id = time.time()
+    _registrar_latencias_recebimento(data, novo_id)
 
     hora_agora = datetime.now().hour
-    if hora_agora != estado_atual["placar"]["hora_registro"]:
-        estado_atual["placar"]["wins"] = 0
-        estado_atual["placar"]["losses"] = 0
-        estado_atual["placar"]["hora_registro"] = hora_agora
+    if hora_agora != estado["placar"]["hora_registro"]:
+        estado["placar"]["wins"] = 0
+        estado["placar"]["losses"] = 0
+        estado["placar"]["hora_registro"] = hora_agora
 
     # ✅ normaliza hora (pega data.hora ou data.horario)
     hora_ok = _normalizar_hora_payload(data.hora, data.horario)
@@ -300,19 +572,22 @@ async def update_status(data: PedraPayload):
     if data.mensagem:
         msg = data.mensagem.upper()
         if "WIN" in msg or "GREEN" in msg:
-            estado_atual["placar"]["wins"] += 1
+            estado["placar"]["wins"] += 1
             resultado = "WIN"
         elif "LOSS" in msg:
-            estado_atual["placar"]["losses"] += 1
+            estado["placar"]["losses"] += 1
             resultado = "LOSS"
 
-    estado_atual["id"] = novo_id
-    estado_atual["numero"] = data.numero
-    estado_atual["cor"] = data.cor
-    estado_atual["hora"] = hora_ok
-    estado_atual["mensagem"] = data.mensagem if data.mensagem else None
+    estado["id"] = novo_id
+    estado["seq"] += 1
+    estado["numero"] = data.numero
+    estado["cor"] = data.cor
+    estado["hora"] = hora_ok
+    estado["mensagem"] = data.mensagem if data.mensagem else None
+    estado["analise"] = _analise_da_origem(data.origem).registrar(_cor_da_rodada(data.numero, data.cor))
 
     nova_entrada = {
+        "seq": estado["seq"],
         "numero": data.numero,
         "cor": data.cor,
         "hora": hora_ok,
@@ -320,11 +595,19 @@ async def update_status(data: PedraPayload):
         "timestamp_recebimento": novo_id
     }
 
-    estado_atual["historico"].insert(0, nova_entrada)
-    estado_atual["historico"] = estado_atual["historico"][:120]
+    estado["historico"].insert(0, nova_entrada)
+    estado["historico"] = estado["historico"][:HISTORICO_MAX]
+    _snapshot_ctl["versao"] += 1
+
+    hub.publicar(_canal_status(data.origem), {
+        "tipo": "rodada",
+        "rodada": nova_entrada,
+        "placar": estado["placar"],
+        "analise": estado["analise"],
+    })
 
-    if resultado:
-        salvar_resultado_db(
+    if resultado and _eh_origem_padrao(data.origem):
+        rodada_id, commit_em = rodadas.salvar_rodada(
             data.numero,
             data.cor,
             hora_ok,
@@ -332,25 +615,116 @@ async def update_status(data: PedraPayload):
             novo_id,
             resultado
         )
+        ROUND_ACK_TO_COMMIT.observe(max(0.0, commit_em - novo_id))
+        consultas_ao_vivo.rodada(rodada_id, rodadas.data_hora_real(novo_id), resultado)
+
+    # agendas por usuário: índice invertido minuto -> usuários, O(inscritos)
+    inscritos = usuarios_no_minuto(minuto_do_dia(hora_ok))
+    SCHEDULE_FANOUT_USERS.observe(len(inscritos))
+
+    return {
+        "status": "recebido",
+        "id_gerado": novo_id,
+        "seq": estado["seq"],
+        "hora_normalizada": hora_ok,
+        "inscritos_no_horario": len(inscritos),
+    }
 
-    return {"status": "recebido", "id_gerado": novo_id, "hora_normalizada": hora_ok}
+async def _ingerir_rodada(payload: dict) -> dict:
+    """Entrada do scraper embutido: mesma ingestão do POST, sem HTTP."""
+    return await update_status(PedraPayload(**payload))
 
 @app.get("/results/historico")
-def get_historico():
-    return estado_atual["historico"]
+def get_historico(origem: Optional[str] = None, since: Optional[int] = Query(default=None, ge=0)):
+    """Sem since: a lista completa. Com since: {"seq", "resync", "rodadas"}."""
+    estado = _estado_da_origem(origem)
+    if estado is None:
+        raise HTTPException(status_code=404, detail="Origem desconhecida")
+    if since is None:
+        return estado["historico"]
+    return _historico_desde(estado, since)
+
+@app.get("/metrics")
+def metrics():
+    return Response(content=render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+# =========================
+#  DEBUG (PERFORMANCE)
+# =========================
+def _exigir_debug():
+    if not DEBUG_ENDPOINT:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+@app.get("/debug/perf")
+def debug_perf():
+    _exigir_debug()
+    relatorio = perf_report()
+    relatorio["inicializacao"] = inicializacao
+    relatorio["admissao"] = estado_admissao()
+    return relatorio
+
+@app.get("/debug/perf/profile")
+def debug_perf_profile(
+    segundos: float = Query(default=5.0, gt=0, le=60),
+    intervalo_ms: float = Query(default=5.0, ge=1, le=1000),
+    top: int = Query(default=30, ge=1, le=500),
+):
+    _exigir_debug()
+    try:
+        return sample_stacks(segundos, intervalo_ms / 1000, top)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/origens")
+def listar_origens():
+    return {"padrao": ORIGEM_PADRAO, "origens": [ORIGEM_PADRAO] + sorted(estados_por_origem)}
 
 # =========================
 #  HISTÓRICO AVANÇADO
 # =========================
+def _campos_ou_400(fields: Optional[str], permitidos) -> Optional[List[str]]:
+    try:
+        return parse_fields(fields, permitidos)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _com_chave(campos: Optional[List[str]], chave: str) -> Optional[List[str]]:
+    """No formato colunar as listas derivadas referenciam a linha pela chave: ela sempre vai."""
+    if campos is None or chave in campos:
+        return campos
+    return [chave] + campos
+
+def _resumo_horarios(horarios: List[dict], campos: Optional[List[str]], formato: str, **derivadas: List[dict]) -> dict:
+    """
+    objetos: cada lista com os dicts (projetados).
+    colunas: a tabela vai uma vez em "horarios"; as listas derivadas viram
+    listas de "horario" que apontam para as linhas dela.
+    """
+    if formato == "colunas":
+        campos = _com_chave(campos, "horario")
+        saida = {"horarios": colunar(horarios, campos or rodadas.CAMPOS_ESTATISTICA)}
+        saida.update({nome: [h["horario"] for h in lista] for nome, lista in derivadas.items()})
+        return saida
+    return {nome: projetar(lista, campos) for nome, lista in derivadas.items()}
+
 @app.post("/historico/filtrado")
-def get_historico_filtrado_route(filtro: FiltroHistoricoPayload):
-    resultados = obter_historico_filtrado(
-        data_inicio=filtro.data_inicio,
-        data_fim=filtro.data_fim,
-        hora_inicio=filtro.hora_inicio,
-        hora_fim=filtro.hora_fim,
-        tipo_resultado=filtro.tipo_resultado
-    )
+def get_historico_filtrado_route(
+    filtro: FiltroHistoricoPayload,
+    fields: Optional[str] = Query(default=None, description="colunas, ex.: hora,cor,resultado"),
+    formato: str = Query(default=FORMATO_PADRAO, pattern=FORMATO_PATTERN),
+):
+    campos = _campos_ou_400(fields, rodadas.CAMPOS_HISTORICO)
+    try:
+        resultados = rodadas.historico_filtrado(
+            data_inicio=filtro.data_inicio,
+            data_fim=filtro.data_fim,
+            hora_inicio=filtro.hora_inicio,
+            hora_fim=filtro.hora_fim,
+            tipo_resultado=filtro.tipo_resultado,
+            campos=campos,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     total = len(resultados)
     wins = sum(1 for r in resultados if r['resultado'] == 'WIN')
@@ -361,12 +735,17 @@ def get_historico_filtrado_route(filtro: FiltroHistoricoPayload):
         "wins": wins,
         "losses": losses,
         "taxa_acerto": round((wins / total * 100) if total > 0 else 0, 2),
-        "resultados": resultados
+        "resultados": formatar_lista(resultados, campos, rodadas.CAMPOS_HISTORICO, formato)
     }
 
 @app.get("/estatisticas/por-horario")
-def get_estatisticas_por_horario_route(dias: int = Query(default=30, ge=1, le=365)):
-    estatisticas = obter_estatisticas_por_horario(dias)
+def get_estatisticas_por_horario_route(
+    dias: int = Query(default=30, ge=1, le=365),
+    fields: Optional[str] = Query(default=None, description="ex.: horario,taxa_acerto"),
+    formato: str = Query(default=FORMATO_PADRAO, pattern=FORMATO_PATTERN),
+):
+    campos = _campos_ou_400(fields, rodadas.CAMPOS_ESTATISTICA)
+    estatisticas = rodadas.estatisticas_por_horario(dias)
 
     total_wins = sum(e['wins'] for e in estatisticas)
     total_losses = sum(e['losses'] for e in estatisticas)
@@ -378,14 +757,17 @@ def get_estatisticas_por_horario_route(dias: int = Query(default=30, ge=1, le=36
         "total_wins": total_wins,
         "total_losses": total_losses,
         "taxa_acerto_geral": round((total_wins / total_geral * 100) if total_geral > 0 else 0, 2),
-        "estatisticas_por_horario": estatisticas
+        "estatisticas_por_horario": formatar_lista(estatisticas, campos, rodadas.CAMPOS_ESTATISTICA, formato)
     }
 
 @app.get("/analise/melhores-horarios")
 def get_melhores_horarios_route(
     dias: int = Query(default=30, ge=1, le=365),
-    min_jogadas: int = Query(default=5, ge=1)
+    min_jogadas: int = Query(default=5, ge=1),
+    fields: Optional[str] = Query(default=None, description="ex.: horario,losses,taxa_acerto"),
+    formato: str = Query(default=FORMATO_PADRAO, pattern=FORMATO_PATTERN),
 ):
+    campos = _campos_ou_400(fields, rodadas.CAMPOS_ESTATISTICA)
     horarios = obter_melhores_horarios(dias, min_jogadas)
     horarios_sem_loss = [h for h in horarios if h['losses'] == 0]
 
@@ -393,14 +775,23 @@ def get_melhores_horarios_route(
         "periodo_dias": dias,
         "min_jogadas": min_jogadas,
         "total_horarios_analisados": len(horarios),
-        "horarios_sem_loss": horarios_sem_loss,
-        "top_10_melhores": horarios[:10],
-        "todos_horarios": horarios
+        **_resumo_horarios(
+            horarios,
+            campos,
+            formato,
+            horarios_sem_loss=horarios_sem_loss,
+            top_10_melhores=horarios[:10],
+            todos_horarios=horarios,
+        ),
     }
 
 @app.get("/relatorio/30-dias")
-def get_relatorio_30_dias():
-    estatisticas = obter_estatisticas_por_horario(30)
+def get_relatorio_30_dias(
+    fields: Optional[str] = Query(default=None, description="ex.: horario,losses,taxa_acerto"),
+    formato: str = Query(default=FORMATO_PADRAO, pattern=FORMATO_PATTERN),
+):
+    campos = _campos_ou_400(fields, rodadas.CAMPOS_ESTATISTICA)
+    estatisticas = rodadas.estatisticas_por_horario(30)
     melhores = obter_melhores_horarios(30, min_jogadas=5)
 
     horarios_sem_loss = [h for h in melhores if h['losses'] == 0]
@@ -418,11 +809,68 @@ def get_relatorio_30_dias():
             "total_losses": total_losses,
             "taxa_acerto_geral": round((total_wins / total_geral * 100) if total_geral > 0 else 0, 2)
         },
-        "horarios_sem_loss": horarios_sem_loss,
-        "top_10_menor_loss": horarios_menor_loss,
-        "estatisticas_completas": estatisticas
+        **_resumo_horarios(
+            estatisticas,
+            campos,
+            formato,
+            horarios_sem_loss=horarios_sem_loss,
+            top_10_menor_loss=horarios_menor_loss,
+            estatisticas_completas=estatisticas,
+        ),
     }
 
+@app.post("/analise/lote")
+def analise_em_lote(
+    payload: AnaliseLotePayload,
+    formato: str = Query(default=FORMATO_PADRAO, pattern=FORMATO_PATTERN),
+):
+    """Várias consultas agregadas do dashboard com uma varredura só do histórico."""
+    lote = _modulo_tardio("app.services.analise_lote")
+    try:
+        return lote.analisar([lote.Consulta(**c.model_dump()) for c in payload.consultas], formato)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# =========================
+#  SIMULAÇÃO DE ESTRATÉGIAS (MONTE CARLO)
+# =========================
+@app.post("/simulacao/estrategias")
+def simular_estrategias(payload: SimulacaoPayload):
+    simulador = _modulo_tardio("app.services.simulador")
+    if not simulador.disponivel():
+        raise HTTPException(status_code=503, detail="Simulação indisponível: NumPy não instalado")
+    if not _linha_eh_horario_valido(payload.inicio):
+        raise HTTPException(status_code=400, detail="inicio deve ser HH:MM")
+
+    estrategias = []
+    for e in payload.estrategias:
+        horarios = e.horarios
+        if e.usar_horarios_configurados:
+            # mesma chave mestra do ao vivo: desativada = sem filtro de horário
+            horarios = horarios_state["horarios"] if horarios_state["ativo"] else []
+        estrategias.append(simulador.Estrategia(
+            cor=e.cor,
+            max_gales=e.max_gales,
+            aposta=e.aposta,
+            progressao=e.progressao,
+            horarios=_normalizar_lista_horarios(horarios),
+            nome=e.nome,
+        ))
+
+    try:
+        return simulador.simular(
+            estrategias,
+            simulacoes=payload.simulacoes,
+            rodadas=payload.rodadas,
+            banca_inicial=payload.banca_inicial,
+            seed=payload.seed,
+            intervalo_seg=payload.intervalo_seg,
+            inicio=payload.inicio,
+            bins=payload.bins,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # =========================
 #  HORÁRIOS (CHAVE MESTRA)
 # =========================
@@ -450,6 +898,25 @@ def configurar_horarios(payload: HorariosConfigPayload):
         "total": len(horarios_state["horarios"]),
     }
 
+@app.post("/horarios/otimizar")
+def otimizar_horarios(payload: OtimizadorHorariosPayload):
+    otimizador = _modulo_tardio("app.services.otimizador_horarios")
+    if not otimizador.disponivel():
+        raise HTTPException(status_code=503, detail="Otimizador indisponível: NumPy não instalado")
+
+    try:
+        resultado = otimizador.otimizar(**payload.model_dump(exclude={"aplicar"}))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if payload.aplicar:
+        horarios_state["horarios"] = _normalizar_lista_horarios(resultado["horarios"])
+        horarios_state["ativo"] = len(horarios_state["horarios"]) > 0
+        _save_horarios_state()
+    resultado["aplicado"] = payload.aplicar
+    resultado["ativo"] = bool(horarios_state["ativo"])
+    return resultado
+
 @app.post("/horarios/upload")
 async def upload_horarios(file: UploadFile = File(...)):
     if not file.filename.lower().endswith(".txt"):
@@ -487,3 +954,16 @@ def limpar_horarios():
     horarios_state["horarios"] = []
     _save_horarios_state()
     return {"status": "ok", "ativo": False, "horarios": [], "total": 0}
+
+# =========================
+#  ROTAS DE CONTA (usuários, carteira, apostas, eventos)
+# =========================
+# incluídas depois das rotas ao vivo: /events/status daqui continua valendo
+app.include_router(auth.router)
+app.include_router(users.router)
+app.include_router(wallet.router)
+app.include_router(bets.router)
+app.include_router(event.router)
+
+inicializacao["import_ms"] = round((time.perf_counter() - _BOOT_T0) * 1000, 2)
+STARTUP_SECONDS.set(time.perf_counter() - _BOOT_T0, fase="import")
@@ -0,0 +1,314 @@
+"""
+Junta os bancos antigos no banco único (DATABASE_URL).
+
+    python -m app.migrar_bancos
+    python -m app.migrar_bancos --historico app/historico_completo.db --legado historico.db --orm db.sqlite3
+
+- app/historico_completo.db: historico_resultados (sinais WIN/LOSS gravados pela API)
+- historico.db:              resultados (tabela órfã de uma versão anterior)
+- db.sqlite3:                users / events / results (e carteiras, se houver) do ORM
+
+Idempotente: cada origem copiada fica registrada em migracoes_aplicadas (por
+nome do arquivo + tabela, para valer também num checkout em outro diretório)
+e não é copiada de novo. Tabelas do destino com esquema antigo (ex.: bets/wallets em
+float) são renomeadas para <tabela>_legado_<epoch> e recriadas no esquema atual.
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, create_engine, insert, inspect, or_, select, text
+
+import app.models  # noqa: F401  registra todas as tabelas em Base.metadata
+from app.core.database import Base, engine
+from app.models.transaction import WalletTransaction
+from app.models.wallet import Wallet
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOTE = 10_000
+
+controle = Table(
+    "migracoes_aplicadas",
+    MetaData(),
+    Column("origem", String, primary_key=True),
+    Column("linhas", Integer, nullable=False),
+    Column("aplicada_em", Float, nullable=False),
+)
+
+
+def log(msg: str) -> None:
+    print(msg, flush=True)
+
+
+# =========================
+#  MAPEAMENTOS (linha de origem -> linha de destino)
+# =========================
+
+def _historico(row) -> dict:
+    return {
+        "numero": row["numero"],
+        "cor": row["cor"],
+        "hora": row["hora"],
+        "mensagem": row["mensagem"],
+        "timestamp_recebimento": row["timestamp_recebimento"],
+        "data_hora_real": row["data_hora_real"],
+        "resultado": row["resultado"],
+    }
+
+
+def _resultados_legado(row) -> dict:
+    # historico.db não tinha mensagem nem epoch: deriva da coluna data
+    data = str(row["data"] or "")[:19]
+    try:
+        ts = datetime.strptime(data, "%Y-%m-%d %H:%M:%S").timestamp()
+    except ValueError:
+        ts = None
+    return {
+        "numero": row["numero"],
+        "cor": row["cor"],
+        "hora": row["hora"],
+        "mensagem": None,
+        "timestamp_recebimento": ts,
+        "data_hora_real": data or None,
+        "resultado": row["resultado"],
+    }
+
+
+def _mesmas_colunas(*colunas) -> Callable[[dict], dict]:
+    return lambda row: {c: row[c] for c in colunas}
+
+
+def _datahora(valor) -> Optional[datetime]:
+    # o sqlite devolve DateTime como texto na leitura crua
+    if valor is None or isinstance(valor, datetime):
+        return valor
+    try:
+        return datetime.fromisoformat(str(valor))
+    except ValueError:
+        return None
+
+
+def _result(row) -> dict:
+    return {**_mesmas_colunas("id", "cor", "numero", "horario")(row), "criado_em": _datahora(row["criado_em"])}
+
+
+def _cents(valor) -> int:
+    return int(round((valor or 0) * 100))
+
+
+def _wallet_float(row) -> dict:
+    return {"user_id": row["user_id"], "balance_cents": _cents(row["balance"]), "tx_since_snapshot": 0}
+
+
+# tabela de destino -> (colunas exigidas na origem, mapeamento)
+COPIAS_ORM = {
+    "users": (("id", "username", "password", "is_admin"), _mesmas_colunas("id", "username", "password", "is_admin")),
+    "events": (("id", "status", "result"), _mesmas_colunas("id", "status", "result")),
+    "results": (("id", "cor", "numero", "horario", "criado_em"), _result),
+    "wallets": (("user_id", "balance"), _wallet_float),
+}
+
+
+# =========================
+#  CÓPIA
+# =========================
+
+def _ler(origem_engine, tabela: str) -> Iterator[list]:
+    with origem_engine.connect() as conn:
+        resultado = conn.execution_options(stream_results=True).execute(text(f'SELECT * FROM "{tabela}"'))
+        while True:
+            linhas = resultado.mappings().fetchmany(LOTE)
+            if not linhas:
+                return
+            yield linhas
+
+
+def _copiar(origem_engine, tabela_origem: str, destino: Table, mapear: Callable[[dict], dict]) -> int:
+    total = 0
+    with engine.begin() as conn:
+        for linhas in _ler(origem_engine, tabela_origem):
+            conn.execute(insert(destino), [mapear(r) for r in linhas])
+            total += len(linhas)
+    return total
+
+
+def _colunas(eng, tabela: str) -> Optional[set]:
+    insp = inspect(eng)
+    if not insp.has_table(tabela):
+        return None
+    return {c["name"] for c in insp.get_columns(tabela)}
+
+
+def _chave_arquivo(path: str, tabela: str) -> str:
+    return f"{os.path.basename(path)}:{tabela}"
+
+
+def _ja_aplicada(origem: str) -> bool:
+    # registros antigos usavam o caminho absoluto: /.../historico.db:resultados
+    with engine.connect() as conn:
+        return conn.execute(select(controle.c.origem).where(or_(
+            controle.c.origem == origem,
+            controle.c.origem.endswith("/" + origem, autoescape=True),
+            controle.c.origem.endswith("\\" + origem, autoescape=True),
+        ))).first() is not None
+
+
+def _registrar(origem: str, linhas: int) -> None:
+    with engine.begin() as conn:
+        conn.execute(insert(controle).values(origem=origem, linhas=linhas, aplicada_em=time.time()))
+
+
+def _mesmo_arquivo(path: str) -> bool:
+    url = engine.url
+    return url.get_backend_name() == "sqlite" and bool(url.database) and \
+        os.path.abspath(url.database) == os.path.abspath(path)
+
+
+# =========================
+#  ETAPAS
+# =========================
+
+def _renomear_esquemas_antigos() -> Dict[str, str]:
+    """Tabelas do destino sem alguma coluna do modelo viram <tabela>_legado."""
+    renomeadas = {}
+    for tabela in Base.metadata.sorted_tables:
+        existentes = _colunas(engine, tabela.name)
+        if existentes is None or {c.name for c in tabela.columns} <= existentes:
+            continue
+        legado = f"{tabela.name}_legado_{int(time.time())}"
+        with engine.begin() as conn:
+            conn.execute(text(f'ALTER TABLE "{tabela.name}" RENAME TO "{legado}"'))
+        renomeadas[tabela.name] = legado
+        log(f"🔁 {tabela.name}: esquema antigo renomeado para {legado}")
+    return renomeadas
+
+
+def _copiar_orm(origem_engine, nome_origem: str, tabelas: Dict[str, str]) -> int:
+    """tabelas: destino -> tabela na origem."""
+    total = 0
+    for destino, tabela_origem in tabelas.items():
+        chave = _chave_arquivo(nome_origem, tabela_origem)
+        existentes = _colunas(origem_engine, tabela_origem)
+        if existentes is None or _ja_aplicada(chave):
+            continue
+
+        if destino not in COPIAS_ORM:
+            with origem_engine.connect() as conn:
+                n = conn.execute(text(f'SELECT COUNT(*) FROM "{tabela_origem}"')).scalar()
+            if n:
+                log(f"⚠️ {chave}: {n} linhas sem mapeamento para o esquema atual (não copiadas)")
+            _registrar(chave, 0)
+            continue
+
+        exigidas, mapear = COPIAS_ORM[destino]
+        if not set(exigidas) <= existentes:
+            log(f"⚠️ {chave}: colunas {sorted(set(exigidas) - existentes)} ausentes (não copiada)")
+            continue
+
+        n = _copiar(origem_engine, tabela_origem, Base.metadata.tables[destino], mapear)
+        _registrar(chave, n)
+        total += n
+        log(f"✅ {chave} -> {destino}: {n} linhas")
+    return total
+
+
+def _abrir_carteiras() -> None:
+    """
+    Toda conta tem carteira; saldos vindos de float ganham um lançamento de
+    abertura no ledger para o reconcile bater.
+    """
+    wallets = Wallet.__table__
+    ledger = WalletTransaction.__table__
+    users = Base.metadata.tables["users"]
+    agora = datetime.utcnow()
+
+    with engine.begin() as conn:
+        conn.execute(insert(wallets).from_select(
+            ["user_id", "balance_cents", "tx_since_snapshot"],
+            select(users.c.id, text("0"), text("0"))
+            .where(~users.c.id.in_(select(wallets.c.user_id))),
+        ))
+        sem_ledger = conn.execute(
+            select(wallets.c.user_id, wallets.c.balance_cents)
+            .where(wallets.c.balance_cents > 0, ~wallets.c.user_id.in_(select(ledger.c.user_id)))
+        ).all()
+        if sem_ledger:
+            conn.execute(insert(ledger), [
+                {"user_id": uid, "amount_cents": saldo, "balance_after_cents": saldo,
+                 "type": "deposit", "created_at": agora}
+                for uid, saldo in sem_ledger
+            ])
+
+
+def migrar(historico_completo: str, historico_legado: str, orm_legado: str) -> dict:
+    t0 = time.perf_counter()
+    controle.create(engine, checkfirst=True)
+
+    renomeadas = _renomear_esquemas_antigos()
+    Base.metadata.create_all(engine)
+    for tabela in Base.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            indice.create(engine, checkfirst=True)
+
+    copiadas = 0
+    historico = Base.metadata.tables["historico_resultados"]
+
+    # tabelas do próprio destino que estavam no esquema antigo
+    if renomeadas:
+        copiadas += _copiar_orm(engine, "destino", renomeadas)
+
+    fontes = [
+        (historico_completo, "historico_resultados", _historico),
+        (historico_legado, "resultados", _resultados_legado),
+    ]
+    for path, tabela, mapear in fontes:
+        chave = _chave_arquivo(path, tabela)
+        if not os.path.exists(path) or _mesmo_arquivo(path) or _ja_aplicada(chave):
+            continue
+        origem = create_engine(f"sqlite:///{path}")
+        try:
+            if _colunas(origem, tabela) is None:
+                continue
+            n = _copiar(origem, tabela, historico, mapear)
+        finally:
+            origem.dispose()
+        _registrar(chave, n)
+        copiadas += n
+        log(f"✅ {path}:{tabela} -> historico_resultados: {n} linhas")
+
+    if os.path.exists(orm_legado) and not _mesmo_arquivo(orm_legado):
+        origem = create_engine(f"sqlite:///{orm_legado}")
+        try:
+            copiadas += _copiar_orm(
+                origem,
+                orm_legado,
+                {t.name: t.name for t in Base.metadata.sorted_tables if t.name != "historico_resultados"},
+            )
+        finally:
+            origem.dispose()
+
+    _abrir_carteiras()
+
+    return {
+        "destino": engine.url.render_as_string(hide_password=True),
+        "tabelas_renomeadas": renomeadas,
+        "linhas_copiadas": copiadas,
+        "segundos": round(time.perf_counter() - t0, 2),
+    }
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    ap = argparse.ArgumentParser(prog="python -m app.migrar_bancos")
+    ap.add_argument("--historico", default=os.path.join(BASE_DIR, "app", "historico_completo.db"))
+    ap.add_argument("--legado", default=os.path.join(BASE_DIR, "historico.db"))
+    ap.add_argument("--orm", default=os.path.join(BASE_DIR, "db.sqlite3"))
+    args = ap.parse_args(argv)
+
+    relatorio = migrar(args.historico, args.legado, args.orm)
+    log(f"💾 migração concluída: {relatorio}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,10 @@
 from .user import User
 from .event import Event
-from .bet import Bet
+from .bet import Bet, BetIdempotency
+from .wallet import Wallet, WalletSnapshot
+from .transaction import WalletTransaction
+from .exposure import EventExposure
+from .summary import WalletMonthlySummary
+from .historico import HistoricoResultado
+from .result import Result
+from .schedule import UserSchedule
@@ -1,15 +1,44 @@
-from sqlalchemy import Column, Integer, ForeignKey, Float
+from sqlalchemy import BigInteger, Boolean, Column, Index, Integer, ForeignKey, String
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
 class Bet(Base):
     __tablename__ = "bets"
+    __table_args__ = (
+        # liquidação agrega por (evento, usuário)
+        Index("ix_bets_event_user", "event_id", "user_id"),
+    )
 
     id = Column(Integer, primary_key=True)
-    amount = Column(Float, nullable=False)
+    amount_cents = Column(BigInteger, nullable=False)
+    possible_return_cents = Column(BigInteger, nullable=False)
+    color = Column(String, nullable=False)  # red | black | white
+    won = Column(Boolean, nullable=True)
 
     user_id = Column(Integer, ForeignKey("users.id"))
     event_id = Column(Integer, ForeignKey("events.id"))
 
     user = relationship("User", back_populates="bets")
     event = relationship("Event")
+
+    @property
+    def amount(self) -> float:
+        return self.amount_cents / 100
+
+    @property
+    def possible_return(self) -> float:
+        return self.possible_return_cents / 100
+
+
+class BetIdempotency(Base):
+    """
+    Chave de idempotência do cliente -> aposta gravada. Gravada na mesma
+    transação da aposta: a repetição com a mesma chave devolve a aposta
+    existente em vez de debitar de novo. Tabela à parte para não mexer no
+    esquema de bets (o migrar_bancos renomearia a tabela para _legado).
+    """
+    __tablename__ = "bet_idempotency"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    chave = Column(String(128), primary_key=True)
+    bet_id = Column(Integer, ForeignKey("bets.id"), nullable=False)
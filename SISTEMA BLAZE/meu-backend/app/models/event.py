@@ -5,5 +5,9 @@ class Event(Base):
     __tablename__ = "events"
 
     id = Column(Integer, primary_key=True)
-    status = Column(String, default="open")
+    status = Column(String, default="open", index=True)
     result = Column(String, nullable=True)
+
+    @property
+    def is_open(self) -> bool:
+        return self.status == "open"
@@ -0,0 +1,12 @@
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer, String
+from app.core.database import Base
+
+class EventExposure(Base):
+    """Totais por (evento, cor), atualizados na mesma transação que grava as apostas."""
+    __tablename__ = "event_exposure"
+
+    event_id = Column(Integer, ForeignKey("events.id"), primary_key=True)
+    color = Column(String, primary_key=True)
+    stake_cents = Column(BigInteger, nullable=False, default=0)
+    payout_cents = Column(BigInteger, nullable=False, default=0)
+    bets = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Float, Index, Integer, String
+from app.core.database import Base
+
+class HistoricoResultado(Base):
+    """Sinais recebidos em /update_status com resultado WIN/LOSS."""
+    __tablename__ = "historico_resultados"
+    __table_args__ = (
+        # filtros por período + agregação por resultado sem ler a tabela
+        Index("ix_historico_data_resultado", "data_hora_real", "resultado"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    numero = Column(Integer)
+    cor = Column(String)
+    hora = Column(String)
+    mensagem = Column(String)
+    timestamp_recebimento = Column(Float)
+    data_hora_real = Column(String)  # "YYYY-MM-DD HH:MM:SS" (ordena como texto)
+    resultado = Column(String)
@@ -0,0 +1,17 @@
+from datetime import datetime
+
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, LargeBinary
+from sqlalchemy.orm import relationship
+from app.core.database import Base
+
+class UserSchedule(Base):
+    """Minutos do dia (00:00-23:59) em que o usuário aceita entradas."""
+    __tablename__ = "user_schedules"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    active = Column(Boolean, nullable=False, default=False)
+    # bitmap de 1440 bits (bit m = minuto m do dia), 180 bytes little-endian
+    minutes = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    user = relationship("User", back_populates="schedule")
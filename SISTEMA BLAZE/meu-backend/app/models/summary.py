@@ -0,0 +1,14 @@
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer, String
+from app.core.database import Base
+
+class WalletMonthlySummary(Base):
+    """Totais do extrato por usuário e mês (YYYY-MM), somados a cada lançamento."""
+    __tablename__ = "wallet_monthly_summary"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    month = Column(String(7), primary_key=True)
+    deposits_cents = Column(BigInteger, nullable=False, default=0)
+    bets_cents = Column(BigInteger, nullable=False, default=0)
+    wins_cents = Column(BigInteger, nullable=False, default=0)
+    net_cents = Column(BigInteger, nullable=False, default=0)
+    transactions = Column(Integer, nullable=False, default=0)
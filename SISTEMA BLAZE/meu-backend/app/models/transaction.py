@@ -1,13 +1,31 @@
-from sqlalchemy import Column, Integer, Float, String, ForeignKey, DateTime
+from sqlalchemy import BigInteger, Column, Index, Integer, String, ForeignKey, DateTime, event
 from datetime import datetime
 from app.core.database import Base
 
 class WalletTransaction(Base):
+    """Ledger append-only: cada linha é um lançamento; nunca é alterada nem apagada."""
     __tablename__ = "wallet_transactions"
+    __table_args__ = (
+        # snapshot/reconcile: último lançamento e lançamentos após um id, por usuário
+        Index("ix_wallet_transactions_user_id_id", "user_id", "id"),
+        # extrato paginado por keyset (mais recentes primeiro)
+        Index("ix_wallet_transactions_user_created_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True)
-    amount = Column(Float, nullable=False)
+    amount_cents = Column(BigInteger, nullable=False)  # positivo = crédito, negativo = débito
+    balance_after_cents = Column(BigInteger, nullable=False)
     type = Column(String, nullable=False)  # deposit | bet | win
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    @property
+    def amount(self) -> float:
+        return self.amount_cents / 100
+
+
+@event.listens_for(WalletTransaction, "before_update")
+@event.listens_for(WalletTransaction, "before_delete")
+def _ledger_append_only(mapper, connection, target):
+    raise ValueError("Ledger da carteira é append-only")
@@ -11,3 +11,5 @@ class User(Base):
     is_admin = Column(Boolean, default=False)
 
     bets = relationship("Bet", back_populates="user")
+    wallet = relationship("Wallet", back_populates="user", uselist=False)
+    schedule = relationship("UserSchedule", back_populates="user", uselist=False)
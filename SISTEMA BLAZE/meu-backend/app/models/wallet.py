@@ -1,12 +1,34 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey
+from sqlalchemy import BigInteger, CheckConstraint, Column, DateTime, ForeignKey, Integer
 from sqlalchemy.orm import relationship
+from datetime import datetime
 from app.core.database import Base
 
 class Wallet(Base):
     __tablename__ = "wallets"
+    __table_args__ = (
+        CheckConstraint("balance_cents >= 0", name="ck_wallets_balance_nonneg"),
+    )
 
     id = Column(Integer, primary_key=True)
-    balance = Column(Float, default=0.0)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    # saldo em centavos: só muda por UPDATE condicional em wallet_service
+    balance_cents = Column(BigInteger, nullable=False, default=0)
+    # lançamentos desde o último snapshot (dispara o próximo)
+    tx_since_snapshot = Column(Integer, nullable=False, default=0)
+    user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
 
     user = relationship("User", back_populates="wallet")
+
+    @property
+    def balance(self) -> float:
+        return (self.balance_cents or 0) / 100
+
+
+class WalletSnapshot(Base):
+    """Saldo consolidado até um lançamento do ledger (last_tx_id)."""
+    __tablename__ = "wallet_snapshots"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    balance_cents = Column(BigInteger, nullable=False)
+    last_tx_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,250 @@
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import case, func, insert, select
+
+from app.core.database import Base, engine
+from app.models.historico import HistoricoResultado
+from app.models.result import Result
+
+# Repositório único de rodadas sobre o engine de app.core.database.
+# Consultas Core com projeção de colunas (linhas -> dict), sem hidratar ORM.
+# Datas ficam como texto "YYYY-MM-DD HH:MM:SS": filtros por período comparam
+# o texto direto (usa o índice) e a hora sai de substr, que SQLite e
+# PostgreSQL entendem igual.
+
+historico = HistoricoResultado.__table__
+results = Result.__table__
+
+COLUNAS_HISTORICO = (
+    historico.c.id,
+    historico.c.numero,
+    historico.c.cor,
+    historico.c.hora,
+    historico.c.mensagem,
+    historico.c.timestamp_recebimento,
+    historico.c.data_hora_real,
+    historico.c.resultado,
+)
+CAMPOS_HISTORICO = tuple(c.name for c in COLUNAS_HISTORICO)
+
+
+def init_schema() -> None:
+    """Cria tabelas e índices das rodadas (índices também em bases já existentes)."""
+    Base.metadata.create_all(engine, tables=[historico, results])
+    for tabela in (historico, results):
+        for indice in tabela.indexes:
+            indice.create(engine, checkfirst=True)
+
+
+# =========================
+#  ESCRITA
+# =========================
+
+def data_hora_real(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def salvar_rodada(numero, cor, hora, mensagem, timestamp, resultado) -> Tuple[int, float]:
+    """Grava um sinal no histórico; retorna (id da linha, instante epoch do commit)"""
+    with engine.begin() as conn:
+        linha = conn.execute(insert(historico).values(
+            numero=numero,
+            cor=cor,
+            hora=hora,
+            mensagem=mensagem,
+            timestamp_recebimento=timestamp,
+            data_hora_real=data_hora_real(timestamp),
+            resultado=resultado,
+        ))
+    return linha.inserted_primary_key[0], time.time()
+
+
+# =========================
+#  LEITURA
+# =========================
+
+def _dia_seguinte(data: str) -> str:
+    try:
+        dia = datetime.strptime(data, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError("Data inválida, use YYYY-MM-DD")
+    return (dia + timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def historico_filtrado(
+    data_inicio=None,
+    data_fim=None,
+    hora_inicio=None,
+    hora_fim=None,
+    tipo_resultado=None,
+    campos: Optional[Sequence[str]] = None,
+) -> List[dict]:
+    """
+    Histórico por período e/ou horário do dia, mais recentes primeiro.
+    `campos` restringe as colunas lidas do banco (resultado sempre vem).
+    """
+    if campos:
+        pedidos = set(campos) | {"resultado"}
+        consulta = select(*(c for c in COLUNAS_HISTORICO if c.name in pedidos))
+    else:
+        consulta = select(*COLUNAS_HISTORICO)
+
+    consulta = _filtrar(consulta, data_inicio, data_fim, hora_inicio, hora_fim, tipo_resultado)
+
+    # data_hora_real vem do próprio timestamp: ordenar por ela primeiro percorre
+    # o índice do filtro de período em vez de varrer a tabela pelo timestamp
+    consulta = consulta.order_by(
+        historico.c.data_hora_real.desc(),
+        historico.c.timestamp_recebimento.desc(),
+    )
+
+    with engine.connect() as conn:
+        return [dict(row) for row in conn.execute(consulta).mappings()]
+
+
+def _filtrar(consulta, data_inicio, data_fim, hora_inicio, hora_fim, tipo_resultado):
+    if data_inicio:
+        consulta = consulta.where(historico.c.data_hora_real >= data_inicio)
+
+    if data_fim:
+        consulta = consulta.where(historico.c.data_hora_real < _dia_seguinte(data_fim))
+
+    if hora_inicio and hora_fim:
+        consulta = consulta.where(
+            func.substr(historico.c.data_hora_real, 12, 8).between(hora_inicio + ":00", hora_fim + ":59")
+        )
+
+    if tipo_resultado:
+        if tipo_resultado.lower() == 'win':
+            consulta = consulta.where(historico.c.resultado == 'WIN')
+        elif tipo_resultado.lower() == 'loss':
+            consulta = consulta.where(historico.c.resultado == 'LOSS')
+
+    return consulta
+
+
+def totais_filtrados(
+    data_inicio=None,
+    data_fim=None,
+    hora_inicio=None,
+    hora_fim=None,
+    tipo_resultado=None,
+    ate_id: Optional[int] = None,
+) -> dict:
+    """Total/wins/losses do mesmo filtro do histórico, só agregando (até a linha `ate_id`)."""
+    consulta = select(
+        func.count().label("total"),
+        func.coalesce(func.sum(case((historico.c.resultado == 'WIN', 1), else_=0)), 0).label("wins"),
+        func.coalesce(func.sum(case((historico.c.resultado == 'LOSS', 1), else_=0)), 0).label("losses"),
+    )
+    consulta = _filtrar(consulta, data_inicio, data_fim, hora_inicio, hora_fim, tipo_resultado)
+    if ate_id is not None:
+        consulta = consulta.where(historico.c.id <= ate_id)
+
+    with engine.connect() as conn:
+        row = conn.execute(consulta).one()
+    return {"total": row.total, "wins": row.wins, "losses": row.losses}
+
+
+def ultimo_id() -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(func.coalesce(func.max(historico.c.id), 0))).scalar()
+
+
+CAMPOS_ESTATISTICA = ("horario", "wins", "losses", "total", "taxa_acerto")
+
+
+def estatisticas_por_horario(dias: int = 30) -> List[dict]:
+    """Win/Loss agrupados pela hora do dia nos últimos N dias"""
+    data_limite = (datetime.now() - timedelta(days=dias)).strftime("%Y-%m-%d")
+    hora = func.substr(historico.c.data_hora_real, 12, 2).label("hora")
+
+    consulta = (
+        select(
+            hora,
+            func.sum(case((historico.c.resultado == 'WIN', 1), else_=0)).label("wins"),
+            func.sum(case((historico.c.resultado == 'LOSS', 1), else_=0)).label("losses"),
+            func.count().label("total"),
+        )
+        .where(
+            historico.c.data_hora_real >= data_limite,
+            historico.c.resultado.in_(('WIN', 'LOSS')),
+        )
+        .group_by(hora)
+        .order_by(hora)
+    )
+
+    with engine.connect() as conn:
+        linhas = conn.execute(consulta).all()
+
+    return [
+        {
+            'horario': f"{int(row.hora):02d}:00",
+            'wins': row.wins,
+            'losses': row.losses,
+            'total': row.total,
+            'taxa_acerto': round((row.wins / row.total * 100) if row.total > 0 else 0, 2),
+        }
+        for row in linhas
+    ]
+
+
+def contagens_por_minuto(desde: str, ate: Optional[str] = None) -> List[tuple]:
+    """("YYYY-MM-DD HH:MM", wins, losses) com data_hora_real em [desde, ate)."""
+    # uma chave só (prefixo de data_hora_real) agrupa bem mais rápido que (dia, minuto)
+    minuto = func.substr(historico.c.data_hora_real, 1, 16).label("minuto")
+
+    consulta = (
+        select(
+            minuto,
+            func.sum(case((historico.c.resultado == 'WIN', 1), else_=0)).label("wins"),
+            func.sum(case((historico.c.resultado == 'LOSS', 1), else_=0)).label("losses"),
+        )
+        .where(
+            historico.c.data_hora_real >= desde,
+            historico.c.resultado.in_(('WIN', 'LOSS')),
+        )
+        .group_by(minuto)
+    )
+    if ate:
+        consulta = consulta.where(historico.c.data_hora_real < ate)
+
+    with engine.connect() as conn:
+        return conn.execute(consulta).all()
+
+
+def cubo_historico(
+    desde: Optional[str] = None,
+    ate: Optional[str] = None,
+    extras: Sequence[str] = (),
+    granularidade: int = 16,
+) -> List[tuple]:
+    """
+    Uma varredura de [desde, ate): (período, resultado, *extras, n). O período
+    é o prefixo de data_hora_real com `granularidade` caracteres (10 = dia,
+    13 = hora, 16 = minuto); `extras` são colunas a mais no agrupamento.
+    """
+    periodo = func.substr(historico.c.data_hora_real, 1, granularidade).label("periodo")
+    chaves = [periodo, historico.c.resultado] + [historico.c[nome] for nome in extras]
+
+    consulta = select(*chaves, func.count().label("n")).group_by(*chaves)
+    if desde:
+        consulta = consulta.where(historico.c.data_hora_real >= desde)
+    if ate:
+        consulta = consulta.where(historico.c.data_hora_real < ate)
+
+    with engine.connect() as conn:
+        return conn.execute(consulta).all()
+
+
+def listar_resultados(limite: int, antes_id: Optional[int] = None) -> List[dict]:
+    """Resultados do jogo (tabela results), do mais novo para o mais antigo"""
+    consulta = select(results.c.id, results.c.cor, results.c.numero, results.c.horario, results.c.criado_em)
+    if antes_id is not None:
+        consulta = consulta.where(results.c.id < antes_id)
+    consulta = consulta.order_by(results.c.id.desc()).limit(limite)
+
+    with engine.connect() as conn:
+        return [dict(row) for row in conn.execute(consulta).mappings()]
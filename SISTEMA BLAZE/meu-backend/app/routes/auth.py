@@ -1,39 +1,67 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.deps import get_async_db
 from app.models.user import User
 from app.models.wallet import Wallet
 from app.schemas.user import UserCreate
 from app.schemas.auth import Token
-from app.core.security import hash_password, verify_password, create_access_token
+from app.core.security import (
+    BcryptBusy,
+    create_access_token,
+    hash_password_async,
+    verify_password_async,
+)
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
-@router.post("/register", response_model=Token)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
-    if db.query(User).filter(User.username == user_data.username).first():
-        raise HTTPException(status_code=400, detail="Usuário já existe")
+# bcrypt roda no pool de processos e o banco na sessão async: nem o hash
+# nem a consulta prendem threads do threadpool durante um pico de logins
 
-    user = User(
-        username=user_data.username,
-        password=hash_password(user_data.password)
+def _busy():
+    return HTTPException(
+        status_code=503,
+        detail="Muitas autenticações em andamento, tente novamente",
+        headers={"Retry-After": "1"},
     )
+
+async def _find_user(db: AsyncSession, username: str):
+    return await db.scalar(select(User).where(User.username == username).limit(1))
+
+async def _create_user(db: AsyncSession, username: str, hashed: str) -> User:
+    user = User(username=username, password=hashed)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.flush()
+
+    db.add(Wallet(user_id=user.id, balance_cents=0))
+    await db.commit()
+    return user
 
-    wallet = Wallet(user_id=user.id, balance=0.0)
-    db.add(wallet)
-    db.commit()
+@router.post("/register", response_model=Token)
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    if await _find_user(db, user_data.username):
+        raise HTTPException(status_code=400, detail="Usuário já existe")
+
+    try:
+        hashed = await hash_password_async(user_data.password)
+    except BcryptBusy:
+        raise _busy()
+
+    user = await _create_user(db, user_data.username, hashed)
 
     token = create_access_token({"sub": str(user.id)})
     return {"access_token": token}
 
 @router.post("/login", response_model=Token)
-def login(user_data: UserCreate, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == user_data.username).first()
+async def login(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    user = await _find_user(db, user_data.username)
+
+    try:
+        ok = bool(user) and await verify_password_async(user_data.password, user.password)
+    except BcryptBusy:
+        raise _busy()
 
-    if not user or not verify_password(user_data.password, user.password):
+    if not ok:
         raise HTTPException(status_code=401, detail="Credenciais inválidas")
 
     token = create_access_token({"sub": str(user.id)})
@@ -1,40 +1,106 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import asyncio
+from typing import Optional
+from uuid import uuid4
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Path
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import jwt, JWTError
 from fastapi.security import OAuth2PasswordBearer
-from app.core.database import get_db
+from app.core.database import AsyncSessionLocal
+from app.core.deps import get_async_db
 from app.core.config import settings
+from app.core.auth_cache import CurrentUser, cache_token, cache_user, cached_user, cached_user_id
 from app.models.user import User
 from app.models.event import Event
-from app.services.bet_service import place_bet
+from app.services.bet_service import EventoNaoEncontrado, get_bet_batcher, get_bet_by_key, place_bet
 from app.schemas.bet import BetCreate, BetResponse
 
 router = APIRouter(prefix="/bets", tags=["Bets"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-):
+def _decode_user_id(token: str) -> int:
+    user_id = cached_user_id(token)
+    if user_id is not None:
+        return user_id
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
         user_id = int(payload.get("sub"))
-    except JWTError:
+    except (JWTError, TypeError, ValueError):
         raise HTTPException(status_code=401, detail="Token inválido")
 
-    user = db.query(User).get(user_id)
-    if not user:
-        raise HTTPException(status_code=401, detail="Usuário não encontrado")
-    return user
+    cache_token(token, user_id, payload.get("exp"))
+    return user_id
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> CurrentUser:
+    """
+    Token e usuário vêm do cache (TTL/LRU); o banco só é consultado no miss.
+    Não depende de get_async_db: requisição autenticada com cache quente não abre sessão.
+    """
+    user_id = _decode_user_id(token)
+
+    user = cached_user(user_id)
+    if user:
+        return user
+
+    async with AsyncSessionLocal() as db:
+        db_user = await db.get(User, user_id)
+        if not db_user:
+            raise HTTPException(status_code=401, detail="Usuário não encontrado")
+        return cache_user(db_user)
 
 @router.post("/", response_model=BetResponse)
-def create_bet(
+async def create_bet(
     data: BetCreate,
+    idempotency_key: Optional[str] = Header(default=None, max_length=128),
     user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    event = db.query(Event).get(data.event_id)
-    if not event:
-        raise HTTPException(status_code=404, detail="Evento não encontrado")
+    """
+    Header Idempotency-Key opcional: repetir a requisição com a mesma chave
+    devolve a aposta já gravada em vez de debitar de novo.
+    """
+    try:
+        if settings.BET_BATCH_ENABLED:
+            # validação de evento/saldo acontece no lote; aqui só espera o
+            # resultado, sem segurar uma thread do threadpool. Sem chave do
+            # cliente gera uma, para o 202 ter o que consultar.
+            chave = idempotency_key or uuid4().hex
+            future = get_bet_batcher().submit(user.id, data.event_id, data.color, data.amount, chave)
+            try:
+                # shield: o timeout não pode cancelar o future por baixo
+                return await asyncio.wait_for(
+                    asyncio.shield(asyncio.wrap_future(future)), settings.BET_BATCH_TIMEOUT_SEC
+                )
+            except asyncio.TimeoutError:
+                if future.cancel():
+                    # ainda na fila: saiu sem gravar nada, pode repetir
+                    raise HTTPException(status_code=503, detail="Apostas congestionadas, tente novamente")
+                # já em gravação: o resultado sai por GET /bets/chave/{chave}
+                return JSONResponse(
+                    status_code=202,
+                    content={"detail": "Aposta em processamento", "idempotency_key": chave},
+                    headers={"Location": f"/bets/chave/{chave}"},
+                )
+
+        event = await db.get(Event, data.event_id)
+        if not event:
+            raise HTTPException(status_code=404, detail="Evento não encontrado")
+        return await db.run_sync(place_bet, user, event, data.amount, data.color, idempotency_key)
+    except EventoNaoEncontrado as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    return place_bet(db, user, event, data.amount)
+@router.get("/chave/{chave}", response_model=BetResponse)
+async def bet_by_key(
+    chave: str = Path(..., max_length=128),
+    user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Aposta gravada com a chave de idempotência (consulta depois de um 202)."""
+    bet = await db.run_sync(get_bet_by_key, user.id, chave)
+    if not bet:
+        raise HTTPException(status_code=404, detail="Aposta não encontrada")
+    return bet
@@ -1,35 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import Optional
 
-from app.core.deps import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.deps import get_async_db
+from app.core.pagination import LIMITE_MAXIMO, LIMITE_PADRAO, NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
 from app.models.event import Event
+from app.routes.dependencies import admin_only
 from app.schemas.event import EventCreate, EventResponse
+from app.schemas.bet import ExposureResponse
+from app.services.bet_service import get_exposure
+from app.services.event_service import resolve_event
 from app.core.game import sortear_resultado
 from app.core.state import ultimo_resultado
 
 router = APIRouter(prefix="/events", tags=["Events"])
 
+# abrir/encerrar evento movimenta carteiras e a exposição mostra o risco da
+# casa: só admin. /status e a listagem continuam públicos.
+
 @router.get("/status")
 def status_atual():
     return ultimo_resultado
 
 @router.post("/", response_model=EventResponse)
-def create_event(_: EventCreate, db: Session = Depends(get_db)):
-    open_event = db.query(Event).filter(Event.status == "open").first()
+async def create_event(_: EventCreate, __=Depends(admin_only), db: AsyncSession = Depends(get_async_db)):
+    open_event = await db.scalar(select(Event).where(Event.status == "open").limit(1))
 
     if open_event:
         raise HTTPException(status_code=400, detail="Já existe um evento aberto")
 
     event = Event(status="open", result=None)
     db.add(event)
-    db.commit()
-    db.refresh(event)
+    await db.commit()
+    await db.refresh(event)
 
     return event
 
 @router.post("/{event_id}/finish", response_model=EventResponse)
-def finish_event(event_id: int, db: Session = Depends(get_db)):
-    event = db.query(Event).filter(Event.id == event_id).first()
+async def finish_event(event_id: int, _=Depends(admin_only), db: AsyncSession = Depends(get_async_db)):
+    event = await db.get(Event, event_id)
 
     if not event:
         raise HTTPException(status_code=404, detail="Evento não encontrado")
@@ -37,14 +48,32 @@ def finish_event(event_id: int, db: Session = Depends(get_db)):
     if event.status != "open":
         raise HTTPException(status_code=400, detail="Evento não está aberto")
 
-    event.result = sortear_resultado()
-    event.status = "finished"
-
-    db.commit()
-    db.refresh(event)
+    try:
+        await db.run_sync(resolve_event, event, sortear_resultado())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+    await db.refresh(event)
     return event
 
+@router.get("/{event_id}/exposure", response_model=ExposureResponse)
+async def event_exposure(event_id: int, _=Depends(admin_only), db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(get_exposure, event_id)
+
 @router.get("/", response_model=list[EventResponse])
-def list_events(db: Session = Depends(get_db)):
-    return db.query(Event).order_by(Event.id.asc()).all()
+async def list_events(
+    response: Response,
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    query = select(Event)
+    if cursor:
+        (after_id,) = decode_cursor(cursor, 1)
+        query = query.where(Event.id > after_id)
+
+    events = (await db.scalars(query.order_by(Event.id.asc()).limit(limit + 1))).all()
+    if len(events) > limit:
+        events = events[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(events[-1].id)
+    return events
@@ -1,7 +1,9 @@
-from fastapi import APIRouter
+from typing import Optional
+
+from fastapi import APIRouter, Query, Response
+from app.core.pagination import LIMITE_MAXIMO, LIMITE_PADRAO, NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
 from app.core.state import ultimo_resultado, ultimos_60
-from app.core.database import SessionLocal
-from app.models.result import Result
+from app.repositories import rounds as rodadas
 
 router = APIRouter(prefix="/results", tags=["Results"])
 
@@ -14,8 +16,14 @@ def ultimos():
     return list(ultimos_60)
 
 @router.get("/historico")
-def historico():
-    db = SessionLocal()
-    data = db.query(Result).order_by(Result.id.desc()).all()
-    db.close()
+def historico(
+    response: Response,
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+):
+    antes_id = decode_cursor(cursor, 1)[0] if cursor else None
+    data = rodadas.listar_resultados(limit + 1, antes_id)
+    if len(data) > limit:
+        data = data[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(data[-1]["id"])
     return data
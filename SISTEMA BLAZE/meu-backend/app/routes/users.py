@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.deps import get_async_db
+from app.core.schedule_index import HORARIO_RE, minuto_do_dia
+from app.routes.bets import get_current_user
+from app.routes.dependencies import admin_only
+from app.schemas.user import ScheduleResponse, ScheduleSubscribersResponse, ScheduleUpdate
+from app.services.schedule_service import (
+    clear_schedule,
+    get_schedule,
+    set_schedule,
+    usuarios_no_minuto,
+)
+
+router = APIRouter(prefix="/users", tags=["Users"])
+
+@router.get("/me/horarios", response_model=ScheduleResponse)
+async def meus_horarios(user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(get_schedule, user.id)
+
+@router.put("/me/horarios", response_model=ScheduleResponse)
+async def configurar_meus_horarios(
+    data: ScheduleUpdate,
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        return await db.run_sync(set_schedule, user.id, data.ativo, data.horarios)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.delete("/me/horarios", response_model=ScheduleResponse)
+async def limpar_meus_horarios(user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(clear_schedule, user.id)
+
+@router.get("/horarios/inscritos", response_model=ScheduleSubscribersResponse)
+def inscritos_no_horario(
+    horario: str = Query(..., description="HH:MM"),
+    _=Depends(admin_only),
+):
+    if not HORARIO_RE.match(horario):
+        raise HTTPException(status_code=400, detail="Use HH:MM")
+    user_ids = usuarios_no_minuto(minuto_do_dia(horario))
+    return {"horario": horario, "total": len(user_ids), "user_ids": sorted(user_ids)}
@@ -1,40 +1,83 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.deps import get_async_db
+from app.core.pagination import LIMITE_MAXIMO, LIMITE_PADRAO, NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
 from app.schemas.wallet import (
     DepositRequest,
+    StatementResponse,
     WalletResponse,
     TransactionResponse
 )
-from app.services.wallet_service import deposit
+from app.services.wallet_service import deposit, get_balance_cents, get_monthly_summary
 from app.routes.bets import get_current_user
 from app.models.transaction import WalletTransaction
 
 router = APIRouter(prefix="/wallet", tags=["Wallet"])
 
 @router.get("/balance", response_model=WalletResponse)
-def get_balance(user=Depends(get_current_user)):
-    return {"balance": user.wallet.balance}
+async def get_balance(
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return {"balance": await db.run_sync(get_balance_cents, user.id) / 100}
 
 @router.post("/deposit", response_model=TransactionResponse)
-def deposit_money(
+async def deposit_money(
     data: DepositRequest,
     user=Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        return deposit(db, user, data.amount)
+        return await db.run_sync(deposit, user.id, data.amount)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/transactions", response_model=list[TransactionResponse])
-def transactions(
+async def transactions(
+    response: Response,
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Extrato paginado por keyset em (created_at, id), mais recentes primeiro.
+    A próxima página vem no header X-Next-Cursor (ausente na última).
+    """
+    query = select(WalletTransaction).where(WalletTransaction.user_id == user.id)
+    if cursor:
+        created_at, tx_id = decode_cursor(cursor, 2)
+        try:
+            created_at = datetime.fromisoformat(created_at)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+        query = query.where(
+            tuple_(WalletTransaction.created_at, WalletTransaction.id) < (created_at, tx_id)
+        )
+
+    itens = (await db.scalars(
+        query
+        .order_by(WalletTransaction.created_at.desc(), WalletTransaction.id.desc())
+        .limit(limit + 1)
+    )).all()
+    if len(itens) > limit:
+        itens = itens[:limit]
+        ultimo = itens[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(ultimo.created_at.isoformat(), ultimo.id)
+    return itens
+
+@router.get("/statement", response_model=StatementResponse)
+async def statement(
+    months: int = Query(12, ge=1, le=120),
     user=Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return (
-        db.query(WalletTransaction)
-        .filter(WalletTransaction.user_id == user.id)
-        .order_by(WalletTransaction.created_at.desc())
-        .all()
-    )
+    """Cabeçalho do extrato: saldo + resumo mensal, sem varrer o histórico."""
+    return {
+        "balance": await db.run_sync(get_balance_cents, user.id) / 100,
+        "months": await db.run_sync(get_monthly_summary, user.id, months),
+    }
@@ -1,13 +1,28 @@
+from typing import Literal
+
 from pydantic import BaseModel
 
 class BetCreate(BaseModel):
     event_id: int
     amount: float
+    color: Literal["red", "black", "white"]
 
 class BetResponse(BaseModel):
     id: int
     amount: float
+    color: str
     possible_return: float
 
     class Config:
         from_attributes = True
+
+class ColorExposure(BaseModel):
+    stake: float
+    payout: float
+    bets: int
+
+class ExposureResponse(BaseModel):
+    event_id: int
+    stake: float
+    por_cor: dict[str, ColorExposure]
+    pior_caso_payout: float
@@ -1,3 +1,5 @@
+from typing import List
+
 from pydantic import BaseModel
 
 class UserCreate(BaseModel):
@@ -10,3 +12,17 @@ class UserResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+class ScheduleUpdate(BaseModel):
+    ativo: bool = True
+    horarios: List[str] = []
+
+class ScheduleResponse(BaseModel):
+    ativo: bool
+    horarios: List[str]
+    total: int
+
+class ScheduleSubscribersResponse(BaseModel):
+    horario: str
+    total: int
+    user_ids: List[int]
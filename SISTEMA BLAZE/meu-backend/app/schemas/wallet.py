@@ -15,3 +15,15 @@ class TransactionResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+class MonthlySummaryResponse(BaseModel):
+    month: str
+    deposits: float
+    bets: float
+    wins: float
+    net: float
+    transactions: int
+
+class StatementResponse(BaseModel):
+    balance: float
+    months: list[MonthlySummaryResponse]
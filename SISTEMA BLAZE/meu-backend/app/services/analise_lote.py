@@ -0,0 +1,254 @@
+"""
+Análise em lote: várias consultas agregadas (filtro + agrupamento +
+métricas) respondidas com uma varredura só do histórico.
+
+Planejamento: o intervalo lido é a união dos períodos das consultas (sem
+limite se alguma não tiver), as colunas extras são só as que algum
+agrupamento pede e a granularidade é a mais grossa que ainda atende todas:
+dia, hora (janelas HH:00-HH:59, agrupar por hora) ou minuto. O banco
+devolve um cubo (período, resultado, extras) -> contagem numa consulta;
+cada linha do cubo passa uma vez por todas as consultas, que acumulam nos
+seus grupos.
+
+Os filtros repetem o WHERE do /historico/filtrado sobre o prefixo de
+data_hora_real: com datas YYYY-MM-DD e horas HH:MM validadas, comparar o
+prefixo dá o mesmo resultado que comparar o texto inteiro.
+"""
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+from app.core.projection import colunar
+from app.core.schedule_index import HORARIO_RE
+from app.repositories import rounds as rodadas
+
+DIMENSOES = ("hora", "minuto", "dia", "dia_semana", "cor", "numero", "resultado")
+METRICAS = ("total", "wins", "losses", "taxa_acerto")
+# dimensões que não saem do período/resultado: viram colunas extras no cubo
+EXTRAS = ("cor", "numero")
+DIAS_SEMANA = ("segunda", "terça", "quarta", "quinta", "sexta", "sábado", "domingo")
+LOTE_MAX_CONSULTAS = 50
+
+# tamanho do prefixo de "YYYY-MM-DD HH:MM:SS" em cada granularidade
+DIA, HORA, MINUTO = 10, 13, 16
+
+DATA_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+@dataclass
+class Consulta:
+    nome: str
+    data_inicio: Optional[str] = None
+    data_fim: Optional[str] = None
+    # atalho das rotas antigas: hoje + os N dias anteriores
+    dias: Optional[int] = None
+    hora_inicio: Optional[str] = None
+    hora_fim: Optional[str] = None
+    tipo_resultado: Optional[str] = None
+    agrupar_por: Optional[str] = None
+    metricas: List[str] = field(default_factory=lambda: list(METRICAS))
+    min_total: int = 0
+    # ex.: ["losses", "-taxa_acerto"] (prefixo "-" = decrescente)
+    ordenar: List[str] = field(default_factory=list)
+    limite: Optional[int] = None
+
+
+def _validar_data(valor: str, nome: str) -> None:
+    try:
+        if not DATA_RE.match(valor):
+            raise ValueError
+        datetime.strptime(valor, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"{nome} deve ser YYYY-MM-DD")
+
+
+class _Plano:
+    """Consulta validada, com o predicado pronto para as linhas do cubo."""
+
+    def __init__(self, c: Consulta, posicao: Dict[str, int]):
+        self.c = c
+        if c.agrupar_por is not None and c.agrupar_por not in DIMENSOES:
+            raise ValueError(f"{c.nome}: agrupar_por deve ser um de {', '.join(DIMENSOES)}")
+        desconhecidas = [m for m in c.metricas if m not in METRICAS]
+        if desconhecidas or not c.metricas:
+            raise ValueError(f"{c.nome}: métricas disponíveis: {', '.join(METRICAS)}")
+        for criterio in c.ordenar:
+            if criterio.lstrip("-") not in METRICAS + ((c.agrupar_por,) if c.agrupar_por else ()):
+                raise ValueError(f"{c.nome}: não dá para ordenar por {criterio}")
+
+        if c.dias is not None and c.data_inicio:
+            raise ValueError(f"{c.nome}: use dias ou data_inicio, não os dois")
+        self.inicio = c.data_inicio or None
+        if c.dias is not None:
+            self.inicio = (datetime.now() - timedelta(days=c.dias)).strftime("%Y-%m-%d")
+        if self.inicio:
+            _validar_data(self.inicio, f"{c.nome}.data_inicio")
+        self.fim = None
+        if c.data_fim:
+            _validar_data(c.data_fim, f"{c.nome}.data_fim")
+            self.fim = rodadas._dia_seguinte(c.data_fim)
+
+        # como no filtrado: a janela só vale com as duas pontas
+        self.janela = None
+        if c.hora_inicio and c.hora_fim:
+            if not (HORARIO_RE.match(c.hora_inicio) and HORARIO_RE.match(c.hora_fim)):
+                raise ValueError(f"{c.nome}: hora_inicio/hora_fim devem ser HH:MM")
+            self.janela = (c.hora_inicio, c.hora_fim)
+
+        # granularidade mínima que esta consulta precisa no cubo
+        self.granularidade = DIA
+        if c.agrupar_por == "hora":
+            self.granularidade = HORA
+        if self.janela is not None:
+            horas_cheias = self.janela[0].endswith(":00") and self.janela[1].endswith(":59")
+            self.granularidade = max(self.granularidade, HORA if horas_cheias else MINUTO)
+        if c.agrupar_por == "minuto":
+            self.granularidade = MINUTO
+        self._fatia = slice(11, 16)
+        tipo = (c.tipo_resultado or "").lower()
+        self.resultado = "WIN" if tipo == "win" else "LOSS" if tipo == "loss" else None
+
+        self.chave = _extrator(c.agrupar_por, posicao)
+        self.grupos: Dict[object, List[int]] = {}
+
+    def ajustar(self, granularidade: int) -> None:
+        """Cubo por hora: a janela (horas cheias) compara só o HH."""
+        if self.janela is not None and granularidade == HORA:
+            self.janela = (self.janela[0][:2], self.janela[1][:2])
+            self._fatia = slice(11, 13)
+
+    def acumular(self, periodo: str, resultado: Optional[str], linha, n: int) -> None:
+        if self.resultado is not None and resultado != self.resultado:
+            return
+        if self.inicio is not None and periodo < self.inicio:
+            return
+        if self.fim is not None and periodo >= self.fim:
+            return
+        if self.janela is not None and not (self.janela[0] <= periodo[self._fatia] <= self.janela[1]):
+            return
+        chave = self.chave(linha)
+        acumulado = self.grupos.get(chave)
+        if acumulado is None:
+            acumulado = self.grupos[chave] = [0, 0, 0]
+        acumulado[0] += n
+        if resultado == "WIN":
+            acumulado[1] += n
+        elif resultado == "LOSS":
+            acumulado[2] += n
+
+    def resultado_final(self, formato: str):
+        c = self.c
+        linhas = []
+        for chave, (total, wins, losses) in self.grupos.items():
+            linha = {c.agrupar_por: chave} if c.agrupar_por else {}
+            linha.update({
+                "total": total,
+                "wins": wins,
+                "losses": losses,
+                "taxa_acerto": round((wins / total * 100) if total > 0 else 0, 2),
+            })
+            linhas.append(linha)
+
+        campos = ([c.agrupar_por] if c.agrupar_por else []) + list(c.metricas)
+        if not c.agrupar_por:
+            unico = linhas[0] if linhas else {"total": 0, "wins": 0, "losses": 0, "taxa_acerto": 0}
+            return {m: unico[m] for m in campos}
+
+        linhas = [l for l in linhas if l["total"] >= c.min_total]
+        linhas.sort(key=lambda l: (l[c.agrupar_por] is None, l[c.agrupar_por]))
+        # sorts estáveis do último critério para o primeiro
+        for criterio in reversed(c.ordenar):
+            nome = criterio.lstrip("-")
+            linhas.sort(key=lambda l: (l[nome] is None, l[nome]), reverse=criterio.startswith("-"))
+        if c.limite is not None:
+            linhas = linhas[:c.limite]
+
+        if formato == "colunas":
+            return colunar(linhas, campos)
+        return [{k: l[k] for k in campos} for l in linhas]
+
+
+_dia_semana_cache: Dict[str, str] = {}
+
+
+def _dia_semana(dia: str) -> str:
+    nome = _dia_semana_cache.get(dia)
+    if nome is None:
+        try:
+            nome = DIAS_SEMANA[datetime.strptime(dia, "%Y-%m-%d").weekday()]
+        except ValueError:
+            nome = None
+        _dia_semana_cache[dia] = nome
+    return nome
+
+
+def _extrator(dimensao: Optional[str], posicao: Dict[str, int]):
+    """Linha do cubo -> valor do grupo."""
+    if dimensao is None:
+        return lambda linha: None
+    if dimensao == "hora":
+        return lambda linha: linha[0][11:13] + ":00"
+    if dimensao == "minuto":
+        return lambda linha: linha[0][11:16]
+    if dimensao == "dia":
+        return lambda linha: linha[0][:10]
+    if dimensao == "dia_semana":
+        return lambda linha: _dia_semana(linha[0][:10])
+    if dimensao == "resultado":
+        return lambda linha: linha[1]
+    i = posicao[dimensao]
+    return lambda linha: linha[i]
+
+
+def analisar(consultas: Sequence[Consulta], formato: str = "objetos") -> dict:
+    if not consultas:
+        raise ValueError("Informe ao menos uma consulta")
+    if len(consultas) > LOTE_MAX_CONSULTAS:
+        raise ValueError(f"Máximo de {LOTE_MAX_CONSULTAS} consultas por lote")
+    nomes = [c.nome for c in consultas]
+    if len(set(nomes)) != len(nomes):
+        raise ValueError("Nomes de consulta repetidos")
+
+    # colunas do cubo: período, resultado, extras pedidos..., n
+    extras = [d for d in EXTRAS if any(c.agrupar_por == d for c in consultas)]
+    posicao = {nome: 2 + i for i, nome in enumerate(extras)}
+    planos = [_Plano(c, posicao) for c in consultas]
+    granularidade = max(p.granularidade for p in planos)
+    for plano in planos:
+        plano.ajustar(granularidade)
+
+    # intervalo lido = união dos períodos
+    inicios = [p.inicio for p in planos]
+    fins = [p.fim for p in planos]
+    desde = None if None in inicios else min(inicios)
+    ate = None if None in fins else max(fins)
+
+    t0 = time.perf_counter()
+    cubo = rodadas.cubo_historico(desde, ate, extras, granularidade)
+    t_varredura = time.perf_counter()
+
+    for linha in cubo:
+        periodo, resultado, n = linha[0], linha[1], linha[-1]
+        if periodo is None:
+            continue
+        for plano in planos:
+            plano.acumular(periodo, resultado, linha, n)
+    t_agregacao = time.perf_counter()
+
+    return {
+        "consultas": {p.c.nome: p.resultado_final(formato) for p in planos},
+        "plano": {
+            "varreduras": 1,
+            "desde": desde,
+            "ate": ate,
+            "granularidade": {DIA: "dia", HORA: "hora", MINUTO: "minuto"}[granularidade],
+            "colunas_extras": extras,
+            "linhas_cubo": len(cubo),
+        },
+        "tempo": {
+            "varredura_ms": round((t_varredura - t0) * 1000, 2),
+            "agregacao_ms": round((t_agregacao - t_varredura) * 1000, 2),
+        },
+    }
@@ -1,24 +1,461 @@
-from app.models.bet import Bet
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, insert, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.core.database import dialect_insert
+from app.core.game import PAGAMENTOS
+from app.core.metrics import BET_BATCH_SECONDS, BET_BATCH_SIZE
+from app.models.bet import Bet, BetIdempotency
+from app.models.event import Event
+from app.models.exposure import EventExposure
+from app.models.transaction import WalletTransaction
+from app.models.wallet import Wallet
+from app.services.wallet_service import (
+    SaldoInsuficiente,
+    debit,
+    snapshot_due,
+    somar_resumo_mensal,
+    to_cents,
+)
+
+events = Event.__table__
+wallets = Wallet.__table__
+exposure = EventExposure.__table__
+bets = Bet.__table__
+idempotencia = BetIdempotency.__table__
+
+
+class EventoNaoEncontrado(ValueError):
+    pass
+
+
+def _retorno_cents(cents: int, color: str) -> int:
+    if color not in PAGAMENTOS:
+        raise ValueError("Cor inválida")
+    return cents * PAGAMENTOS[color]
+
+
+def _bet_dict(bet: Bet) -> dict:
+    return {
+        "id": bet.id,
+        "amount": bet.amount,
+        "color": bet.color,
+        "possible_return": bet.possible_return,
+    }
+
+
+# =========================
+#  IDEMPOTÊNCIA
+# =========================
+
+def apostas_por_chave(db, pares: Iterable[Tuple[int, str]]) -> Dict[Tuple[int, str], dict]:
+    """(user_id, chave) -> aposta já gravada com essa chave."""
+    pares = set(pares)
+    if not pares:
+        return {}
+    linhas = db.execute(
+        select(
+            idempotencia.c.user_id, idempotencia.c.chave,
+            bets.c.id, bets.c.amount_cents, bets.c.color, bets.c.possible_return_cents,
+        )
+        .join(bets, bets.c.id == idempotencia.c.bet_id)
+        .where(tuple_(idempotencia.c.user_id, idempotencia.c.chave).in_(pares))
+    ).all()
+    return {
+        (r.user_id, r.chave): {
+            "id": r.id,
+            "amount": r.amount_cents / 100,
+            "color": r.color,
+            "possible_return": r.possible_return_cents / 100,
+        }
+        for r in linhas
+    }
+
+
+def get_bet_by_key(db, user_id: int, chave: str) -> Optional[dict]:
+    return apostas_por_chave(db, [(user_id, chave)]).get((user_id, chave))
+
+
+# =========================
+#  EXPOSIÇÃO POR EVENTO/COR
+# =========================
+
+def somar_exposicao(db, totais: Dict[Tuple[int, str], List[int]]) -> None:
+    """
+    Soma (stake, payout, apostas) em event_exposure com upsert, na transação
+    do chamador. Consultas de risco leem no máximo 3 linhas por evento.
+    """
+    if not totais:
+        return
+
+    stmt = dialect_insert(db)(exposure)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[exposure.c.event_id, exposure.c.color],
+        set_={
+            "stake_cents": exposure.c.stake_cents + stmt.excluded.stake_cents,
+            "payout_cents": exposure.c.payout_cents + stmt.excluded.payout_cents,
+            "bets": exposure.c.bets + stmt.excluded.bets,
+        },
+    )
+    db.execute(stmt, [
+        {"event_id": ev, "color": cor, "stake_cents": st, "payout_cents": po, "bets": n}
+        for (ev, cor), (st, po, n) in totais.items()
+    ])
+
+
+def get_exposure(db, event_id: int) -> dict:
+    linhas = db.execute(
+        select(exposure.c.color, exposure.c.stake_cents, exposure.c.payout_cents, exposure.c.bets)
+        .where(exposure.c.event_id == event_id)
+    ).all()
+
+    por_cor = {
+        r.color: {"stake": r.stake_cents / 100, "payout": r.payout_cents / 100, "bets": r.bets}
+        for r in linhas
+    }
+    return {
+        "event_id": event_id,
+        "stake": sum(r.stake_cents for r in linhas) / 100,
+        "por_cor": por_cor,
+        # só uma cor sai por rodada: o pior caso é a cor com maior payout
+        "pior_caso_payout": max((r.payout_cents for r in linhas), default=0) / 100,
+    }
+
+
+# =========================
+#  APOSTA INDIVIDUAL
+# =========================
+
+def place_bet(db, user, event, amount: float, color: str, chave: Optional[str] = None) -> dict:
+    return _place_bet(db, user.id, event, to_cents(amount), color, chave)
+
+
+def _place_bet(db, user_id: int, event, cents: int, color: str, chave: Optional[str] = None) -> dict:
+    if chave:
+        existente = get_bet_by_key(db, user_id, chave)
+        if existente:
+            return existente
 
-def place_bet(db, user, event, amount: float):
     if not event.is_open:
         raise ValueError("Evento encerrado")
 
-    if user.wallet.balance < amount:
-        raise ValueError("Saldo insuficiente")
+    retorno = _retorno_cents(cents, color)
+
+    try:
+        # débito condicional no banco: sem ler a carteira antes, sem lock na aplicação
+        debit(db, user_id, cents, "bet")
+
+        bet = Bet(
+            amount_cents=cents,
+            possible_return_cents=retorno,
+            color=color,
+            user_id=user_id,
+            event_id=event.id
+        )
+        db.add(bet)
+        if chave:
+            db.flush()
+            db.execute(insert(idempotencia).values(user_id=user_id, chave=chave, bet_id=bet.id))
+        somar_exposicao(db, {(event.id, color): [cents, retorno, 1]})
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        # outra requisição com a mesma chave gravou primeiro
+        existente = get_bet_by_key(db, user_id, chave) if chave else None
+        if existente:
+            return existente
+        raise
+    except Exception:
+        db.rollback()
+        raise
+
+    return _bet_dict(bet)
+
+
+# =========================
+#  APOSTAS EM LOTE
+# =========================
+
+@dataclass
+class PedidoAposta:
+    user_id: int
+    event_id: int
+    color: str
+    cents: int
+    chave: Optional[str] = None
+    future: Future = field(default_factory=Future)
+
+
+class _LoteConflito(Exception):
+    """O UPDATE condicional não casou para todas as carteiras do lote."""
+
 
-    user.wallet.balance -= amount
-    possible_return = amount * event.odd
+def place_bets_batch(db, pedidos: List[PedidoAposta]) -> None:
+    """
+    Grava um lote de apostas numa transação: valida eventos e saldos em bloco,
+    debita cada carteira uma vez (total do usuário no lote), insere apostas e
+    lançamentos em bulk e soma a exposição. Resolve o future de cada pedido.
 
-    bet = Bet(
-        amount=amount,
-        possible_return=possible_return,
-        user_id=user.id,
-        event_id=event.id
+    Pedidos com chave de idempotência já gravada recebem a aposta existente;
+    a mesma chave repetida dentro do lote segue o resultado da primeira.
+    """
+    existentes = apostas_por_chave(db, ((p.user_id, p.chave) for p in pedidos if p.chave))
+    primeiros: Dict[Tuple[int, str], PedidoAposta] = {}
+    repetidos: List[Tuple[PedidoAposta, PedidoAposta]] = []
+    unicos: List[PedidoAposta] = []
+    for p in pedidos:
+        if p.chave:
+            k = (p.user_id, p.chave)
+            if k in existentes:
+                p.future.set_result(existentes[k])
+                continue
+            if k in primeiros:
+                repetidos.append((p, primeiros[k]))
+                continue
+            primeiros[k] = p
+        unicos.append(p)
+    try:
+        _gravar_lote(db, unicos)
+    finally:
+        for p, primeiro in repetidos:
+            if primeiro.future.done():
+                _copiar_resultado(primeiro.future, p.future)
+            else:
+                primeiro.future.add_done_callback(lambda f, p=p: _copiar_resultado(f, p.future))
+
+
+def _copiar_resultado(origem: Future, destino: Future) -> None:
+    if destino.done():
+        return
+    if origem.exception() is not None:
+        destino.set_exception(origem.exception())
+    else:
+        destino.set_result(origem.result())
+
+
+def _gravar_lote(db, pedidos: List[PedidoAposta]) -> None:
+    if not pedidos:
+        return
+
+    status_eventos = dict(db.execute(
+        select(events.c.id, events.c.status).where(events.c.id.in_({p.event_id for p in pedidos}))
+    ).all())
+
+    saldos = dict(db.execute(
+        select(wallets.c.user_id, wallets.c.balance_cents)
+        .where(wallets.c.user_id.in_({p.user_id for p in pedidos}))
+        .with_for_update()
+    ).all())
+
+    aceitos: List[Tuple[PedidoAposta, Bet]] = []
+    debitos: Dict[int, List[int]] = {}
+    lancamentos = []
+    agora = datetime.utcnow()
+    totais: Dict[Tuple[int, str], List[int]] = {}
+
+    for p in pedidos:
+        if p.event_id not in status_eventos:
+            p.future.set_exception(EventoNaoEncontrado("Evento não encontrado"))
+            continue
+        if status_eventos[p.event_id] != "open":
+            p.future.set_exception(ValueError("Evento encerrado"))
+            continue
+        if p.user_id not in saldos:
+            p.future.set_exception(ValueError("Carteira não encontrada"))
+            continue
+        if saldos[p.user_id] < p.cents:
+            p.future.set_exception(SaldoInsuficiente("Saldo insuficiente"))
+            continue
+
+        saldos[p.user_id] -= p.cents
+        total = debitos.setdefault(p.user_id, [0, 0])
+        total[0] += p.cents
+        total[1] += 1
+
+        retorno = _retorno_cents(p.cents, p.color)
+        aceitos.append((p, Bet(
+            amount_cents=p.cents,
+            possible_return_cents=retorno,
+            color=p.color,
+            user_id=p.user_id,
+            event_id=p.event_id,
+        )))
+        lancamentos.append(WalletTransaction(
+            user_id=p.user_id,
+            amount_cents=-p.cents,
+            balance_after_cents=saldos[p.user_id],
+            type="bet",
+            created_at=agora,
+        ))
+        soma = totais.setdefault((p.event_id, p.color), [0, 0, 0])
+        soma[0] += p.cents
+        soma[1] += retorno
+        soma[2] += 1
+
+    if not aceitos:
+        return
+
+    res = db.execute(
+        update(wallets)
+        .where(
+            wallets.c.user_id == bindparam("uid"),
+            wallets.c.balance_cents >= bindparam("total"),
+        )
+        .values(
+            balance_cents=wallets.c.balance_cents - bindparam("total"),
+            tx_since_snapshot=wallets.c.tx_since_snapshot + bindparam("qtd"),
+        ),
+        [{"uid": uid, "total": t, "qtd": n} for uid, (t, n) in debitos.items()],
     )
+    if db.get_bind().dialect.supports_sane_multi_rowcount and res.rowcount != len(debitos):
+        raise _LoteConflito()
+
+    db.add_all([bet for _, bet in aceitos])
+    db.add_all(lancamentos)
+    db.flush()
+
+    chaves = [{"user_id": p.user_id, "chave": p.chave, "bet_id": bet.id} for p, bet in aceitos if p.chave]
+    if chaves:
+        db.execute(insert(idempotencia), chaves)
 
-    db.add(bet)
+    snapshot_due(db, list(debitos))
+    somar_exposicao(db, totais)
+    somar_resumo_mensal(db, [(t.user_id, t.type, t.amount_cents, agora) for t in lancamentos])
+
+    respostas = [(p, _bet_dict(bet)) for p, bet in aceitos]
     db.commit()
-    db.refresh(bet)
 
-    return bet
+    for p, resposta in respostas:
+        p.future.set_result(resposta)
+
+
+class BetBatcher:
+    """
+    Junta apostas concorrentes em micro-lotes: uma thread escritora drena a
+    fila por até BET_BATCH_WINDOW_MS (ou BET_BATCH_MAX pedidos) e grava cada
+    evento do lote com um commit só. As rotas esperam o future.
+
+    Ao sair da fila o pedido é marcado como em andamento
+    (set_running_or_notify_cancel): até ali a rota pode cancelá-lo no
+    timeout com a garantia de que nada foi gravado; depois, não.
+    """
+
+    def __init__(self, session_factory, janela_ms: float, max_lote: int):
+        self.session_factory = session_factory
+        self.janela = janela_ms / 1000.0
+        self.max_lote = max_lote
+        self._fila: "queue.Queue" = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, user_id: int, event_id: int, color: str, amount: float, chave: Optional[str] = None) -> Future:
+        pedido = PedidoAposta(user_id, event_id, color, to_cents(amount), chave)
+        _retorno_cents(pedido.cents, color)
+        self._garantir_thread()
+        self._fila.put(pedido)
+        return pedido.future
+
+    def close(self) -> None:
+        """Bloqueante: o sentinela entra depois dos pedidos já na fila, que são gravados antes de parar."""
+        if self._thread and self._thread.is_alive():
+            self._fila.put(None)
+            self._thread.join(timeout=5)
+
+    def _garantir_thread(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._loop, name="bet-batcher", daemon=True)
+            self._thread.start()
+
+    def _coletar(self):
+        primeiro = self._fila.get()
+        if primeiro is None:
+            return None, True
+
+        lote = [primeiro]
+        prazo = time.monotonic() + self.janela
+        while len(lote) < self.max_lote:
+            restante = prazo - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                item = self._fila.get(timeout=restante)
+            except queue.Empty:
+                break
+            if item is None:
+                return lote, True
+            lote.append(item)
+        return lote, False
+
+    def _loop(self) -> None:
+        parar = False
+        while not parar:
+            lote, parar = self._coletar()
+            # cancelados no timeout da rota ficam de fora; os demais não podem mais ser cancelados
+            lote = [p for p in lote or () if p.future.set_running_or_notify_cancel()]
+            if not lote:
+                continue
+
+            por_evento: Dict[int, List[PedidoAposta]] = {}
+            for p in lote:
+                por_evento.setdefault(p.event_id, []).append(p)
+
+            for pedidos in por_evento.values():
+                self._gravar(pedidos)
+
+    def _gravar(self, pedidos: List[PedidoAposta]) -> None:
+        t0 = time.perf_counter()
+        db = self.session_factory()
+        try:
+            place_bets_batch(db, pedidos)
+        except Exception:
+            db.rollback()
+            # lote inteiro falhou (conflito/erro de banco): cai para aposta a aposta
+            for p in pedidos:
+                if not p.future.done():
+                    self._gravar_individual(db, p)
+        finally:
+            db.close()
+
+        BET_BATCH_SIZE.observe(len(pedidos))
+        BET_BATCH_SECONDS.observe(time.perf_counter() - t0)
+
+    def _gravar_individual(self, db, p: PedidoAposta) -> None:
+        try:
+            event = db.get(Event, p.event_id)
+            if not event:
+                raise EventoNaoEncontrado("Evento não encontrado")
+            p.future.set_result(_place_bet(db, p.user_id, event, p.cents, p.color, p.chave))
+        except Exception as e:
+            p.future.set_exception(e)
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_bet_batcher() -> BetBatcher:
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                from app.core.database import SessionLocal
+                _batcher = BetBatcher(SessionLocal, settings.BET_BATCH_WINDOW_MS, settings.BET_BATCH_MAX)
+    return _batcher
+
+
+def shutdown_bet_batcher() -> None:
+    """Esvazia a fila e para a thread, se o batcher chegou a ser criado."""
+    if _batcher is not None:
+        _batcher.close()
@@ -1,28 +1,134 @@
+import time
+from datetime import datetime
+
+from sqlalchemy import and_, func, insert, literal, select, update
 from sqlalchemy.orm import Session
+
+from app.core.metrics import BETS_SETTLED, EVENT_SETTLEMENT_SECONDS
 from app.models.bet import Bet
+from app.models.event import Event
 from app.models.transaction import WalletTransaction
+from app.models.wallet import Wallet
+from app.services.wallet_service import mes_de, snapshot_due, somar_resumo_mensal_select
+
+# Liquidação em poucas instruções set-based, numa transação curta:
+#   1. fecha o evento (UPDATE condicional: só um liquidante vence)
+#   2. marca won em todas as apostas do evento (cor apostada == cor sorteada)
+#   3. credita as carteiras dos vencedores com o total agregado por usuário
+#   4. insere os lançamentos 'win' do ledger (INSERT ... SELECT, um por aposta)
+#   5. grava snapshots das carteiras que passaram do limite
+#   6. soma os prêmios no resumo mensal (INSERT ... SELECT com upsert)
+# Nada de carregar Bet/User/Wallet na sessão: o custo não depende de N+1.
+
+bets = Bet.__table__
+events = Event.__table__
+wallets = Wallet.__table__
+ledger = WalletTransaction.__table__
+
+
+def resolve_event(db: Session, event, result: str) -> dict:
+    t0 = time.perf_counter()
+
+    try:
+        fechado = db.execute(
+            update(events)
+            .where(events.c.id == event.id, events.c.status == "open")
+            .values(status="finished", result=result)
+        )
+        if fechado.rowcount == 0:
+            raise ValueError("Evento já resolvido")
+
+        apostas = db.execute(
+            update(bets).where(bets.c.event_id == event.id).values(won=bets.c.color == result)
+        ).rowcount
+
+        vencedores, pago = _pagar_vencedores(db, event.id)
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    db.expire(event)
+
+    dt = time.perf_counter() - t0
+    EVENT_SETTLEMENT_SECONDS.observe(dt)
+    BETS_SETTLED.inc(apostas)
+
+    return {
+        "event_id": event.id,
+        "apostas": apostas,
+        "usuarios_pagos": vencedores,
+        "pago_cents": pago,
+        "segundos": round(dt, 4),
+        "apostas_por_s": round(apostas / dt, 1) if dt > 0 else None,
+    }
+
+
+def _pagar_vencedores(db: Session, event_id: int):
+    vencedoras = and_(bets.c.event_id == event_id, bets.c.won.is_(True))
+
+    por_usuario = (
+        select(
+            bets.c.user_id,
+            func.sum(bets.c.possible_return_cents).label("total"),
+            func.count().label("qtd"),
+        )
+        .where(vencedoras)
+        .group_by(bets.c.user_id)
+        .subquery()
+    )
+
+    # 3. um UPDATE para todas as carteiras; o lock de linha vale até o commit,
+    #    então o saldo lido no passo 4 já é o final desta liquidação
+    creditadas = db.execute(
+        update(wallets)
+        .where(wallets.c.user_id == por_usuario.c.user_id)
+        .values(
+            balance_cents=wallets.c.balance_cents + por_usuario.c.total,
+            tx_since_snapshot=wallets.c.tx_since_snapshot + por_usuario.c.qtd,
+        )
+    ).rowcount
+
+    # 4. saldo após cada aposta = saldo final - total do usuário + acumulado até ela
+    acumulado = func.sum(bets.c.possible_return_cents).over(
+        partition_by=bets.c.user_id, order_by=bets.c.id
+    )
+    total = func.sum(bets.c.possible_return_cents).over(partition_by=bets.c.user_id)
+    agora = datetime.utcnow()
+
+    linhas = (
+        select(
+            bets.c.user_id,
+            bets.c.possible_return_cents,
+            wallets.c.balance_cents - total + acumulado,
+            literal("win"),
+            literal(agora, ledger.c.created_at.type),
+        )
+        .select_from(bets.join(wallets, wallets.c.user_id == bets.c.user_id))
+        .where(vencedoras)
+        .order_by(bets.c.user_id, bets.c.id)
+    )
+    db.execute(insert(ledger).from_select(
+        ["user_id", "amount_cents", "balance_after_cents", "type", "created_at"],
+        linhas,
+    ))
+
+    # 5. snapshots set-based só para quem atingiu o limite
+    snapshot_due(db, select(por_usuario.c.user_id))
+
+    # 6. resumo mensal: wins e net crescem pelo total do usuário
+    somar_resumo_mensal_select(db, select(
+        por_usuario.c.user_id,
+        literal(mes_de(agora)),
+        literal(0),
+        literal(0),
+        por_usuario.c.total,
+        por_usuario.c.total,
+        por_usuario.c.qtd,
+    ).where(por_usuario.c.qtd > 0))  # o WHERE evita a ambiguidade SELECT ... ON CONFLICT no SQLite
 
-def resolve_event(db: Session, event, result: bool):
-    if not event.is_open:
-        raise ValueError("Evento já resolvido")
-
-    event.is_open = False
-    event.result = result
-
-    bets = db.query(Bet).filter(Bet.event_id == event.id).all()
-
-    for bet in bets:
-        if result:
-            bet.won = True
-            tx = WalletTransaction(
-                amount=bet.possible_return,
-                type="win",
-                user_id=bet.user_id
-            )
-            bet_user = bet.user
-            bet_user.wallet.balance += bet.possible_return
-            db.add(tx)
-        else:
-            bet.won = False
-
-    db.commit()
+    pago = db.execute(
+        select(func.coalesce(func.sum(bets.c.possible_return_cents), 0)).where(vencedoras)
+    ).scalar()
+    return creditadas, pago
@@ -0,0 +1,177 @@
+import asyncio
+import itertools
+import os
+from datetime import datetime
+from typing import Dict, Optional, Set, Tuple
+
+from app.core.broadcast import Assinante, serializar
+from app.core.metrics import counter, gauge
+from app.repositories import rounds as rodadas
+
+# Consultas ao vivo: o cliente assina um filtro do /historico/filtrado pelo
+# WebSocket e recebe os totais uma vez; depois, a cada rodada gravada que
+# casa com o filtro, só o delta e os totais atualizados.
+#
+# Casamento por índice invertido (hora do dia, resultado) -> assinaturas:
+# uma rodada das 14h com WIN só testa quem pode aceitar 14h/WIN, em vez de
+# todas as assinaturas abertas. O teste final repete o WHERE do SQL sobre a
+# string data_hora_real, então os totais nunca divergem da rota REST.
+#
+# Marca d'água: a assinatura entra no índice antes da consulta inicial, que
+# conta só id <= ultimo_id daquele instante. O que chega enquanto a consulta
+# roda vai somando nos totais e é anunciado junto com o estado inicial.
+
+LIVE_QUERIES_MAX_POR_CONEXAO = int(os.getenv("LIVE_QUERIES_MAX_POR_CONEXAO", 20))
+# consultas iniciais simultâneas no threadpool (são agregações do período inteiro)
+LIVE_QUERIES_CONCORRENCIA = int(os.getenv("LIVE_QUERIES_CONCORRENCIA", 2))
+
+RESULTADOS = ("WIN", "LOSS")
+
+LIVE_QUERIES_ACTIVE = gauge(
+    "blaze_live_queries_active",
+    "Assinaturas de consulta ao vivo abertas",
+)
+LIVE_QUERIES_DELTAS = counter(
+    "blaze_live_queries_deltas_total",
+    "Deltas de consulta ao vivo enfileirados por resultado",
+)
+
+
+def _taxa(totais: dict) -> dict:
+    total = totais["total"]
+    return {**totais, "taxa_acerto": round((totais["wins"] / total * 100) if total > 0 else 0, 2)}
+
+
+class Assinatura:
+    def __init__(self, id_: int, assinante: Assinante, filtro: dict):
+        self.id = id_
+        self.assinante = assinante
+        self.filtro = filtro
+        self.totais = {"total": 0, "wins": 0, "losses": 0}
+        self.pronta = False
+
+        self._inicio = filtro.get("data_inicio") or None
+        # mesmo limite exclusivo do SQL (ValueError se a data for inválida)
+        self._fim = rodadas._dia_seguinte(filtro["data_fim"]) if filtro.get("data_fim") else None
+        hi, hf = filtro.get("hora_inicio"), filtro.get("hora_fim")
+        self._janela = (hi + ":00", hf + ":59") if hi and hf else None
+        tipo = (filtro.get("tipo_resultado") or "").lower()
+        self._resultados = ("WIN",) if tipo == "win" else ("LOSS",) if tipo == "loss" else RESULTADOS
+        self.chaves = self._chaves()
+
+    def _chaves(self) -> Set[Tuple[int, str]]:
+        """Posições no índice: horas do dia que a janela pode cobrir x resultados aceitos."""
+        if self._fim is not None and self._fim <= datetime.now().strftime("%Y-%m-%d"):
+            return set()  # período já fechado: nenhuma rodada nova casa
+        horas = range(24)
+        if self._janela:
+            lo, hi = self._janela
+            horas = [h for h in horas if f"{h:02d}:59:59" >= lo and f"{h:02d}:00:00" <= hi]
+        return {(h, r) for h in horas for r in self._resultados}
+
+    def casa(self, data_hora: str, resultado: str) -> bool:
+        if resultado not in self._resultados:
+            return False
+        if self._inicio is not None and data_hora < self._inicio:
+            return False
+        if self._fim is not None and data_hora >= self._fim:
+            return False
+        if self._janela is not None and not (self._janela[0] <= data_hora[11:19] <= self._janela[1]):
+            return False
+        return True
+
+    def mensagem(self, tipo: str, **extra) -> str:
+        return serializar({"tipo": tipo, "assinatura": self.id, **extra, "totais": _taxa(self.totais)})
+
+
+class ConsultasAoVivo:
+    """Índice (hora, resultado) -> assinaturas. Só o event loop mexe aqui: sem lock."""
+
+    def __init__(self):
+        self.ultimo_id = 0
+        self._indice: Dict[Tuple[int, str], Set[Assinatura]] = {}
+        self._por_conexao: Dict[Assinante, Dict[int, Assinatura]] = {}
+        self._ids = itertools.count(1)
+        self._sem: Optional[asyncio.Semaphore] = None
+
+    def abertas(self) -> int:
+        return sum(len(a) for a in self._por_conexao.values())
+
+    async def assinar(self, assinante: Assinante, filtro: dict) -> Assinatura:
+        """Registra, conta o histórico até a marca d'água e enfileira o estado inicial."""
+        minhas = self._por_conexao.setdefault(assinante, {})
+        if len(minhas) >= LIVE_QUERIES_MAX_POR_CONEXAO:
+            raise ValueError(f"Limite de {LIVE_QUERIES_MAX_POR_CONEXAO} assinaturas por conexão")
+
+        assinatura = Assinatura(next(self._ids), assinante, filtro)
+        corte = self.ultimo_id
+        minhas[assinatura.id] = assinatura
+        for chave in assinatura.chaves:
+            self._indice.setdefault(chave, set()).add(assinatura)
+        LIVE_QUERIES_ACTIVE.inc()
+
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(max(1, LIVE_QUERIES_CONCORRENCIA))
+        try:
+            async with self._sem:
+                base = await asyncio.to_thread(rodadas.totais_filtrados, ate_id=corte, **filtro)
+        except Exception:
+            self.cancelar(assinante, assinatura.id)
+            raise
+
+        if assinatura.id not in minhas:
+            return assinatura  # cancelada enquanto a consulta rodava
+        for k, v in base.items():
+            assinatura.totais[k] += v
+        assinatura.pronta = True
+        assinante.enfileirar(assinatura.mensagem("inicial", filtro=filtro, ate_id=corte))
+        return assinatura
+
+    def cancelar(self, assinante: Assinante, assinatura_id: int) -> bool:
+        assinatura = self._por_conexao.get(assinante, {}).pop(assinatura_id, None)
+        if assinatura is None:
+            return False
+        for chave in assinatura.chaves:
+            assinaturas = self._indice.get(chave)
+            if assinaturas is not None:
+                assinaturas.discard(assinatura)
+                if not assinaturas:
+                    del self._indice[chave]
+        LIVE_QUERIES_ACTIVE.dec()
+        return True
+
+    def encerrar(self, assinante: Assinante) -> None:
+        for assinatura_id in list(self._por_conexao.get(assinante, ())):
+            self.cancelar(assinante, assinatura_id)
+        self._por_conexao.pop(assinante, None)
+
+    def rodada(self, rodada_id: int, data_hora: str, resultado: str) -> int:
+        """Rodada gravada: soma nas assinaturas que casam e enfileira o delta. Devolve quantas."""
+        self.ultimo_id = max(self.ultimo_id, rodada_id)
+        candidatas = self._indice.get((int(data_hora[11:13]), resultado))
+        if not candidatas:
+            return 0
+
+        win = resultado == "WIN"
+        delta = {"total": 1, "wins": int(win), "losses": int(not win)}
+        info = {"id": rodada_id, "data_hora_real": data_hora, "resultado": resultado}
+        entregues = 0
+        for assinatura in list(candidatas):
+            if not assinatura.casa(data_hora, resultado):
+                continue
+            for k, v in delta.items():
+                assinatura.totais[k] += v
+            if not assinatura.pronta:
+                continue  # entra no estado inicial
+            if assinatura.assinante.enfileirar(assinatura.mensagem("delta", rodada=info, delta=delta)):
+                entregues += 1
+                continue
+            # cliente atrasado demais: cai e reassina com totais novos
+            LIVE_QUERIES_DELTAS.inc(resultado="descartada")
+            self.encerrar(assinatura.assinante)
+            assinatura.assinante.derrubar()
+        LIVE_QUERIES_DELTAS.inc(entregues, resultado="enfileirada")
+        return entregues
+
+
+consultas_ao_vivo = ConsultasAoVivo()
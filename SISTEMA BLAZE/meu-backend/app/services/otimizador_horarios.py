@@ -0,0 +1,309 @@
+"""
+Otimizador de horários: escolhe, a partir do histórico, o conjunto de
+minutos do dia para a chave mestra (/horarios/configurar).
+
+Dados: contagem de WIN/LOSS por (dia, minuto) numa matriz NumPy com soma
+acumulada no eixo dos dias. Os dias fechados vêm do banco uma vez e ficam
+em cache; a cada chamada só as rodadas de hoje são consultadas. Qualquer
+janela de N dias sai de uma subtração de duas linhas da soma acumulada,
+e a tolerância de ±t minutos de outra soma acumulada, no eixo dos minutos.
+
+Pontuação de cada minuto: limite inferior de Wilson da taxa de acerto
+(com `confianca`), para que um minuto com 3/3 não vença um com 95/100.
+Minutos com menos de `min_jogadas` ou abaixo de `min_wilson` (em %) ficam
+de fora.
+
+Busca: até `max_minutos` minutos, com pelo menos `espacamento_min` minutos
+entre dois escolhidos (inclusive na virada 23:59 -> 00:00), maximizando a
+soma das pontuações. Programação dinâmica exata sobre os minutos válidos;
+a restrição circular vira um caso linear por posição possível do primeiro
+minuto escolhido, e os casos rodam em paralelo num pool de processos.
+"""
+import math
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from statistics import NormalDist
+from typing import List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # opcional: sem NumPy a rota do otimizador responde 503
+    np = None
+
+from app.repositories import rounds as rodadas
+
+MINUTOS_DIA = 24 * 60
+OTIMIZADOR_MAX_DIAS = int(os.getenv("OTIMIZADOR_MAX_DIAS", 365))
+OTIMIZADOR_WORKERS = int(os.getenv("OTIMIZADOR_WORKERS", min(4, os.cpu_count() or 1)))
+# abaixo disso os casos rodam no próprio thread (o pool não compensa)
+OTIMIZADOR_PARALELO_MIN_CASOS = int(os.getenv("OTIMIZADOR_PARALELO_MIN_CASOS", 8))
+
+
+def disponivel() -> bool:
+    return np is not None
+
+
+def _minuto(chave: str) -> Optional[int]:
+    """'YYYY-MM-DD HH:MM' -> minuto do dia (None se malformado)"""
+    try:
+        m = int(chave[11:13]) * 60 + int(chave[14:16])
+    except (TypeError, ValueError):
+        return None
+    return m if 0 <= m < MINUTOS_DIA else None
+
+
+def _hhmm(minuto: int) -> str:
+    return f"{minuto // 60:02d}:{minuto % 60:02d}"
+
+
+# =========================
+#  AGREGADOS (SOMA ACUMULADA POR DIA)
+# =========================
+class _CacheMinutos:
+    """Dias fechados [inicio, ate) em (dias, 1440, 2) + soma acumulada. Recarrega só o que falta."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.inicio: Optional[str] = None
+        self.ate: Optional[str] = None
+        self._diario = None
+        self._acumulado = None
+
+    def _carregar(self, desde: str, ate: str):
+        d0 = datetime.strptime(desde, "%Y-%m-%d")
+        n = (datetime.strptime(ate, "%Y-%m-%d") - d0).days
+        indice_dia = {(d0 + timedelta(days=i)).strftime("%Y-%m-%d"): i for i in range(max(n, 0))}
+        diario = np.zeros((max(n, 0), MINUTOS_DIA, 2), dtype=np.int64)
+        dias, minutos, valores = [], [], []
+        for chave, wins, losses in rodadas.contagens_por_minuto(desde, ate):
+            i = indice_dia.get(chave[:10])
+            m = _minuto(chave)
+            if i is not None and m is not None:
+                dias.append(i)
+                minutos.append(m)
+                valores.append((wins, losses))
+        if valores:
+            diario[dias, minutos] = valores
+        return diario
+
+    def dias_fechados(self, hoje: str):
+        """(soma acumulada (dias+1, 1440, 2), quantidade de dias), atualizados até ontem."""
+        with self._lock:
+            inicio = (datetime.strptime(hoje, "%Y-%m-%d") - timedelta(days=OTIMIZADOR_MAX_DIAS)).strftime("%Y-%m-%d")
+            if self.ate != hoje:
+                if self._diario is None or self.ate is None or self.ate < inicio:
+                    self._diario = self._carregar(inicio, hoje)
+                else:
+                    novos = self._carregar(self.ate, hoje)
+                    descarte = (datetime.strptime(inicio, "%Y-%m-%d") - datetime.strptime(self.inicio, "%Y-%m-%d")).days
+                    self._diario = np.concatenate([self._diario[max(descarte, 0):], novos])
+                self.inicio, self.ate = inicio, hoje
+                self._acumulado = np.concatenate([
+                    np.zeros((1, MINUTOS_DIA, 2), dtype=np.int64),
+                    np.cumsum(self._diario, axis=0),
+                ])
+            return self._acumulado, len(self._diario)
+
+
+_cache = _CacheMinutos()
+
+
+def contagens_por_minuto(dias: int, tolerancia_min: int = 0):
+    """
+    (1440, 2) wins/losses por minuto do dia: hoje + os `dias` anteriores (o
+    mesmo corte de estatisticas_por_horario). Com tolerância, cada minuto
+    soma também os vizinhos a ±t minutos, com a virada do dia.
+    """
+    hoje = datetime.now().strftime("%Y-%m-%d")
+    acumulado, n = _cache.dias_fechados(hoje)
+    dias = min(dias, n)
+    contagens = acumulado[n] - acumulado[n - dias]
+
+    for chave, wins, losses in rodadas.contagens_por_minuto(hoje):
+        m = _minuto(chave)
+        if m is not None:
+            contagens[m] += (wins, losses)
+
+    if tolerancia_min > 0:
+        t = min(tolerancia_min, MINUTOS_DIA // 2)
+        estendido = np.concatenate([contagens[-t:], contagens, contagens[:t]])
+        soma = np.concatenate([np.zeros((1, 2), dtype=np.int64), np.cumsum(estendido, axis=0)])
+        contagens = soma[2 * t + 1:] - soma[:MINUTOS_DIA]
+    return contagens
+
+
+def limite_wilson(wins, n, z: float):
+    """Limite inferior do intervalo de Wilson (vetorizado; n = 0 -> 0)."""
+    n_seguro = np.maximum(n, 1)
+    p = wins / n_seguro
+    z2 = z * z
+    centro = p + z2 / (2 * n_seguro)
+    margem = z * np.sqrt(p * (1 - p) / n_seguro + z2 / (4 * n_seguro * n_seguro))
+    return np.where(n > 0, (centro - margem) / (1 + z2 / n_seguro), 0.0)
+
+
+# =========================
+#  BUSCA (PROGRAMAÇÃO DINÂMICA)
+# =========================
+def _dp_linear(posicoes, pesos, k_max: int, espacamento: int) -> Tuple[float, List[int]]:
+    """
+    Melhor soma de pesos com até k_max posições (crescentes) distantes >= espacamento.
+
+    melhor[k][j]: melhor soma com até k escolhas entre as j primeiras posições.
+    Cada nível k é uma passada vetorizada: o candidato de j (escolher a
+    posição j) vale melhor[k-1][anterior[j]] + peso[j], e melhor[k] é o
+    máximo acumulado dos candidatos (ou melhor[k-1]).
+    """
+    v = len(posicoes)
+    if v == 0 or k_max <= 0:
+        return 0.0, []
+    k_max = min(k_max, v, (int(posicoes[-1] - posicoes[0]) // espacamento) + 1)
+    # anterior[j]: quantas posições ficam a >= espacamento antes da j-ésima
+    anterior = np.searchsorted(posicoes, posicoes - espacamento, side="right")
+
+    melhor = np.zeros((k_max + 1, v + 1))
+    candidatos = np.empty((k_max + 1, v))
+    for k in range(1, k_max + 1):
+        candidatos[k] = melhor[k - 1][anterior] + pesos
+        melhor[k, 1:] = np.maximum(melhor[k - 1, 1:], np.maximum.accumulate(candidatos[k]))
+
+    escolhidas = []
+    k, j = k_max, v
+    while k > 0 and j > 0:
+        alvo = melhor[k, j]
+        if alvo == melhor[k - 1, j]:
+            k -= 1
+            continue
+        # última posição <= j cujo candidato deu o máximo do nível
+        i = int(np.flatnonzero(candidatos[k, :j] == alvo)[-1])
+        escolhidas.append(int(posicoes[i]))
+        j = int(anterior[i])
+        k -= 1
+    return float(melhor[k_max, v]), escolhidas[::-1]
+
+
+def _resolver_caso(caso) -> Tuple[float, List[int]]:
+    """Um caso da restrição circular (roda no pool): primeiro minuto fixo ou nenhum antes de espacamento-1."""
+    posicoes, pesos, k_max, espacamento, primeiro = caso
+    if primeiro is None:
+        filtro = posicoes >= espacamento - 1
+        return _dp_linear(posicoes[filtro], pesos[filtro], k_max, espacamento)
+
+    i = int(np.searchsorted(posicoes, primeiro))
+    filtro = (posicoes >= primeiro + espacamento) & (posicoes <= primeiro + MINUTOS_DIA - espacamento)
+    total, escolhidas = _dp_linear(posicoes[filtro], pesos[filtro], k_max - 1, espacamento)
+    return total + float(pesos[i]), [primeiro] + escolhidas
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=OTIMIZADOR_WORKERS)
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def buscar(posicoes, pesos, k_max: int, espacamento: int) -> Tuple[float, List[int]]:
+    """Melhor conjunto circular. posicoes: minutos válidos em ordem crescente."""
+    if espacamento <= 1:
+        return _dp_linear(posicoes, pesos, k_max, 1)
+
+    casos = [(posicoes, pesos, k_max, espacamento, None)]
+    casos += [(posicoes, pesos, k_max, espacamento, int(p)) for p in posicoes[posicoes < espacamento - 1]]
+    if OTIMIZADOR_WORKERS > 1 and len(casos) >= OTIMIZADOR_PARALELO_MIN_CASOS:
+        resultados = list(_get_pool().map(_resolver_caso, casos, chunksize=max(1, len(casos) // (OTIMIZADOR_WORKERS * 2))))
+    else:
+        resultados = [_resolver_caso(c) for c in casos]
+    return max(resultados, key=lambda r: r[0])
+
+
+# =========================
+#  API
+# =========================
+def otimizar(
+    dias: int = 30,
+    max_minutos: int = 20,
+    espacamento_min: int = 1,
+    min_jogadas: int = 5,
+    confianca: float = 0.95,
+    min_wilson: float = 0.0,
+    tolerancia_min: int = 0,
+) -> dict:
+    if not 1 <= dias <= OTIMIZADOR_MAX_DIAS:
+        raise ValueError(f"dias deve estar entre 1 e {OTIMIZADOR_MAX_DIAS}")
+    if max_minutos < 1 or espacamento_min < 1 or min_jogadas < 1:
+        raise ValueError("max_minutos, espacamento_min e min_jogadas devem ser >= 1")
+    if not 0 < confianca < 1:
+        raise ValueError("confianca deve estar entre 0 e 1")
+    if not 0 <= min_wilson <= 100:
+        raise ValueError("min_wilson é uma taxa em %, entre 0 e 100")
+
+    t0 = time.perf_counter()
+    contagens = contagens_por_minuto(dias, tolerancia_min)
+    t_dados = time.perf_counter()
+
+    wins = contagens[:, 0].astype(np.float64)
+    jogadas = contagens.sum(axis=1).astype(np.float64)
+    z = NormalDist().inv_cdf(1 - (1 - confianca) / 2)
+    wilson = limite_wilson(wins, jogadas, z)
+
+    validos = (jogadas >= min_jogadas) & (wilson * 100 >= min_wilson) & (wilson > 0)
+    posicoes = np.flatnonzero(validos)
+    total, escolhidos = buscar(posicoes, wilson[posicoes], max_minutos, espacamento_min)
+    t_busca = time.perf_counter()
+
+    detalhes = []
+    for m in sorted(escolhidos):
+        w, n = int(contagens[m, 0]), int(jogadas[m])
+        detalhes.append({
+            "horario": _hhmm(m),
+            "wins": w,
+            "losses": n - w,
+            "total": n,
+            "taxa_acerto": round(w / n * 100, 2) if n else 0,
+            "wilson": round(float(wilson[m]) * 100, 2),
+        })
+    soma_wins = sum(d["wins"] for d in detalhes)
+    soma_total = sum(d["total"] for d in detalhes)
+
+    return {
+        "horarios": [d["horario"] for d in detalhes],
+        "total": len(detalhes),
+        "detalhes": detalhes,
+        "cobertura": {
+            "wins": soma_wins,
+            "losses": soma_total - soma_wins,
+            "total": soma_total,
+            "taxa_acerto": round(soma_wins / soma_total * 100, 2) if soma_total else 0,
+            "pontuacao": round(total, 4) if math.isfinite(total) else 0,
+        },
+        "minutos_candidatos": int(len(posicoes)),
+        "parametros": {
+            "dias": dias,
+            "max_minutos": max_minutos,
+            "espacamento_min": espacamento_min,
+            "min_jogadas": min_jogadas,
+            "confianca": confianca,
+            "min_wilson": min_wilson,
+            "tolerancia_min": tolerancia_min,
+        },
+        "tempo": {
+            "dados_ms": round((t_dados - t0) * 1000, 2),
+            "busca_ms": round((t_busca - t_dados) * 1000, 2),
+        },
+    }
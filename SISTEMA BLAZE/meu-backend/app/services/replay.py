@@ -0,0 +1,419 @@
+"""
+Replay de fixtures gravadas pelo scraper (SCRAPER_RECORD_FILE) sem tocar no site real.
+
+    python -m app.services.replay synth  fixtures/meses.jsonl --rodadas 260000
+    python -m app.services.replay serve  fixtures/meses.jsonl --speed 100 --port 8765
+    python -m app.services.replay push   fixtures/meses.jsonl --speed 100 --url http://127.0.0.1:8000/update_status
+    python -m app.services.replay bench  fixtures/meses.jsonl
+    python -m app.services.replay check  fixtures/meses.jsonl
+
+serve: página local com .round-history que avança no tempo da fixture (aponte BLAZE_URL para ela).
+push:  envia as rodadas direto para /update_status no ritmo acelerado e mede a ingestão.
+bench: throughput do parser de snapshots + deduplicação por build_round_signature.
+check: ida e volta gravação -> página do serve -> parser; falha se alguma rodada se perder.
+"""
+import argparse
+import bisect
+import html
+import json
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from html.parser import HTMLParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+
+from app.core.game import cor_do_numero
+from app.services.scraper import (
+    INGEST_HEADERS,
+    OBSERVER_SNAPSHOT_ITEMS,
+    build_round_signature,
+    log,
+    parse_latest_from_snapshot,
+)
+
+
+# =========================
+# FIXTURES
+# =========================
+
+def iter_fixture(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def load_fixture(path: str) -> List[Dict[str, Any]]:
+    frames = list(iter_fixture(path))
+    frames.sort(key=lambda fr: fr.get("t") or 0)
+    return frames
+
+
+def synth_fixture(path: str, rodadas: int, period_sec: float = 30.0, start: Optional[datetime] = None, seed: int = 0) -> int:
+    """Gera uma fixture sintética (distribuição real 0-14) no mesmo formato da gravação."""
+    rng = random.Random(seed)
+    start = start or (datetime.now() - timedelta(seconds=rodadas * period_sec))
+    recentes: List[Dict[str, Any]] = []
+
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(rodadas):
+            ts = start + timedelta(seconds=i * period_sec)
+            n = rng.randint(0, 14)
+            hora = ts.strftime("%H:%M")
+            item = {"text": f"{n}\n{hora}", "children": [str(n), hora]}
+            recentes = ([item] + recentes)[:OBSERVER_SNAPSHOT_ITEMS]
+            line = {
+                "t": ts.timestamp(),
+                "target": None,
+                "round": {"numero": n, "cor": cor_do_numero(n), "hora": hora, "hora_source": "dom"},
+                "items": recentes,
+            }
+            f.write(json.dumps(line, separators=(",", ":")) + "\n")
+    return rodadas
+
+
+class ReplayClock:
+    """Mapeia o tempo real para o tempo da fixture com fator de aceleração."""
+
+    def __init__(self, frames: List[Dict[str, Any]], speed: float):
+        self.frames = frames
+        self.speed = max(speed, 1e-6)
+        self.t0 = frames[0]["t"] if frames else 0.0
+        self.started = time.monotonic()
+
+    def fixture_time(self) -> float:
+        return self.t0 + (time.monotonic() - self.started) * self.speed
+
+    def wait_until(self, t: float) -> None:
+        delay = (t - self.t0) / self.speed - (time.monotonic() - self.started)
+        if delay > 0:
+            time.sleep(delay)
+
+
+# =========================
+# SERVE (página substituta)
+# =========================
+
+PAGE_HTML = """<!doctype html>
+<html><head><meta charset="utf-8"><title>replay .round-history</title></head>
+<body>
+<div class="round-history"></div>
+<script>
+var last = -1;
+function tick() {
+  fetch('/frame?after=' + last).then(function (r) { return r.json(); }).then(function (fr) {
+    if (fr.index !== last && fr.html !== null) {
+      last = fr.index;
+      document.querySelector('.round-history').innerHTML = fr.html;
+    }
+  }).catch(function () {}).finally(function () { setTimeout(tick, POLL_MS); });
+}
+tick();
+</script>
+</body></html>
+"""
+
+
+def render_items_html(items: List[Dict[str, Any]]) -> str:
+    """
+    Folhas em <div>: blocos viram linhas no innerText ("5\n09:21"), como no
+    site. Com <span> lado a lado o texto colaria ("509:21") e o RE_NUM não
+    acharia o número.
+    """
+    out = []
+    for item in items:
+        vistos = set()
+        folhas = []
+        for child in item.get("children") or []:
+            # textos de filhos aninhados se repetem no innerText do pai: renderiza só folhas únicas
+            if not child or child in vistos or "\n" in child:
+                continue
+            vistos.add(child)
+            folhas.append(child)
+        if not folhas:
+            folhas = [linha for linha in (item.get("text") or "").splitlines() if linha.strip()]
+        out.append("<button>" + "".join(f"<div>{html.escape(f)}</div>" for f in folhas) + "</button>")
+    return "".join(out)
+
+
+class _InnerText(HTMLParser):
+    """
+    innerText aproximado de cada <button> da página do serve: inline cola,
+    bloco quebra linha. children são os textos dos elementos internos em
+    ordem de documento, como no SNAPSHOT_JS.
+    """
+
+    BLOCOS = {"div", "p", "li", "tr", "br"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.items: List[Dict[str, Any]] = []
+        # (buffer, posição em children; -1 = o próprio botão)
+        self._abertos: List[tuple] = []
+        self._filhos: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.BLOCOS:
+            self._quebra()
+        if tag == "br":
+            return
+        if tag == "button" and not self._abertos:
+            self._filhos = []
+            self._abertos.append(([], -1))
+        elif self._abertos:
+            self._filhos.append("")
+            self._abertos.append(([], len(self._filhos) - 1))
+
+    def handle_endtag(self, tag):
+        if not self._abertos:
+            return
+        if tag in self.BLOCOS:
+            self._quebra()
+        buf, pos = self._abertos.pop()
+        texto = "\n".join(l.strip() for l in "".join(buf).splitlines() if l.strip())
+        if pos >= 0:
+            self._filhos[pos] = texto
+        else:
+            self.items.append({"text": texto, "children": self._filhos})
+
+    def handle_data(self, data):
+        for buf, _ in self._abertos:
+            buf.append(data)
+
+    def _quebra(self):
+        for buf, _ in self._abertos:
+            buf.append("\n")
+
+
+def items_da_pagina(html_items: str) -> List[Dict[str, Any]]:
+    leitor = _InnerText()
+    leitor.feed(html_items)
+    leitor.close()
+    return leitor.items
+
+
+def serve(frames: List[Dict[str, Any]], speed: float, port: int, poll_ms: int = 100) -> ThreadingHTTPServer:
+    clock = ReplayClock(frames, speed)
+    times = [fr["t"] for fr in frames]
+    page = PAGE_HTML.replace("POLL_MS", str(poll_ms)).encode("utf-8")
+
+    class _Handler(BaseHTTPRequestHandler):
+        def _send(self, body: bytes, content_type: str):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            if path == "/":
+                self._send(page, "text/html; charset=utf-8")
+                return
+            if path == "/frame":
+                idx = bisect.bisect_right(times, clock.fixture_time()) - 1
+                body = {"index": idx, "html": render_items_html(frames[idx]["items"]) if idx >= 0 else None}
+                self._send(json.dumps(body).encode("utf-8"), "application/json")
+                return
+            self.send_error(404)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+    threading.Thread(target=server.serve_forever, name="replay-http", daemon=True).start()
+    log(f"🎬 Replay de {len(frames)} snapshots em http://127.0.0.1:{port}/ ({speed}x)")
+    return server
+
+
+# =========================
+# PUSH (direto no /update_status)
+# =========================
+
+def push(frames: List[Dict[str, Any]], url: str, speed: float, workers: int = 4) -> Dict[str, Any]:
+    clock = ReplayClock(frames, speed)
+    latencias: List[float] = []
+    erros = 0
+    lock = threading.Lock()
+    session = requests.Session()
+
+    def enviar(payload):
+        nonlocal erros
+        t0 = time.perf_counter()
+        try:
+            session.post(url, json=payload, headers=INGEST_HEADERS, timeout=8).raise_for_status()
+            with lock:
+                latencias.append(time.perf_counter() - t0)
+        except Exception:
+            with lock:
+                erros += 1
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for fr in frames:
+            rd = fr.get("round") or parse_latest_from_snapshot(fr.get("items") or [])
+            if not rd:
+                continue
+            clock.wait_until(fr["t"])
+            agora = time.time()
+            pool.submit(enviar, {
+                "numero": rd["numero"],
+                "cor": rd["cor"],
+                "hora": rd.get("hora"),
+                "mensagem": rd.get("mensagem"),
+                "origem": fr.get("target"),
+                "detectado_em": agora,
+                "enviado_em": agora,
+            })
+    duracao = time.perf_counter() - inicio
+
+    return _resumo_latencias(latencias, erros, duracao)
+
+
+def _resumo_latencias(latencias: List[float], erros: int, duracao: float) -> Dict[str, Any]:
+    ordenadas = sorted(latencias)
+
+    def pct(p):
+        if not ordenadas:
+            return None
+        return round(ordenadas[min(len(ordenadas) - 1, int(p * len(ordenadas)))] * 1000, 3)
+
+    return {
+        "enviadas": len(latencias),
+        "erros": erros,
+        "duracao_s": round(duracao, 3),
+        "rodadas_por_s": round(len(latencias) / duracao, 1) if duracao > 0 else None,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "media_ms": round(statistics.mean(ordenadas) * 1000, 3) if ordenadas else None,
+    }
+
+
+# =========================
+# BENCH (parser + dedup)
+# =========================
+
+def bench_parser(frames: List[Dict[str, Any]], repeticoes: int = 3) -> Dict[str, Any]:
+    melhor = None
+    novas = 0
+    for _ in range(repeticoes):
+        last_sig = None
+        novas = 0
+        t0 = time.perf_counter()
+        for fr in frames:
+            rd = parse_latest_from_snapshot(fr.get("items") or [])
+            if not rd:
+                continue
+            sig = build_round_signature(rd)
+            if sig != last_sig:
+                novas += 1
+                last_sig = sig
+        dt = time.perf_counter() - t0
+        melhor = dt if melhor is None else min(melhor, dt)
+
+    return {
+        "snapshots": len(frames),
+        "rodadas_novas": novas,
+        "duplicadas_descartadas": len(frames) - novas,
+        "melhor_s": round(melhor or 0.0, 4),
+        "snapshots_por_s": round(len(frames) / melhor, 1) if melhor else None,
+    }
+
+
+# =========================
+# CHECK (gravação -> serve -> parser)
+# =========================
+
+def check_roundtrip(frames: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Renderiza cada snapshot como a página do serve, relê como o innerText do
+    browser e passa pelo mesmo parser do scraper: a rodada lida tem de ser a
+    gravada (numero e hora).
+    """
+    falhas = []
+    conferidas = 0
+    for i, fr in enumerate(frames):
+        esperado = fr.get("round") or parse_latest_from_snapshot(fr.get("items") or [])
+        if not esperado:
+            continue
+        conferidas += 1
+        lido = parse_latest_from_snapshot(items_da_pagina(render_items_html(fr.get("items") or [])))
+        if not lido or (lido["numero"], lido["hora"]) != (esperado["numero"], esperado.get("hora")):
+            falhas.append({"frame": i, "esperado": esperado, "lido": lido})
+
+    return {"conferidas": conferidas, "falhas": len(falhas), "primeiras_falhas": falhas[:5]}
+
+
+# =========================
+# CLI
+# =========================
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(prog="python -m app.services.replay")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("synth", help="gera fixture sintética")
+    p.add_argument("fixture")
+    p.add_argument("--rodadas", type=int, default=2880)
+    p.add_argument("--periodo", type=float, default=30.0)
+    p.add_argument("--seed", type=int, default=0)
+
+    p = sub.add_parser("serve", help="serve página substituta com o histórico")
+    p.add_argument("fixture")
+    p.add_argument("--speed", type=float, default=1.0)
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--poll-ms", type=int, default=100)
+
+    p = sub.add_parser("push", help="envia rodadas direto para /update_status")
+    p.add_argument("fixture")
+    p.add_argument("--speed", type=float, default=100.0)
+    p.add_argument("--url", default="http://127.0.0.1:8000/update_status")
+    p.add_argument("--workers", type=int, default=4)
+
+    p = sub.add_parser("bench", help="throughput do parser + dedup")
+    p.add_argument("fixture")
+    p.add_argument("--repeticoes", type=int, default=3)
+
+    p = sub.add_parser("check", help="ida e volta gravação -> serve -> parser")
+    p.add_argument("fixture")
+
+    args = ap.parse_args(argv)
+
+    if args.cmd == "synth":
+        n = synth_fixture(args.fixture, args.rodadas, args.periodo, seed=args.seed)
+        log(f"💾 {n} rodadas em {args.fixture}")
+        return
+
+    frames = load_fixture(args.fixture)
+    if not frames:
+        raise SystemExit(f"Fixture vazia: {args.fixture}")
+
+    if args.cmd == "serve":
+        serve(frames, args.speed, args.port, args.poll_ms)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            return
+    elif args.cmd == "push":
+        print(json.dumps(push(frames, args.url, args.speed, args.workers), indent=2))
+    elif args.cmd == "bench":
+        print(json.dumps(bench_parser(frames, args.repeticoes), indent=2))
+    elif args.cmd == "check":
+        resultado = check_roundtrip(frames)
+        print(json.dumps(resultado, indent=2, default=str))
+        if resultado["falhas"] or not resultado["conferidas"]:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+from datetime import datetime
+from typing import Iterable, List
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.database import dialect_insert, engine
+from app.core.schedule_index import (
+    HORARIO_RE,
+    bitmap_de_bytes,
+    bitmap_de_horarios,
+    bitmap_para_bytes,
+    horarios_do_bitmap,
+    indice_horarios,
+)
+from app.models.schedule import UserSchedule
+
+# A tabela user_schedules é a fonte da verdade; o índice em memória é
+# reconstruído no boot (carregar_indice) e atualizado depois de cada commit.
+# Com vários workers cada processo tem o seu índice: só enxerga mudanças
+# feitas por outro processo no próximo boot.
+
+schedules = UserSchedule.__table__
+
+
+def _validar_horarios(horarios: Iterable[str]) -> List[str]:
+    limpos = [(h or "").strip() for h in horarios or []]
+    invalidos = [h for h in limpos if not HORARIO_RE.match(h)]
+    if invalidos:
+        raise ValueError(f"Horários inválidos (use HH:MM): {', '.join(invalidos[:5])}")
+    return limpos
+
+
+def _resposta(ativo: bool, bitmap: int) -> dict:
+    horarios = horarios_do_bitmap(bitmap)
+    return {"ativo": ativo, "horarios": horarios, "total": len(horarios)}
+
+
+def get_schedule(db: Session, user_id: int) -> dict:
+    row = db.execute(
+        select(schedules.c.active, schedules.c.minutes).where(schedules.c.user_id == user_id)
+    ).first()
+    if row is None:
+        return _resposta(False, 0)
+    return _resposta(row.active, bitmap_de_bytes(row.minutes))
+
+
+def set_schedule(db: Session, user_id: int, ativo: bool, horarios: Iterable[str]) -> dict:
+    bitmap = bitmap_de_horarios(_validar_horarios(horarios))
+    ativo = bool(ativo and bitmap)
+    valores = {"active": ativo, "minutes": bitmap_para_bytes(bitmap), "updated_at": datetime.utcnow()}
+
+    insert = dialect_insert(db)
+    db.execute(
+        insert(schedules)
+        .values(user_id=user_id, **valores)
+        .on_conflict_do_update(index_elements=[schedules.c.user_id], set_=valores)
+    )
+    db.commit()
+
+    indice_horarios.definir(user_id, bitmap if ativo else 0)
+    return _resposta(ativo, bitmap)
+
+
+def clear_schedule(db: Session, user_id: int) -> dict:
+    return set_schedule(db, user_id, False, [])
+
+
+def carregar_indice(bind=engine) -> int:
+    """Reconstrói o índice minuto -> usuários a partir das agendas ativas."""
+    UserSchedule.__table__.create(bind, checkfirst=True)
+    indice_horarios.limpar()
+    with bind.connect() as conn:
+        linhas = conn.execute(
+            select(schedules.c.user_id, schedules.c.minutes).where(schedules.c.active.is_(True))
+        )
+        for user_id, minutes in linhas:
+            indice_horarios.definir(user_id, bitmap_de_bytes(minutes))
+    return len(indice_horarios)
+
+
+def usuarios_no_minuto(minuto: int) -> List[int]:
+    return indice_horarios.inscritos(minuto)
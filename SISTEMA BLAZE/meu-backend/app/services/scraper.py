@@ -1,9 +1,13 @@
+import json
 import os
 import re
+import tempfile
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterable, Tuple, Callable
 from urllib.parse import urljoin
 
 import requests
@@ -26,6 +30,14 @@ except Exception:
 
 from zoneinfo import ZoneInfo
 
+from app.core.game import cor_do_numero
+from app.core.metrics import (
+    SCRAPER_LOOP_SECONDS,
+    SCRAPER_POST_SECONDS,
+    WEBDRIVER_CALLS,
+    serve_metrics,
+)
+
 BR_TZ = ZoneInfo("America/Sao_Paulo")
 
 
@@ -38,8 +50,16 @@ def now_br() -> datetime:
 # =========================
 
 BLAZE_DOUBLE_URL_DEFAULT = "https://www.tipminer.com/br/historico/blaze/double"
+HISTORY_CONTAINER_SELECTOR = ".round-history"
 HISTORY_BUTTONS_SELECTOR = ".round-history button"
 
+# modo de detecção: "poll" (find_elements a cada ciclo) ou "observer" (MutationObserver no container)
+SCRAPER_MODE_POLL = "poll"
+SCRAPER_MODE_OBSERVER = "observer"
+
+OBSERVER_MAX_WAIT_SEC = 45.0
+OBSERVER_SNAPSHOT_ITEMS = 5
+
 RE_NUM = re.compile(r"\b(0|[1-9]|1[0-4])\b")
 RE_TIME = re.compile(r"\b([01]\d|2[0-3]):([0-5]\d)\b")
 
@@ -87,14 +107,6 @@ def safe_get_text(el) -> str:
         return ""
 
 
-def cor_do_numero(n: int) -> str:
-    if n == 0:
-        return "white"
-    if 1 <= n <= 7:
-        return "red"
-    return "black"
-
-
 def build_round_signature(round_data: Dict[str, Any]) -> str:
     n = round_data.get("numero")
     h = round_data.get("hora")
@@ -127,21 +139,33 @@ def build_api_url(path: str) -> str:
 # EXTRAÇÃO DE HORÁRIO
 # =========================
 
-def find_time_near_element(el) -> Optional[str]:
+def iter_child_texts(el) -> Iterable[str]:
     try:
         inner_elements = el.find_elements(By.XPATH, ".//*")
-        for child in inner_elements:
-            txt = safe_get_text(child)
-            mt = RE_TIME.search(txt)
-            if mt:
-                return f"{mt.group(1)}:{mt.group(2)}"
     except Exception:
-        pass
+        return
+    for child in inner_elements:
+        yield safe_get_text(child)
+
+
+def find_time_in_texts(texts: Iterable[str]) -> Optional[str]:
+    for txt in texts:
+        mt = RE_TIME.search(txt or "")
+        if mt:
+            return f"{mt.group(1)}:{mt.group(2)}"
     return None
 
 
-def parse_pedra_from_element(el) -> Optional[Dict[str, Any]]:
-    text = safe_get_text(el)
+def find_time_near_element(el) -> Optional[str]:
+    return find_time_in_texts(iter_child_texts(el))
+
+
+def parse_pedra_from_texts(text: str, child_texts: Iterable[str]) -> Optional[Dict[str, Any]]:
+    """
+    Mesmo parser de parse_pedra_from_element, mas sobre textos já extraídos
+    (ex: snapshot devolvido pelo MutationObserver em uma única chamada ao WebDriver).
+    """
+    text = (text or "").strip()
     if not text:
         return None
 
@@ -153,7 +177,7 @@ def parse_pedra_from_element(el) -> Optional[Dict[str, Any]]:
     if not (0 <= n <= 14):
         return None
 
-    hora = find_time_near_element(el)
+    hora = find_time_in_texts(child_texts)
     if not hora:
         return None  # ignora rodada sem horário real
 
@@ -166,6 +190,11 @@ def parse_pedra_from_element(el) -> Optional[Dict[str, Any]]:
     }
 
 
+def parse_pedra_from_element(el) -> Optional[Dict[str, Any]]:
+    # os filhos só são lidos (chamadas extras ao WebDriver) se o texto tiver número
+    return parse_pedra_from_texts(safe_get_text(el), iter_child_texts(el))
+
+
 # =========================
 # HORÁRIOS API
 # =========================
@@ -202,10 +231,201 @@ class HorariosClient:
             return HorariosState(False, [], now)
 
 
+# =========================
+# GRAVAÇÃO (fixtures para replay)
+# =========================
+
+class RoundRecorder:
+    """
+    Grava cada rodada nova e o snapshot do .round-history que a revelou em JSONL,
+    no formato lido por app.services.replay.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["RoundRecorder"]:
+        path = os.getenv("SCRAPER_RECORD_FILE")
+        return cls(path) if path else None
+
+    def record(self, latest: Dict[str, Any], items: Optional[List[Dict[str, Any]]], target: Optional[str] = None) -> None:
+        line = {
+            "t": time.time(),
+            "target": target,
+            "round": {k: latest.get(k) for k in ("numero", "cor", "hora", "hora_source")},
+            "items": items or [],
+        }
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(line, ensure_ascii=False, separators=(",", ":")) + "\n")
+        except OSError as e:
+            log(f"Erro ao gravar fixture: {e}")
+
+
+# =========================
+# CADÊNCIA DAS RODADAS
+# =========================
+
+class CadenceScheduler:
+    """
+    Aprende o intervalo entre rodadas (o Double roda em ciclo fixo) e decide
+    quanto tempo dormir na janela morta e quanto esperar perto do resultado.
+    Usa time.monotonic() para não sofrer com ajustes de relógio.
+    """
+
+    def __init__(
+        self,
+        min_period: float = 5.0,
+        max_period: float = 120.0,
+        guard_frac: float = 0.2,
+        min_guard: float = 2.0,
+        alpha: float = 0.3,
+        min_samples: int = 3,
+        max_misses: int = 3,
+        tight_poll_sec: float = 0.25,
+        default_poll_sec: float = 1.0,
+    ):
+        self.min_period = min_period
+        self.max_period = max_period
+        self.guard_frac = guard_frac
+        self.min_guard = min_guard
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.max_misses = max_misses
+        self.tight_poll_sec = tight_poll_sec
+        self.default_poll_sec = default_poll_sec
+        self.reset()
+
+    def reset(self) -> None:
+        self.period: Optional[float] = None
+        self.last_round_at: Optional[float] = None
+        self.samples = 0
+        self.misses = 0
+
+    @property
+    def learned(self) -> bool:
+        return self.period is not None and self.samples >= self.min_samples
+
+    def record_round(self, ts: float) -> None:
+        if self.last_round_at is not None:
+            dt = ts - self.last_round_at
+
+            # rodada(s) perdida(s): dt ~ k * período
+            if self.period and dt > 1.5 * self.period:
+                k = round(dt / self.period)
+                if k >= 2 and abs(dt - k * self.period) <= self.guard():
+                    dt = dt / k
+
+            if self.min_period <= dt <= self.max_period:
+                if self.period is None:
+                    self.period = dt
+                else:
+                    self.period = (1 - self.alpha) * self.period + self.alpha * dt
+                self.samples += 1
+
+        self.last_round_at = ts
+        self.misses = 0
+
+    def record_miss(self) -> None:
+        self.misses += 1
+        if self.misses >= self.max_misses:
+            # perdemos a fase (site parado, aba congelada...) -> reaprende do zero
+            self.reset()
+
+    def guard(self) -> float:
+        return max(self.min_guard, (self.period or 0.0) * self.guard_frac)
+
+    def window(self, now: float) -> Optional[Tuple[float, float]]:
+        """Janela [inicio, fim] em torno do próximo resultado esperado."""
+        if not self.learned or self.last_round_at is None:
+            return None
+
+        g = self.guard()
+        expected = self.last_round_at + self.period
+        # atrasado além da janela: projeta o próximo ciclo
+        while now > expected + g:
+            expected += self.period
+        return expected - g, expected + g
+
+    def plan_wait(self, now: float, max_wait: float) -> Tuple[float, float]:
+        """
+        Modo observer: (segundos para dormir, timeout do observer).
+        Sem cadência aprendida -> não dorme e espera até max_wait.
+        """
+        w = self.window(now)
+        if w is None:
+            return 0.0, max_wait
+
+        start, end = w
+        sleep_s = max(0.0, start - now)
+        timeout = min(max_wait, end - max(now, start))
+        return sleep_s, max(timeout, self.min_guard)
+
+    def poll_delay(self, now: float) -> float:
+        """Modo poll: dorme a janela morta e aperta o intervalo perto do resultado."""
+        w = self.window(now)
+        if w is None:
+            return self.default_poll_sec
+
+        start, _ = w
+        if now < start:
+            return start - now
+        return self.tight_poll_sec
+
+
 # =========================
 # DRIVER
 # =========================
 
+CHROMEDRIVER_CACHE_FILE_DEFAULT = os.path.join(tempfile.gettempdir(), "blaze_chromedriver_path")
+
+_chromedriver_path_cache: Optional[str] = None
+
+
+def resolve_chromedriver_path() -> str:
+    """
+    Resolve o chromedriver uma única vez:
+    1) CHROMEDRIVER_PATH do sistema (Docker/Render)
+    2) cache em memória / em arquivo de um install anterior do webdriver-manager
+    3) ChromeDriverManager().install() (rede) -> grava no cache
+    """
+    global _chromedriver_path_cache
+
+    chromedriver_path = os.getenv("CHROMEDRIVER_PATH", "/usr/bin/chromedriver")
+    if os.path.exists(chromedriver_path):
+        return chromedriver_path
+
+    if _chromedriver_path_cache and os.path.exists(_chromedriver_path_cache):
+        return _chromedriver_path_cache
+
+    cache_file = os.getenv("CHROMEDRIVER_CACHE_FILE", CHROMEDRIVER_CACHE_FILE_DEFAULT)
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            cached = f.read().strip()
+        if cached and os.path.exists(cached):
+            _chromedriver_path_cache = cached
+            return cached
+    except OSError:
+        pass
+
+    # Local (Windows/macOS) via webdriver-manager
+    if ChromeDriverManager is None:
+        raise RuntimeError(
+            "Chromedriver não encontrado e webdriver-manager não está disponível. "
+            "Instale webdriver-manager ou forneça CHROMEDRIVER_PATH."
+        )
+
+    _chromedriver_path_cache = ChromeDriverManager().install()
+    try:
+        with open(cache_file, "w", encoding="utf-8") as f:
+            f.write(_chromedriver_path_cache)
+    except OSError:
+        pass
+    return _chromedriver_path_cache
+
+
 def make_driver(headless: bool) -> webdriver.Chrome:
     chrome_options = Options()
 
@@ -214,40 +434,363 @@ def make_driver(headless: bool) -> webdriver.Chrome:
         chrome_options.add_argument("--headless=new")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
+    # abas em segundo plano (multi-alvo) não podem ter timers/render estrangulados
+    chrome_options.add_argument("--disable-background-timer-throttling")
+    chrome_options.add_argument("--disable-backgrounding-occluded-windows")
+    chrome_options.add_argument("--disable-renderer-backgrounding")
 
     # Se existir chromium no sistema (Docker)
     chromium_bin = os.getenv("CHROME_BIN", "/usr/bin/chromium")
-    chromedriver_path = os.getenv("CHROMEDRIVER_PATH", "/usr/bin/chromedriver")
-
-    service = None
 
     if os.path.exists(chromium_bin):
         chrome_options.binary_location = chromium_bin
 
-    # Se existir chromedriver do sistema (Docker/Render)
-    if os.path.exists(chromedriver_path):
-        service = Service(chromedriver_path)
-    else:
-        # Local (Windows/macOS) via webdriver-manager
-        if ChromeDriverManager is None:
-            raise RuntimeError(
-                "Chromedriver não encontrado e webdriver-manager não está disponível. "
-                "Instale webdriver-manager ou forneça CHROMEDRIVER_PATH."
-            )
-        service = Service(ChromeDriverManager().install())
+    service = Service(resolve_chromedriver_path())
 
     driver = webdriver.Chrome(service=service, options=chrome_options)
+    count_webdriver_calls(driver)
     driver.set_page_load_timeout(60)
     return driver
 
 
+def count_webdriver_calls(driver) -> None:
+    """Todo comando (inclusive de WebElement) passa por driver.execute: conta por tipo."""
+    original_execute = driver.execute
+
+    def execute(driver_command, params=None):
+        WEBDRIVER_CALLS.inc(command=driver_command)
+        return original_execute(driver_command, params)
+
+    driver.execute = execute
+
+
+# faixa protegida de ingestão na API (AdmissionMiddleware)
+INGEST_HEADERS = {"X-Ingest-Token": os.getenv("INGEST_TOKEN")} if os.getenv("INGEST_TOKEN") else {}
+
+
+def post_round(status_update_url: str, payload: Dict[str, Any]) -> None:
+    """POST /update_status carimbando o envio (a API mede detecção->envio->recebimento)."""
+    payload["enviado_em"] = time.time()
+    t0 = time.perf_counter()
+    try:
+        requests.post(status_update_url, json=payload, headers=INGEST_HEADERS, timeout=8).raise_for_status()
+    finally:
+        SCRAPER_POST_SECONDS.observe(time.perf_counter() - t0)
+
+
+# =========================
+# SUPERVISOR DO DRIVER
+# =========================
+
+def _proc_children() -> Dict[int, List[int]]:
+    children: Dict[int, List[int]] = {}
+    try:
+        pids = [int(p) for p in os.listdir("/proc") if p.isdigit()]
+    except OSError:
+        return children
+
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat", "r") as f:
+                stat = f.read()
+            # o nome do processo pode ter espaços/parênteses: corta no último ")"
+            ppid = int(stat[stat.rindex(")") + 2:].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(pid)
+    return children
+
+
+def process_tree_rss_bytes(root_pid: int) -> Optional[int]:
+    """RSS somado do processo e de todos os descendentes (Linux /proc). None se indisponível."""
+    if not os.path.isdir(f"/proc/{root_pid}"):
+        return None
+
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    children = _proc_children()
+    total = 0
+    stack = [root_pid]
+    seen = set()
+
+    while stack:
+        pid = stack.pop()
+        if pid in seen:
+            continue
+        seen.add(pid)
+        try:
+            with open(f"/proc/{pid}/statm", "r") as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, ValueError, IndexError):
+            pass
+        stack.extend(children.get(pid, []))
+
+    return total
+
+
+def driver_rss_bytes(driver) -> Optional[int]:
+    try:
+        pid = driver.service.process.pid
+    except Exception:
+        return None
+    return process_tree_rss_bytes(pid)
+
+
+STANDBY_OFF = "off"
+STANDBY_ON_RECYCLE = "on_recycle"
+STANDBY_ALWAYS = "always"
+
+
+class DriverSupervisor:
+    """
+    Mantém um WebDriver saudável para o loop:
+    - checa sessão e RSS (chromedriver + processos do Chromium) periodicamente
+    - recicla por memória, idade ou falhas consecutivas
+    - sobe um driver reserva já com a página carregada antes de trocar (sem buraco na cobertura)
+    O loop chama tick() a cada iteração e usa o driver devolvido.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        headless: bool,
+        max_rss_mb: float = 0,
+        max_age_sec: float = 0,
+        health_every_sec: float = 30,
+        max_failures: int = 5,
+        standby: str = STANDBY_ON_RECYCLE,
+        on_launch=None,
+        selector: str = HISTORY_BUTTONS_SELECTOR,
+    ):
+        self.url = url
+        self.selector = selector
+        self.headless = headless
+        self.max_rss_bytes = int(max_rss_mb * 1024 * 1024) if max_rss_mb else 0
+        self.max_age_sec = max_age_sec
+        self.health_every_sec = health_every_sec
+        self.max_failures = max_failures
+        self.standby_mode = standby
+        self.on_launch = on_launch
+
+        self.driver = None
+        self.started_at = 0.0
+        self.failures = 0
+        self.recycles = 0
+        self._last_check = 0.0
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="driver-standby")
+        self._standby: Optional[Future] = None
+        self._standby_reason: Optional[str] = None
+        # reserva do modo always: fica parada até uma troca, não é instalada só por estar pronta
+        self._standby_permanent = False
+        self._lock = threading.Lock()
+
+    # ---------- ciclo de vida ----------
+
+    def _launch(self):
+        driver = make_driver(headless=self.headless)
+        try:
+            driver.get(self.url)
+            WebDriverWait(driver, 30).until(
+                EC.presence_of_all_elements_located((By.CSS_SELECTOR, self.selector))
+            )
+            if self.on_launch:
+                self.on_launch(driver)
+        except Exception:
+            self._quit(driver)
+            raise
+        return driver
+
+    @staticmethod
+    def _quit(driver) -> None:
+        if driver is None:
+            return
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def start(self, stop: Optional[threading.Event] = None):
+        attempt = 0
+        while stop is None or not stop.is_set():
+            try:
+                self._install(self._launch(), reason="start")
+                break
+            except Exception as e:
+                attempt += 1
+                wait = min(60, 2 ** attempt)
+                log(f"Erro ao abrir URL do Blaze: {e} (nova tentativa em {wait}s)")
+                if stop is None:
+                    time.sleep(wait)
+                else:
+                    stop.wait(wait)
+
+        if self.standby_mode == STANDBY_ALWAYS:
+            self._prelaunch_permanent()
+        return self.driver
+
+    def _install(self, driver, reason: str) -> None:
+        with self._lock:
+            old = self.driver
+            self.driver = driver
+            self.started_at = time.monotonic()
+            self._last_check = self.started_at
+            self.failures = 0
+        if old is not None:
+            self.recycles += 1
+            log(f"♻️ Driver trocado ({reason}) - reciclagens: {self.recycles}")
+            self._quit(old)
+
+    def _prelaunch(self, reason: str, permanent: bool = False) -> None:
+        if self._standby is not None:
+            return
+        log(f"🔥 Subindo driver reserva ({reason})")
+        self._standby_reason = reason
+        self._standby_permanent = permanent
+        self._standby = self._pool.submit(self._launch)
+
+    def _prelaunch_permanent(self) -> None:
+        self._prelaunch("reserva permanente", permanent=True)
+
+    def _take_standby(self, block: bool):
+        fut = self._standby
+        if fut is None or (not block and not fut.done()):
+            return None
+        self._standby = None
+        try:
+            return fut.result()
+        except Exception as e:
+            log(f"Erro ao subir driver reserva: {e}")
+            return None
+
+    def close(self) -> None:
+        fut, self._standby = self._standby, None
+        if fut is not None:
+            try:
+                self._quit(fut.result(timeout=90))
+            except Exception:
+                pass
+        self._quit(self.driver)
+        self.driver = None
+        self._pool.shutdown(wait=False)
+
+    # ---------- saúde ----------
+
+    def report_success(self) -> None:
+        self.failures = 0
+
+    def report_failure(self, err: Exception) -> None:
+        self.failures += 1
+        # sessão morta não se recupera: não espera bater max_failures
+        if isinstance(err, WebDriverException) and not self.session_alive():
+            self.failures = max(self.failures, self.max_failures)
+
+    def session_alive(self) -> bool:
+        try:
+            self.driver.execute_script("return document.readyState")
+            return True
+        except Exception:
+            return False
+
+    def _recycle_reason(self, now: float) -> Optional[str]:
+        if self.max_age_sec and now - self.started_at >= self.max_age_sec:
+            return "idade"
+
+        if self.max_rss_bytes:
+            rss = driver_rss_bytes(self.driver)
+            if rss is not None and rss >= self.max_rss_bytes:
+                return f"memória {rss / 1024 / 1024:.0f}MB"
+
+        if not self.session_alive():
+            return "sessão inválida"
+        return None
+
+    def tick(self):
+        """Chamado a cada volta do loop. Devolve o driver que deve ser usado agora."""
+        now = time.monotonic()
+
+        # falha dura: troca já (pela reserva, se houver, ou relança na hora)
+        if self.failures >= self.max_failures:
+            new = self._take_standby(block=True)
+            if new is None:
+                try:
+                    new = self._launch()
+                except Exception as e:
+                    log(f"Erro ao relançar driver: {e}")
+                    time.sleep(5)
+                    return self.driver
+            self._install(new, reason=f"{self.failures} falhas seguidas")
+            if self.standby_mode == STANDBY_ALWAYS:
+                self._prelaunch_permanent()
+            return self.driver
+
+        # reserva pronta para uma reciclagem programada
+        if self._standby is not None and not self._standby_permanent:
+            new = self._take_standby(block=False)
+            if new is not None:
+                self._install(new, reason=self._standby_reason or "reciclagem")
+                return self.driver
+
+        if now - self._last_check < self.health_every_sec:
+            return self.driver
+        self._last_check = now
+
+        reason = self._recycle_reason(now)
+        if not reason:
+            return self.driver
+
+        if self.standby_mode == STANDBY_OFF:
+            self._quit(self.driver)
+            self.driver = None
+            try:
+                new = self._launch()
+            except Exception as e:
+                log(f"Erro ao relançar driver: {e}")
+                self.failures = self.max_failures
+                return self.driver
+            self._install(new, reason=reason)
+        elif self._standby is not None and self._standby_permanent:
+            if self._standby.done():
+                new = self._take_standby(block=False)
+                if new is not None:
+                    self._install(new, reason=reason)
+                self._prelaunch_permanent()
+        else:
+            self._prelaunch(reason)
+
+        return self.driver
+
+
 # =========================
 # CORE LOOP
 # =========================
 
-def iniciar_robo():
+def supervisor_kwargs_from_env() -> Dict[str, Any]:
+    return {
+        "max_rss_mb": float(os.getenv("DRIVER_MAX_RSS_MB", 1500)),
+        "max_age_sec": float(os.getenv("DRIVER_MAX_AGE_MIN", 720)) * 60,
+        "health_every_sec": float(os.getenv("DRIVER_HEALTH_EVERY_SEC", 30)),
+        "max_failures": int(os.getenv("DRIVER_MAX_FAILURES", 5)),
+        "standby": (os.getenv("DRIVER_STANDBY") or STANDBY_ON_RECYCLE).strip().lower(),
+    }
+
+
+def iniciar_robo(
+    stop: Optional[threading.Event] = None,
+    enviar: Optional[Callable[[Dict[str, Any]], None]] = None,
+    horarios_client=None,
+):
+    """
+    Processo separado: rodadas vão por POST /update_status e os horários vêm
+    de GET /horarios/permitidos. Embutido na API (app.services.scraper_embutido):
+    `enviar` entrega a rodada direto à ingestão, `horarios_client` lê o estado
+    em memória e `stop` encerra o loop.
+    """
     load_dotenv()
 
+    # vários alvos no mesmo processo (abas de um browser compartilhado / coletores HTTP)
+    if os.getenv("SCRAPER_TARGETS"):
+        from app.services.scraper_targets import iniciar_multi_alvos
+        return iniciar_multi_alvos(stop, enviar=enviar)
+
     blaze_url = os.getenv("BLAZE_URL", BLAZE_DOUBLE_URL_DEFAULT)
 
     # URLs (PROD via API_BASE_URL / DEV via fallback)
@@ -257,41 +800,108 @@ def iniciar_robo():
     # headless controlado por ENV
     headless = env_bool("HEADLESS", default=True)
 
+    # detecção por MutationObserver + agendamento pela cadência das rodadas
+    mode = (os.getenv("SCRAPER_MODE") or SCRAPER_MODE_POLL).strip().lower()
+    observer_mode = mode == SCRAPER_MODE_OBSERVER
+    observer_max_wait = float(os.getenv("OBSERVER_MAX_WAIT_SEC", OBSERVER_MAX_WAIT_SEC))
+    scheduler = CadenceScheduler() if env_bool("SCRAPER_ADAPTIVE", default=False) else None
+
     log("🤖 Robô Iniciado (Timezone Brasil fixado)")
     log(f"🌐 BLAZE_URL: {blaze_url}")
-    log(f"🕒 HORARIOS_API_URL: {horarios_url}")
-    log(f"📨 STATUS_UPDATE: {status_update_url}")
+    if enviar is None:
+        log(f"🕒 HORARIOS_API_URL: {horarios_url}")
+        log(f"📨 STATUS_UPDATE: {status_update_url}")
+        enviar = lambda payload: post_round(status_update_url, payload)
+    else:
+        log("📨 Ingestão direta (scraper embutido na API)")
     log(f"🧠 HEADLESS: {headless}")
-
-    horarios_client = HorariosClient(horarios_url)
-
-    driver = make_driver(headless=headless)
-
-    try:
-        driver.get(blaze_url)
-    except WebDriverException as e:
-        log(f"Erro ao abrir URL do Blaze: {e}")
-        raise
+    log(f"👀 SCRAPER_MODE: {SCRAPER_MODE_OBSERVER if observer_mode else SCRAPER_MODE_POLL}")
+    log(f"⏱️ SCRAPER_ADAPTIVE: {scheduler is not None}")
+
+    metrics_port = int(os.getenv("SCRAPER_METRICS_PORT", 0))
+    if metrics_port:
+        serve_metrics(metrics_port)
+        log(f"📈 /metrics do scraper na porta {metrics_port}")
+
+    recorder = RoundRecorder.from_env()
+    if recorder:
+        log(f"💾 Gravando snapshots em {recorder.path}")
+
+    if horarios_client is None:
+        horarios_client = HorariosClient(horarios_url)
+    stop = stop or threading.Event()
+
+    def on_launch(d):
+        if observer_mode:
+            d.set_script_timeout(observer_max_wait + 15)
+
+    supervisor = DriverSupervisor(
+        blaze_url,
+        headless=headless,
+        on_launch=on_launch,
+        **supervisor_kwargs_from_env(),
+    )
+    supervisor.start(stop)
 
     last_sig = None
+    last_head_key = None
     _ = BetState()  # reservado para evolução
 
-    while True:
+    loop_started = None
+
+    while not stop.is_set():
+        now_loop = time.perf_counter()
+        if loop_started is not None:
+            SCRAPER_LOOP_SECONDS.observe(now_loop - loop_started, collector="loop")
+        loop_started = now_loop
+
         try:
+            driver = supervisor.tick()
+
             _ = horarios_client.get_state()  # você pode usar isso depois para travar sinais
 
-            latest = get_latest_round(driver)
+            if observer_mode:
+                if scheduler:
+                    sleep_s, wait_s = scheduler.plan_wait(time.monotonic(), observer_max_wait)
+                    if sleep_s > 0:
+                        stop.wait(sleep_s)
+                else:
+                    wait_s = observer_max_wait
+
+                changed, latest, head_key, items = wait_for_new_round(driver, last_head_key, wait_s)
+                supervisor.report_success()
+                if not changed:
+                    if scheduler:
+                        scheduler.record_miss()
+                    continue
+                last_head_key = head_key
+            else:
+                latest = get_latest_round(driver)
+                supervisor.report_success()
+
             if not latest:
-                time.sleep(1)
+                stop.wait(1)
                 continue
 
+            detectado_em = time.time()
             sig = build_round_signature(latest)
             if sig == last_sig:
-                time.sleep(1)
+                if not observer_mode:
+                    stop.wait(scheduler.poll_delay(time.monotonic()) if scheduler else 1)
                 continue
 
+            # a primeira leitura é o estado da página, não uma rodada nova
+            if scheduler and last_sig is not None:
+                scheduler.record_round(time.monotonic())
+
             last_sig = sig
 
+            if recorder:
+                if not observer_mode:
+                    # no modo poll o snapshot só é lido quando a rodada muda (1 chamada extra)
+                    items = driver.execute_script(SNAPSHOT_JS, HISTORY_BUTTONS_SELECTOR, OBSERVER_SNAPSHOT_ITEMS) or []
+                recorder.record(latest, items)
+
             numero = latest["numero"]
             cor = latest["cor"]
             hora = latest.get("hora") or now_br().strftime("%H:%M")
@@ -302,19 +912,24 @@ def iniciar_robo():
                 "numero": numero,
                 "cor": cor,
                 "hora": hora,
-                "mensagem": None
+                "mensagem": None,
+                "detectado_em": detectado_em,
             }
 
             try:
-                requests.post(status_update_url, json=payload, timeout=8).raise_for_status()
+                enviar(payload)
             except Exception as e:
-                log(f"Erro POST update_status: {e}")
+                log(f"Erro ao enviar rodada: {e}")
 
-            time.sleep(1)
+            if not observer_mode:
+                stop.wait(scheduler.poll_delay(time.monotonic()) if scheduler else 1)
 
         except Exception as e:
             log(f"Erro loop: {e}")
-            time.sleep(2)
+            supervisor.report_failure(e)
+            stop.wait(2)
+
+    supervisor.close()
 
 
 def get_latest_round(driver):
@@ -331,5 +946,106 @@ def get_latest_round(driver):
     return None
 
 
+# =========================
+# MUTATION OBSERVER
+# =========================
+
+# extrator dos primeiros itens do histórico, comum aos scripts abaixo
+SNAPSHOT_FN_JS = r"""
+function textOf(el) { return ((el && el.innerText) || '').trim(); }
+
+function snapshot(sel, maxItems) {
+  var out = [];
+  var buttons = document.querySelectorAll(sel);
+  for (var i = 0; i < buttons.length && out.length < maxItems; i++) {
+    var kids = [];
+    var all = buttons[i].querySelectorAll('*');
+    for (var j = 0; j < all.length; j++) kids.push(textOf(all[j]));
+    out.push({text: textOf(buttons[i]), children: kids});
+  }
+  return out;
+}
+"""
+
+# snapshot síncrono dos primeiros itens do histórico (1 chamada ao WebDriver)
+SNAPSHOT_JS = SNAPSHOT_FN_JS + r"""
+return snapshot(arguments[0], arguments[1]);
+"""
+
+# Bloqueia dentro do browser até o primeiro item do histórico mudar (ou timeout)
+# e devolve um snapshot dos primeiros itens: 1 chamada ao WebDriver por rodada.
+WAIT_NEW_ROUND_JS = SNAPSHOT_FN_JS + r"""
+var containerSel = arguments[0], buttonSel = arguments[1], lastKey = arguments[2];
+var timeoutMs = arguments[3], maxItems = arguments[4];
+var done = arguments[arguments.length - 1];
+
+function headKey() {
+  var b = document.querySelector(buttonSel);
+  return b ? textOf(b) : null;
+}
+
+function finish(changed) {
+  done({changed: changed, head: headKey(), items: snapshot(buttonSel, maxItems)});
+}
+
+var key = headKey();
+if (key && key !== lastKey) { finish(true); return; }
+
+var container = document.querySelector(containerSel);
+if (!container) { setTimeout(function () { finish(false); }, Math.min(timeoutMs, 1000)); return; }
+
+var finished = false;
+var timer = null;
+var obs = new MutationObserver(function () {
+  if (finished) return;
+  var k = headKey();
+  if (k && k !== lastKey) {
+    finished = true;
+    obs.disconnect();
+    clearTimeout(timer);
+    finish(true);
+  }
+});
+obs.observe(container, {childList: true, subtree: true, characterData: true});
+timer = setTimeout(function () {
+  if (finished) return;
+  finished = true;
+  obs.disconnect();
+  finish(false);
+}, timeoutMs);
+"""
+
+
+def parse_latest_from_snapshot(items: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    for item in items or []:
+        rd = parse_pedra_from_texts(item.get("text") or "", item.get("children") or [])
+        if rd:
+            return rd
+    return None
+
+
+def wait_for_new_round(
+    driver, last_head_key: Optional[str], timeout_sec: float
+) -> Tuple[bool, Optional[Dict[str, Any]], Optional[str], List[Dict[str, Any]]]:
+    """
+    Retorna (mudou, rodada_mais_recente, chave_do_topo, itens_do_snapshot).
+    Requer driver.set_script_timeout maior que timeout_sec.
+    """
+    res = driver.execute_async_script(
+        WAIT_NEW_ROUND_JS,
+        HISTORY_CONTAINER_SELECTOR,
+        HISTORY_BUTTONS_SELECTOR,
+        last_head_key,
+        int(max(timeout_sec, 0.1) * 1000),
+        OBSERVER_SNAPSHOT_ITEMS,
+    ) or {}
+
+    if not res.get("changed"):
+        return False, None, last_head_key, []
+
+    items = res.get("items") or []
+    return True, parse_latest_from_snapshot(items), res.get("head"), items
+
+
 if __name__ == "__main__":
     iniciar_robo()
@@ -0,0 +1,106 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.metrics import SCRAPER_POST_SECONDS, SCRAPER_RESTARTS
+
+# Scraper dentro do processo da API (SCRAPER_EMBUTIDO=True): o mesmo loop do
+# app.services.scraper numa thread supervisionada, sem o segundo processo.
+# A rodada detectada vai direto para a ingestão no event loop (sem JSON,
+# HTTP e admissão no caminho) e os horários são lidos do estado em memória
+# em vez do polling em /horarios/permitidos.
+#
+# O loop do selenium é bloqueante: roda numa thread e entrega cada rodada
+# com run_coroutine_threadsafe, esperando o ack como esperaria o POST. Se o
+# robô cair, a thread relança com backoff exponencial (zerado depois de um
+# período estável). Um scraper por processo: use com um worker só.
+
+SCRAPER_EMBUTIDO_TIMEOUT_SEC = float(os.getenv("SCRAPER_EMBUTIDO_TIMEOUT_SEC", 8))
+SCRAPER_EMBUTIDO_BACKOFF_MAX_SEC = float(os.getenv("SCRAPER_EMBUTIDO_BACKOFF_MAX_SEC", 60))
+# rodou pelo menos isso antes de cair: recomeça o backoff do zero
+SCRAPER_EMBUTIDO_ESTAVEL_SEC = float(os.getenv("SCRAPER_EMBUTIDO_ESTAVEL_SEC", 300))
+
+
+def log(msg: str) -> None:
+    print(msg, flush=True)
+
+
+class ScraperEmbutido:
+    def __init__(
+        self,
+        ingerir: Callable[[Dict[str, Any]], Awaitable[Any]],
+        horarios: Callable[[], dict],
+    ):
+        self._ingerir = ingerir
+        self._horarios = horarios
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._parar = threading.Event()
+        # por execução: o multi-alvo seta o seu stop ao sair, e isso não pode
+        # desligar a supervisão
+        self._execucao = threading.Event()
+        self.reinicios = 0
+        self.ultimo_erro: Optional[str] = None
+
+    def iniciar(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._thread = threading.Thread(target=self._supervisionar, name="scraper-embutido", daemon=True)
+        self._thread.start()
+
+    def parar(self, timeout: float = 30) -> None:
+        """Bloqueante (chame via to_thread): sinaliza e espera o driver fechar."""
+        self._parar.set()
+        self._execucao.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # ---------- ponte com o robô ----------
+
+    def _enviar(self, payload: Dict[str, Any]) -> None:
+        """Lugar do POST /update_status: agenda a ingestão no event loop e espera o ack."""
+        payload["enviado_em"] = time.time()
+        t0 = time.perf_counter()
+        try:
+            futuro = asyncio.run_coroutine_threadsafe(self._ingerir(payload), self._loop)
+            futuro.result(timeout=SCRAPER_EMBUTIDO_TIMEOUT_SEC)
+        finally:
+            SCRAPER_POST_SECONDS.observe(time.perf_counter() - t0)
+
+    def get_state(self):
+        """Mesma interface do HorariosClient, lendo o estado da API em memória."""
+        from app.services.scraper import HorariosState
+
+        h = self._horarios()
+        return HorariosState(bool(h["ativo"]), list(h["horarios"]), time.time())
+
+    # ---------- supervisão ----------
+
+    def _supervisionar(self) -> None:
+        falhas = 0
+        while not self._parar.is_set():
+            inicio = time.monotonic()
+            self._execucao = threading.Event()
+            if self._parar.is_set():
+                break  # parar() chegou entre o teste do while e o Event novo
+            try:
+                # selenium só é importado aqui: não pesa no boot da API
+                from app.services.scraper import iniciar_robo
+
+                iniciar_robo(self._execucao, enviar=self._enviar, horarios_client=self)
+                self.ultimo_erro = "loop encerrado"
+            except Exception as e:
+                self.ultimo_erro = repr(e)
+
+            if self._parar.is_set():
+                break
+
+            if time.monotonic() - inicio >= SCRAPER_EMBUTIDO_ESTAVEL_SEC:
+                falhas = 0
+            falhas += 1
+            espera = min(SCRAPER_EMBUTIDO_BACKOFF_MAX_SEC, 2 ** falhas)
+            self.reinicios += 1
+            SCRAPER_RESTARTS.inc()
+            log(f"🔁 Scraper embutido caiu ({self.ultimo_erro}); reiniciando em {espera:g}s")
+            self._parar.wait(espera)
@@ -0,0 +1,403 @@
+import json
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Optional, Dict, Any, List, Callable, Iterable, Tuple
+
+import requests
+
+from app.services.scraper import (
+    BLAZE_DOUBLE_URL_DEFAULT,
+    HISTORY_BUTTONS_SELECTOR,
+    OBSERVER_SNAPSHOT_ITEMS,
+    SNAPSHOT_JS,
+    DriverSupervisor,
+    build_api_url,
+    RoundRecorder,
+    build_round_signature,
+    env_bool,
+    log,
+    now_br,
+    parse_pedra_from_texts,
+    post_round,
+    supervisor_kwargs_from_env,
+)
+from app.core.metrics import SCRAPER_LOOP_SECONDS, serve_metrics
+
+
+# =========================
+# CONFIG / CONSTANTS
+# =========================
+
+COLLECTOR_TAB = "tab"
+COLLECTOR_HTTP = "http"
+
+DEFAULT_TARGET = "blaze_double"
+
+# parser: (texto do item, textos dos filhos) -> rodada | None
+ItemParser = Callable[[str, Iterable[str]], Optional[Dict[str, Any]]]
+
+PARSERS: Dict[str, ItemParser] = {
+    "round_history": parse_pedra_from_texts,
+}
+
+
+# =========================
+# REGISTRO DE ALVOS
+# =========================
+
+@dataclass
+class ScrapeTarget:
+    name: str  # também é a tag de ingestão ("origem" no /update_status)
+    url: str
+    selector: str = HISTORY_BUTTONS_SELECTOR
+    collector: str = COLLECTOR_TAB
+    parser: str = "round_history"
+    interval_sec: float = 1.0
+
+    def parse_items(self, items: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        parse = PARSERS[self.parser]
+        for item in items or []:
+            rd = parse(item.get("text") or "", item.get("children") or [])
+            if rd:
+                return rd
+        return None
+
+
+TARGETS: Dict[str, ScrapeTarget] = {}
+
+
+def register_target(target: ScrapeTarget) -> ScrapeTarget:
+    if target.collector not in (COLLECTOR_TAB, COLLECTOR_HTTP):
+        raise ValueError(f"Coletor inválido para {target.name}: {target.collector}")
+    if target.parser not in PARSERS:
+        raise ValueError(f"Parser desconhecido para {target.name}: {target.parser}")
+    TARGETS[target.name] = target
+    return target
+
+
+register_target(ScrapeTarget(
+    name=DEFAULT_TARGET,
+    url=os.getenv("BLAZE_URL", BLAZE_DOUBLE_URL_DEFAULT),
+))
+
+
+def load_targets_from_env() -> List[ScrapeTarget]:
+    """
+    SCRAPER_TARGETS aceita:
+    - nomes já registrados separados por vírgula: "blaze_double,outro"
+    - JSON com a definição completa: [{"name": "...", "url": "...", "collector": "http"}, ...]
+    """
+    raw = (os.getenv("SCRAPER_TARGETS") or "").strip()
+    if not raw:
+        return [TARGETS[DEFAULT_TARGET]]
+
+    if raw.startswith("["):
+        return [register_target(ScrapeTarget(**cfg)) for cfg in json.loads(raw)]
+
+    out = []
+    for name in [n.strip() for n in raw.split(",") if n.strip()]:
+        if name not in TARGETS:
+            raise ValueError(f"Alvo não registrado: {name}")
+        out.append(TARGETS[name])
+    return out
+
+
+# =========================
+# HTML (coletor sem browser)
+# =========================
+
+class _ItemsExtractor(HTMLParser):
+    """
+    Extrai (texto, textos dos filhos) dos elementos que casam com um seletor
+    simples: "tag", ".classe", ".classe tag" (descendente).
+    """
+
+    VOID = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+    def __init__(self, selector: str):
+        super().__init__(convert_charrefs=True)
+        parts = selector.split()
+        self.container_class = parts[0][1:] if len(parts) == 2 and parts[0].startswith(".") else None
+        last = parts[-1]
+        self.item_class = last[1:] if last.startswith(".") else None
+        self.item_tag = None if last.startswith(".") else last.lower()
+
+        self.items: List[Dict[str, Any]] = []
+        self._container_depth: Optional[int] = None
+        self._depth = 0
+        self._item: Optional[Dict[str, Any]] = None
+        self._item_depth = 0
+        self._child_stack: List[List[str]] = []
+
+    def _matches_item(self, tag: str, classes: List[str]) -> bool:
+        if self.item_tag and tag != self.item_tag:
+            return False
+        if self.item_class and self.item_class not in classes:
+            return False
+        return True
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.VOID:
+            return
+        self._depth += 1
+        classes = (dict(attrs).get("class") or "").split()
+
+        if self.container_class and self._container_depth is None and self.container_class in classes:
+            self._container_depth = self._depth
+
+        in_container = self.container_class is None or self._container_depth is not None
+        if self._item is None and in_container and self._matches_item(tag, classes):
+            self._item = {"text": [], "children": []}
+            self._item_depth = self._depth
+            return
+
+        if self._item is not None:
+            self._child_stack.append([])
+
+    def handle_endtag(self, tag):
+        if tag in self.VOID:
+            return
+        if self._item is not None:
+            if self._depth == self._item_depth:
+                self.items.append({
+                    "text": " ".join(self._item["text"]).strip(),
+                    "children": self._item["children"],
+                })
+                self._item = None
+                self._child_stack = []
+            elif self._child_stack:
+                self._item["children"].append(" ".join(self._child_stack.pop()).strip())
+
+        if self._container_depth is not None and self._depth == self._container_depth:
+            self._container_depth = None
+        self._depth -= 1
+
+    def handle_data(self, data):
+        if self._item is None:
+            return
+        txt = data.strip()
+        if not txt:
+            return
+        self._item["text"].append(txt)
+        # texto conta para todos os filhos abertos (como innerText)
+        for buf in self._child_stack:
+            buf.append(txt)
+
+
+def extract_items_from_html(html: str, selector: str, max_items: int = OBSERVER_SNAPSHOT_ITEMS) -> List[Dict[str, Any]]:
+    parser = _ItemsExtractor(selector)
+    parser.feed(html or "")
+    parser.close()
+    return parser.items[:max_items]
+
+
+# =========================
+# DESPACHO (assinatura por alvo + POST com tag)
+# =========================
+
+class RoundDispatcher:
+    def __init__(
+        self,
+        status_update_url: str,
+        pool: ThreadPoolExecutor,
+        recorder: Optional[RoundRecorder] = None,
+        enviar: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        self.status_update_url = status_update_url
+        self.pool = pool
+        # embutido na API: entrega direto à ingestão em vez do POST
+        self.enviar = enviar or (lambda payload: post_round(self.status_update_url, payload))
+        self.recorder = recorder
+        self._last_sig: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def __call__(
+        self, target: ScrapeTarget, latest: Optional[Dict[str, Any]], items: Optional[List[Dict[str, Any]]] = None
+    ) -> None:
+        if not latest:
+            return
+
+        detectado_em = time.time()
+        sig = build_round_signature(latest)
+        with self._lock:
+            if self._last_sig.get(target.name) == sig:
+                return
+            self._last_sig[target.name] = sig
+
+        if self.recorder:
+            self.recorder.record(latest, items, target=target.name)
+
+        hora = latest.get("hora") or now_br().strftime("%H:%M")
+        log(f"📡 [{target.name}] {latest['numero']} ({latest['cor']}) [{hora}]")
+
+        payload = {
+            "numero": latest["numero"],
+            "cor": latest["cor"],
+            "hora": hora,
+            "mensagem": None,
+            "origem": target.name,
+            "detectado_em": detectado_em,
+        }
+        # o POST não segura a aba/coletor
+        self.pool.submit(self._post, payload)
+
+    def _post(self, payload: Dict[str, Any]) -> None:
+        try:
+            self.enviar(payload)
+        except Exception as e:
+            log(f"Erro ao enviar rodada [{payload.get('origem')}]: {e}")
+
+
+# =========================
+# COLETORES
+# =========================
+
+class TabCollector:
+    """Um browser compartilhado, uma aba por alvo, percorridas em round-robin por uma única thread."""
+
+    def __init__(self, targets: List[ScrapeTarget], headless: bool, dispatch: RoundDispatcher):
+        self.targets = targets
+        self.dispatch = dispatch
+        self.interval_sec = min(t.interval_sec for t in targets)
+        self.headless = headless
+        self._handles: "weakref.WeakKeyDictionary[Any, Dict[str, str]]" = weakref.WeakKeyDictionary()
+        self.supervisor: Optional[DriverSupervisor] = None
+
+    def _open_tabs(self, driver) -> None:
+        handles = {self.targets[0].name: driver.current_window_handle}
+        for t in self.targets[1:]:
+            driver.switch_to.new_window("tab")
+            driver.get(t.url)
+            handles[t.name] = driver.current_window_handle
+        self._handles[driver] = handles
+
+    def run(self, stop: threading.Event) -> None:
+        # supervisor novo a cada (re)início do coletor
+        self.supervisor = DriverSupervisor(
+            self.targets[0].url,
+            headless=self.headless,
+            on_launch=self._open_tabs,
+            selector=self.targets[0].selector,
+            **supervisor_kwargs_from_env(),
+        )
+        self.supervisor.start(stop)
+        try:
+            while not stop.is_set():
+                started = time.monotonic()
+                driver = self.supervisor.tick()
+                if driver is None:
+                    # relançamento falhou (STANDBY_OFF): o próximo tick tenta de novo
+                    stop.wait(self.interval_sec)
+                    continue
+                handles = self._handles.get(driver, {})
+
+                for t in self.targets:
+                    try:
+                        driver.switch_to.window(handles[t.name])
+                        items = driver.execute_script(SNAPSHOT_JS, t.selector, OBSERVER_SNAPSHOT_ITEMS) or []
+                        self.supervisor.report_success()
+                        self.dispatch(t, t.parse_items(items), items)
+                    except Exception as e:
+                        log(f"Erro aba [{t.name}]: {e}")
+                        self.supervisor.report_failure(e)
+
+                SCRAPER_LOOP_SECONDS.observe(time.monotonic() - started, collector="browser")
+                stop.wait(max(0.0, self.interval_sec - (time.monotonic() - started)))
+        finally:
+            self.supervisor.close()
+
+
+class HttpCollector:
+    """Alvo sem browser: baixa o HTML e reaproveita o mesmo parser de itens."""
+
+    def __init__(self, target: ScrapeTarget, dispatch: RoundDispatcher):
+        self.target = target
+        self.dispatch = dispatch
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = "Mozilla/5.0 (X11; Linux x86_64) BlazeHunters/1.0"
+
+    def collect_once(self) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+        r = self.session.get(self.target.url, timeout=8)
+        r.raise_for_status()
+        items = extract_items_from_html(r.text, self.target.selector)
+        return self.target.parse_items(items), items
+
+    def run(self, stop: threading.Event) -> None:
+        failures = 0
+        while not stop.is_set():
+            started = time.monotonic()
+            try:
+                self.dispatch(self.target, *self.collect_once())
+                failures = 0
+            except Exception as e:
+                failures += 1
+                log(f"Erro coletor HTTP [{self.target.name}]: {e}")
+
+            SCRAPER_LOOP_SECONDS.observe(time.monotonic() - started, collector=f"http:{self.target.name}")
+            backoff = min(30.0, 2.0 ** failures) if failures else 0.0
+            stop.wait(max(backoff, self.target.interval_sec - (time.monotonic() - started)))
+
+
+# =========================
+# CORE LOOP (multi-alvo)
+# =========================
+
+def plan_collectors(
+    targets: List[ScrapeTarget], headless: bool, dispatch: RoundDispatcher
+) -> List[Tuple[str, Any]]:
+    collectors: List[Tuple[str, Any]] = []
+
+    tab_targets = [t for t in targets if t.collector == COLLECTOR_TAB]
+    if tab_targets:
+        collectors.append(("browser", TabCollector(tab_targets, headless, dispatch)))
+
+    for t in targets:
+        if t.collector == COLLECTOR_HTTP:
+            collectors.append((f"http:{t.name}", HttpCollector(t, dispatch)))
+
+    return collectors
+
+
+def iniciar_multi_alvos(
+    stop: Optional[threading.Event] = None,
+    enviar: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> None:
+    targets = load_targets_from_env()
+    status_update_url = os.getenv("STATUS_UPDATE") or build_api_url("/update_status")
+    headless = env_bool("HEADLESS", default=True)
+    workers = int(os.getenv("SCRAPER_WORKERS", 4))
+
+    log("🤖 Robô Multi-Alvo Iniciado")
+    for t in targets:
+        log(f"🎯 {t.name} [{t.collector}] {t.url} ({t.selector})")
+    log(f"📨 STATUS_UPDATE: {status_update_url}" if enviar is None else "📨 Ingestão direta (scraper embutido na API)")
+
+    metrics_port = int(os.getenv("SCRAPER_METRICS_PORT", 0))
+    if metrics_port:
+        serve_metrics(metrics_port)
+
+    stop = stop or threading.Event()
+    post_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest-post")
+    dispatch = RoundDispatcher(status_update_url, post_pool, RoundRecorder.from_env(), enviar)
+    collectors = plan_collectors(targets, headless, dispatch)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(collectors)), thread_name_prefix="collector") as pool:
+        futures = {pool.submit(c.run, stop): name for name, c in collectors}
+        try:
+            while not stop.is_set():
+                for fut, name in list(futures.items()):
+                    if fut.done():
+                        err = fut.exception()
+                        log(f"Coletor {name} parou ({err}); reiniciando")
+                        collector = dict(collectors)[name]
+                        del futures[fut]
+                        futures[pool.submit(collector.run, stop)] = name
+                stop.wait(5)
+        finally:
+            stop.set()
+            post_pool.shutdown(wait=False)
@@ -0,0 +1,216 @@
+"""
+Simulador Monte Carlo de estratégias de gale/martingale no Double.
+
+As rodadas saem da distribuição real do jogo (número 0-14 equiprovável,
+cor via cor_do_numero) e são sorteadas de uma vez numa matriz NumPy
+(rodadas x simulações). As estratégias rodam todas juntas sobre a mesma
+matriz (números aleatórios comuns: a diferença entre elas não é ruído de
+sorteio) e o estado de cada par (simulação, estratégia) avança por
+operações vetorizadas, uma iteração por rodada.
+
+Estratégia: entra na cor alvo com `aposta`; se perder, dobra (multiplica
+por `progressao`) na rodada seguinte até `max_gales` vezes. Com `horarios`
+a entrada só começa em rodadas cujo minuto do dia está na lista (gales
+seguem fora dela). Ruína = banca sem saldo para a próxima aposta exigida;
+a simulação para ali.
+"""
+import os
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # opcional: sem NumPy a rota de simulação responde 503
+    np = None
+
+from app.core.game import CORES, NUMEROS, PAGAMENTOS, cor_do_numero
+
+# limite de trabalho por chamada: rodadas x simulações x estratégias
+SIMULACAO_MAX_PASSOS = int(os.getenv("SIMULACAO_MAX_PASSOS", 200_000_000))
+MINUTOS_DIA = 24 * 60
+PERCENTIS = (5, 25, 50, 75, 95)
+
+
+@dataclass
+class Estrategia:
+    cor: str = "red"
+    max_gales: int = 2
+    aposta: float = 1.0
+    progressao: float = 2.0
+    horarios: List[str] = field(default_factory=list)
+    nome: Optional[str] = None
+
+
+def disponivel() -> bool:
+    return np is not None
+
+
+def _minuto(hhmm: str) -> int:
+    h, m = hhmm.split(":")
+    return int(h) * 60 + int(m)
+
+
+def _validar(estrategias: Sequence[Estrategia], simulacoes: int, rodadas: int) -> None:
+    if not estrategias:
+        raise ValueError("Informe ao menos uma estratégia")
+    for e in estrategias:
+        if e.cor not in PAGAMENTOS:
+            raise ValueError(f"Cor inválida: {e.cor}")
+        if e.max_gales < 0 or e.aposta <= 0 or e.progressao < 1:
+            raise ValueError("max_gales >= 0, aposta > 0 e progressao >= 1")
+    if simulacoes < 1 or rodadas < 1:
+        raise ValueError("simulacoes e rodadas devem ser >= 1")
+    passos = simulacoes * rodadas * len(estrategias)
+    if passos > SIMULACAO_MAX_PASSOS:
+        raise ValueError(f"Simulação grande demais ({passos} passos, máximo {SIMULACAO_MAX_PASSOS})")
+
+
+def _tabela_cores():
+    """número -> código da cor (índice em CORES)"""
+    return np.array([CORES.index(cor_do_numero(n)) for n in range(NUMEROS)], dtype=np.uint8)
+
+
+def sortear_cores(rng, rodadas: int, simulacoes: int):
+    """Matriz (rodadas, simulações) de códigos de cor com a distribuição 0-14 do jogo."""
+    numeros = rng.integers(0, NUMEROS, size=(rodadas, simulacoes), dtype=np.uint8)
+    return _tabela_cores()[numeros]
+
+
+def _janelas_permitidas(estrategias: Sequence[Estrategia], rodadas: int, intervalo_seg: int, inicio: str):
+    """(rodadas, estratégias): a rodada t pode abrir ciclo na estratégia p?"""
+    segundos = np.arange(rodadas, dtype=np.int64) * intervalo_seg
+    minuto = (_minuto(inicio) + segundos // 60) % MINUTOS_DIA
+
+    permitido = np.ones((rodadas, len(estrategias)), dtype=bool)
+    for p, e in enumerate(estrategias):
+        if e.horarios:
+            permitido[:, p] = np.isin(minuto, [_minuto(h) for h in e.horarios])
+    return permitido
+
+
+def _resumo(estrategia: Estrategia, banca_inicial: float, final, ruina, drawdown, ciclos, perdidos, bins: int) -> dict:
+    contagens, limites = np.histogram(final, bins=bins)
+    total_ciclos = int(ciclos.sum())
+    p_alvo = sum(1 for n in range(NUMEROS) if cor_do_numero(n) == estrategia.cor) / NUMEROS
+
+    return {
+        "estrategia": {
+            "nome": estrategia.nome,
+            "cor": estrategia.cor,
+            "max_gales": estrategia.max_gales,
+            "aposta": estrategia.aposta,
+            "progressao": estrategia.progressao,
+            "horarios": len(estrategia.horarios),
+        },
+        "banca_final": {
+            "media": round(float(final.mean()), 2),
+            "desvio": round(float(final.std()), 2),
+            "min": round(float(final.min()), 2),
+            "max": round(float(final.max()), 2),
+            **{f"p{q}": round(float(v), 2) for q, v in zip(PERCENTIS, np.percentile(final, PERCENTIS))},
+        },
+        "histograma": {
+            "limites": [round(float(x), 2) for x in limites],
+            "contagens": contagens.tolist(),
+        },
+        "prob_ruina": round(float(ruina.mean()), 4),
+        "prob_lucro": round(float((final > banca_inicial).mean()), 4),
+        "drawdown_medio": round(float(drawdown.mean()), 2),
+        "drawdown_p95": round(float(np.percentile(drawdown, 95)), 2),
+        "ciclos_medios": round(total_ciclos / len(final), 2),
+        "taxa_ciclos_perdidos": round(int(perdidos.sum()) / total_ciclos, 4) if total_ciclos else 0.0,
+        # chance de perder um ciclo inteiro (todas as max_gales + 1 entradas)
+        "perda_ciclo_teorica": round((1 - p_alvo) ** (estrategia.max_gales + 1), 4),
+    }
+
+
+def simular(
+    estrategias: Sequence[Estrategia],
+    simulacoes: int = 1000,
+    rodadas: int = 2880,
+    banca_inicial: float = 100.0,
+    seed: Optional[int] = None,
+    intervalo_seg: int = 30,
+    inicio: str = "00:00",
+    bins: int = 20,
+) -> dict:
+    """
+    Roda `simulacoes` caminhos de `rodadas` rodadas para cada estratégia e
+    devolve distribuição da banca final, probabilidade de ruína e drawdown.
+    """
+    if np is None:
+        raise RuntimeError("NumPy não instalado (pip install numpy)")
+    _validar(estrategias, simulacoes, rodadas)
+
+    t0 = time.perf_counter()
+    seed = int(np.random.SeedSequence().entropy % 2**63) if seed is None else seed
+    rng = np.random.default_rng(seed)
+    cores = sortear_cores(rng, rodadas, simulacoes)
+    permitido = _janelas_permitidas(estrategias, rodadas, intervalo_seg, inicio)
+    sorteio_s = time.perf_counter() - t0
+
+    P = len(estrategias)
+    alvo = np.array([CORES.index(e.cor) for e in estrategias], dtype=np.uint8)
+    lucro = np.array([PAGAMENTOS[e.cor] - 1 for e in estrategias], dtype=np.float64)
+    max_gales = np.array([e.max_gales for e in estrategias], dtype=np.int16)
+
+    # stake[p, k]: valor da k-ésima entrada do ciclo (k = 0 é a entrada, k > 0 gales)
+    niveis = int(max_gales.max()) + 1
+    stake = np.array([[e.aposta * e.progressao ** k for k in range(niveis)] for e in estrategias])
+    colunas = np.arange(P)[None, :]
+
+    banca = np.full((simulacoes, P), float(banca_inicial))
+    pico = banca.copy()
+    drawdown = np.zeros_like(banca)
+    nivel = np.full((simulacoes, P), -1, dtype=np.int16)  # -1 = fora de ciclo
+    ruina = np.zeros((simulacoes, P), dtype=bool)
+    ciclos = np.zeros((simulacoes, P), dtype=np.int32)
+    perdidos = np.zeros((simulacoes, P), dtype=np.int32)
+
+    for t in range(rodadas):
+        entra = (nivel < 0) & permitido[t] & ~ruina
+        nivel[entra] = 0
+        ativo = nivel >= 0
+        if not ativo.any():
+            continue
+
+        valor = stake[colunas, np.maximum(nivel, 0)]
+        sem_banca = ativo & (valor > banca)
+        if sem_banca.any():
+            ruina |= sem_banca
+            ativo &= ~sem_banca
+            nivel[sem_banca] = -1
+        ciclos += entra & ativo
+
+        acerto = cores[t][:, None] == alvo
+        ganhou = ativo & acerto
+        perdeu = ativo & ~acerto
+
+        banca += np.where(ganhou, valor * lucro, 0.0) - np.where(perdeu, valor, 0.0)
+        np.maximum(pico, banca, out=pico)
+        np.maximum(drawdown, pico - banca, out=drawdown)
+
+        nivel[ganhou] = -1
+        nivel += perdeu
+        estourou = perdeu & (nivel > max_gales)
+        perdidos += estourou
+        nivel[estourou] = -1
+
+    total_s = time.perf_counter() - t0
+    return {
+        "seed": seed,
+        "simulacoes": simulacoes,
+        "rodadas": rodadas,
+        "banca_inicial": banca_inicial,
+        "resultados": [
+            _resumo(e, banca_inicial, banca[:, p], ruina[:, p], drawdown[:, p], ciclos[:, p], perdidos[:, p], bins)
+            for p, e in enumerate(estrategias)
+        ],
+        "tempo": {
+            "sorteio_s": round(sorteio_s, 4),
+            "total_s": round(total_s, 4),
+            "rodadas_por_s": round(simulacoes * rodadas / total_s),
+            "passos_por_s": round(simulacoes * rodadas * P / total_s),
+        },
+    }
@@ -1,18 +1,258 @@
+from datetime import datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from sqlalchemy import and_, func, insert, literal, select, update
 from sqlalchemy.orm import Session
-from app.models.user import User
 
+from app.core.config import settings
+from app.core.database import dialect_insert
+from app.models.summary import WalletMonthlySummary
+from app.models.transaction import WalletTransaction
+from app.models.wallet import Wallet, WalletSnapshot
+
+# Saldo em centavos inteiros. Toda mudança é um único UPDATE condicional
+# (balance_cents = balance_cents + delta WHERE balance_cents >= débito) seguido
+# de um lançamento no ledger, na mesma transação. O lock de linha do próprio
+# UPDATE serializa apostas concorrentes do mesmo usuário: nada de
+# ler-modificar-gravar nem lock na aplicação.
+
+wallets = Wallet.__table__
+snapshots = WalletSnapshot.__table__
+resumo = WalletMonthlySummary.__table__
+
+# tipo do lançamento -> coluna do resumo mensal (valor absoluto)
+TIPO_COLUNA = {
+    "deposit": "deposits_cents",
+    "bet": "bets_cents",
+    "win": "wins_cents",
+}
+COLUNAS_RESUMO = ("deposits_cents", "bets_cents", "wins_cents", "net_cents", "transactions")
+
+
+class SaldoInsuficiente(ValueError):
+    pass
+
+
+def to_cents(amount) -> int:
+    """Converte reais (float/str/Decimal) para centavos, arredondando meio para cima."""
+    try:
+        valor = Decimal(str(amount))
+    except (InvalidOperation, ValueError):
+        raise ValueError("Valor inválido")
+
+    if not valor.is_finite():
+        raise ValueError("Valor inválido")
+
+    cents = int((valor * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    if cents <= 0:
+        raise ValueError("Valor inválido")
+    return cents
+
+
+def _lancar(db: Session, user_id: int, delta: int, tipo: str) -> WalletTransaction:
+    stmt = (
+        update(wallets)
+        .where(wallets.c.user_id == user_id)
+        .values(
+            balance_cents=wallets.c.balance_cents + delta,
+            tx_since_snapshot=wallets.c.tx_since_snapshot + 1,
+        )
+        .returning(wallets.c.balance_cents, wallets.c.tx_since_snapshot)
+    )
+    if delta < 0:
+        stmt = stmt.where(wallets.c.balance_cents >= -delta)
+
+    row = db.execute(stmt).first()
+    if row is None:
+        existe = db.execute(select(wallets.c.id).where(wallets.c.user_id == user_id)).first()
+        if not existe:
+            raise ValueError("Carteira não encontrada")
+        raise SaldoInsuficiente("Saldo insuficiente")
+
+    tx = WalletTransaction(
+        user_id=user_id,
+        amount_cents=delta,
+        balance_after_cents=row.balance_cents,
+        type=tipo,
+        created_at=datetime.utcnow(),
+    )
+    db.add(tx)
+    db.flush()
+    somar_resumo_mensal(db, [(user_id, tipo, delta, tx.created_at)])
+
+    if row.tx_since_snapshot >= settings.WALLET_SNAPSHOT_EVERY:
+        _gravar_snapshot(db, user_id, row.balance_cents, tx.id)
+
+    return tx
+
+
+def _gravar_snapshot(db: Session, user_id: int, balance_cents: int, last_tx_id: int) -> None:
+    db.execute(insert(snapshots).values(
+        user_id=user_id,
+        balance_cents=balance_cents,
+        last_tx_id=last_tx_id,
+    ))
+    db.execute(
+        update(wallets)
+        .where(wallets.c.user_id == user_id)
+        .values(tx_since_snapshot=0)
+    )
+
+
+# =========================
+#  RESUMO MENSAL DO EXTRATO
+# =========================
 
-def deposit(db: Session, user_id: int, amount: float):
-    if amount <= 0:
+def mes_de(quando: datetime) -> str:
+    return quando.strftime("%Y-%m")
+
+
+def _upsert_resumo(db: Session, stmt) -> None:
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[resumo.c.user_id, resumo.c.month],
+        set_={c: resumo.c[c] + stmt.excluded[c] for c in COLUNAS_RESUMO},
+    )
+    db.execute(stmt)
+
+
+def somar_resumo_mensal(db: Session, lancamentos) -> None:
+    """
+    Soma lançamentos (user_id, tipo, amount_cents, created_at) no resumo
+    mensal, agregando por (usuário, mês) antes do upsert.
+    """
+    totais = {}
+    for user_id, tipo, cents, quando in lancamentos:
+        linha = totais.setdefault((user_id, mes_de(quando)), dict.fromkeys(COLUNAS_RESUMO, 0))
+        coluna = TIPO_COLUNA.get(tipo)
+        if coluna:
+            linha[coluna] += abs(cents)
+        linha["net_cents"] += cents
+        linha["transactions"] += 1
+
+    if not totais:
+        return
+
+    _upsert_resumo(db, dialect_insert(db)(resumo).values([
+        {"user_id": user_id, "month": mes, **linha}
+        for (user_id, mes), linha in totais.items()
+    ]))
+
+
+def somar_resumo_mensal_select(db: Session, consulta) -> None:
+    """Versão set-based: consulta devolve (user_id, month, *COLUNAS_RESUMO)."""
+    _upsert_resumo(db, dialect_insert(db)(resumo).from_select(
+        ["user_id", "month", *COLUNAS_RESUMO], consulta,
+    ))
+
+
+def get_monthly_summary(db: Session, user_id: int, meses: int = 12) -> list:
+    linhas = db.execute(
+        select(resumo)
+        .where(resumo.c.user_id == user_id)
+        .order_by(resumo.c.month.desc())
+        .limit(meses)
+    ).all()
+    return [
+        {
+            "month": r.month,
+            "deposits": r.deposits_cents / 100,
+            "bets": r.bets_cents / 100,
+            "wins": r.wins_cents / 100,
+            "net": r.net_cents / 100,
+            "transactions": r.transactions,
+        }
+        for r in linhas
+    ]
+
+
+def snapshot_due(db: Session, user_ids) -> None:
+    """
+    Versão set-based de _gravar_snapshot para lotes (liquidação, apostas em lote):
+    grava snapshot das carteiras de user_ids (lista ou SELECT) que passaram do limite.
+    """
+    ledger = WalletTransaction.__table__
+    ultimo_tx = (
+        select(func.max(ledger.c.id))
+        .where(ledger.c.user_id == wallets.c.user_id)
+        .scalar_subquery()
+    )
+    precisam = and_(
+        wallets.c.user_id.in_(user_ids),
+        wallets.c.tx_since_snapshot >= settings.WALLET_SNAPSHOT_EVERY,
+    )
+
+    db.execute(insert(snapshots).from_select(
+        ["user_id", "balance_cents", "last_tx_id", "created_at"],
+        select(
+            wallets.c.user_id,
+            wallets.c.balance_cents,
+            ultimo_tx,
+            literal(datetime.utcnow(), snapshots.c.created_at.type),
+        ).where(precisam),
+    ))
+    db.execute(update(wallets).where(precisam).values(tx_since_snapshot=0))
+
+
+def credit(db: Session, user_id: int, cents: int, tipo: str) -> WalletTransaction:
+    """Crédito atômico (sem commit: o chamador fecha a transação)."""
+    if cents <= 0:
+        raise ValueError("Valor inválido")
+    return _lancar(db, user_id, cents, tipo)
+
+
+def debit(db: Session, user_id: int, cents: int, tipo: str) -> WalletTransaction:
+    """Débito atômico; SaldoInsuficiente se o UPDATE condicional não casar."""
+    if cents <= 0:
         raise ValueError("Valor inválido")
+    return _lancar(db, user_id, -cents, tipo)
+
+
+def deposit(db: Session, user_id: int, amount: float) -> WalletTransaction:
+    cents = to_cents(amount)
+    try:
+        tx = credit(db, user_id, cents, "deposit")
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    db.refresh(tx)
+    return tx
+
+
+def get_balance_cents(db: Session, user_id: int) -> int:
+    balance = db.execute(
+        select(wallets.c.balance_cents).where(wallets.c.user_id == user_id)
+    ).scalar()
+    return balance or 0
 
-    user = db.query(User).filter(User.id == user_id).first()
 
-    if not user:
-        raise ValueError("Usuário não encontrado")
+def reconcile(db: Session, user_id: int) -> dict:
+    """
+    Confere o saldo materializado contra o ledger: último snapshot +
+    lançamentos posteriores a ele (não relê o histórico inteiro).
+    """
+    snap = db.execute(
+        select(snapshots.c.balance_cents, snapshots.c.last_tx_id)
+        .where(snapshots.c.user_id == user_id)
+        .order_by(snapshots.c.last_tx_id.desc())
+        .limit(1)
+    ).first()
+    base, desde = (snap.balance_cents, snap.last_tx_id) if snap else (0, 0)
 
-    user.balance += amount
-    db.commit()
-    db.refresh(user)
+    tx = WalletTransaction.__table__
+    delta = db.execute(
+        select(func.coalesce(func.sum(tx.c.amount_cents), 0))
+        .where(tx.c.user_id == user_id, tx.c.id > desde)
+    ).scalar()
 
-    return user
+    ledger = base + delta
+    saldo = get_balance_cents(db, user_id)
+    return {
+        "user_id": user_id,
+        "snapshot_cents": base,
+        "snapshot_last_tx_id": desde,
+        "ledger_cents": ledger,
+        "balance_cents": saldo,
+        "ok": ledger == saldo,
+    }
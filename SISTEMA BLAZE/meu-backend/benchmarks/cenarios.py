@@ -0,0 +1,274 @@
+"""
+Cenários repetíveis contra a API (HTTP real, servidor local).
+
+Cada cenário devolve um dict de números comparáveis com a baseline:
+latências em ms (p50/p95/p99/max) e vazão em requisições por segundo.
+"""
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+import requests
+
+INGEST_HEADERS = {"X-Ingest-Token": os.getenv("INGEST_TOKEN")} if os.getenv("INGEST_TOKEN") else {}
+
+
+def resumo(latencias: List[float], duracao: float, erros: int = 0) -> Dict[str, float]:
+    if not latencias:
+        return {"n": 0, "erros": erros}
+    ordenadas = sorted(latencias)
+
+    def pct(p):
+        return round(ordenadas[min(len(ordenadas) - 1, int(p * len(ordenadas)))] * 1000, 3)
+
+    return {
+        "n": len(ordenadas),
+        "erros": erros,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": round(ordenadas[-1] * 1000, 3),
+        "media_ms": round(statistics.mean(ordenadas) * 1000, 3),
+        "rps": round(len(ordenadas) / duracao, 1) if duracao > 0 else 0.0,
+    }
+
+
+def _carga(fn: Callable[[requests.Session], None], total: int, concorrencia: int) -> Dict[str, float]:
+    latencias: List[float] = []
+    erros = 0
+    lock = threading.Lock()
+    restantes = [total]
+
+    def worker():
+        nonlocal erros
+        session = requests.Session()
+        while True:
+            with lock:
+                if restantes[0] <= 0:
+                    return
+                restantes[0] -= 1
+            t0 = time.perf_counter()
+            try:
+                fn(session)
+                dt = time.perf_counter() - t0
+                with lock:
+                    latencias.append(dt)
+            except Exception:
+                with lock:
+                    erros += 1
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as pool:
+        for _ in range(concorrencia):
+            pool.submit(worker)
+    return resumo(latencias, time.perf_counter() - inicio, erros)
+
+
+# =========================
+#  INGESTÃO
+# =========================
+
+def ingest(base_url: str, total: int = 2000, concorrencia: int = 1) -> Dict[str, float]:
+    """POST /update_status com sinais WIN/LOSS (exercita o caminho de escrita no banco)."""
+    url = f"{base_url}/update_status"
+    contador = [0]
+    lock = threading.Lock()
+
+    def enviar(session):
+        with lock:
+            contador[0] += 1
+            i = contador[0]
+        agora = time.time()
+        session.post(url, json={
+            "numero": i % 15,
+            "cor": "red",
+            "hora": datetime.now().strftime("%H:%M"),
+            "mensagem": "WIN" if i % 3 else "LOSS",
+            "detectado_em": agora,
+            "enviado_em": agora,
+        }, headers=INGEST_HEADERS, timeout=30).raise_for_status()
+
+    return _carga(enviar, total, concorrencia)
+
+
+def ingest_sob_flood_analitico(base_url: str, total: int = 500, flood: int = 16) -> Dict[str, float]:
+    """
+    Ingestão serial enquanto `flood` clientes martelam relatórios pesados
+    (relatório 30 dias e histórico de 365 dias). Mede a latência do sinal ao
+    vivo; recusas 429/503 dos analíticos são esperadas e só contadas.
+    """
+    parar = threading.Event()
+    contagem = {"ok": 0, "recusados": 0, "erros": 0}
+    lock = threading.Lock()
+    payload_365 = {
+        "data_inicio": (datetime.now() - timedelta(days=365)).strftime("%Y-%m-%d"),
+        "hora_inicio": "14:00",
+        "hora_fim": "14:59",
+    }
+
+    def martelar(i: int):
+        session = requests.Session()
+        while not parar.is_set():
+            try:
+                if i % 2:
+                    r = session.get(f"{base_url}/relatorio/30-dias", timeout=60)
+                else:
+                    r = session.post(f"{base_url}/historico/filtrado", json=payload_365, timeout=60)
+                chave = "ok" if r.ok else "recusados" if r.status_code in (429, 503) else "erros"
+            except Exception:
+                chave = "erros"
+            with lock:
+                contagem[chave] += 1
+
+    threads = [threading.Thread(target=martelar, args=(i,), daemon=True) for i in range(flood)]
+    for t in threads:
+        t.start()
+    time.sleep(1.0)
+    try:
+        resultado = ingest(base_url, total, 1)
+    finally:
+        parar.set()
+        for t in threads:
+            t.join(timeout=120)
+
+    resultado.update({f"analiticos_{k}": v for k, v in contagem.items()})
+    return resultado
+
+
+# =========================
+#  LEITURAS AO VIVO
+# =========================
+
+def leitores_status(base_url: str, total: int = 5000, concorrencia: int = 16) -> Dict[str, float]:
+    url = f"{base_url}/events/status"
+
+    def ler(session):
+        session.get(url, timeout=30).raise_for_status()
+
+    return _carga(ler, total, concorrencia)
+
+
+def leitores_status_since(base_url: str, total: int = 5000, concorrencia: int = 16) -> Dict[str, float]:
+    """Polling incremental: cada sessão guarda o último seq e pede só o que veio depois."""
+    url = f"{base_url}/events/status"
+    bytes_lidos = [0]
+    lock = threading.Lock()
+
+    def ler(session):
+        r = session.get(url, params={"since": getattr(session, "seq", 0)}, timeout=30)
+        r.raise_for_status()
+        session.seq = r.json()["seq"]
+        with lock:
+            bytes_lidos[0] += len(r.content)
+
+    resultado = _carga(ler, total, concorrencia)
+    resultado["bytes_medio"] = round(bytes_lidos[0] / max(1, resultado["n"]))
+    return resultado
+
+
+# =========================
+#  ANALÍTICOS
+# =========================
+
+def historico_filtrado(base_url: str, dias: int, repeticoes: int = 5) -> Dict[str, float]:
+    """
+    POST /historico/filtrado nos últimos `dias` dias, janela de 1h
+    (sem a janela, 365 dias devolveriam a base inteira em um JSON).
+    """
+    url = f"{base_url}/historico/filtrado"
+    payload = {
+        "data_inicio": (datetime.now() - timedelta(days=dias)).strftime("%Y-%m-%d"),
+        "hora_inicio": "14:00",
+        "hora_fim": "14:59",
+    }
+
+    def consultar(session):
+        session.post(url, json=payload, timeout=300).raise_for_status()
+
+    return _carga(consultar, repeticoes, 1)
+
+
+def estatisticas_por_horario(base_url: str, dias: int, repeticoes: int = 5) -> Dict[str, float]:
+    url = f"{base_url}/estatisticas/por-horario"
+
+    def consultar(session):
+        session.get(url, params={"dias": dias}, timeout=300).raise_for_status()
+
+    return _carga(consultar, repeticoes, 1)
+
+
+def melhores_horarios(base_url: str, dias: int, repeticoes: int = 5) -> Dict[str, float]:
+    url = f"{base_url}/analise/melhores-horarios"
+
+    def consultar(session):
+        session.get(url, params={"dias": dias}, timeout=300).raise_for_status()
+
+    return _carga(consultar, repeticoes, 1)
+
+
+def relatorio_30_dias(base_url: str, repeticoes: int = 5) -> Dict[str, float]:
+    url = f"{base_url}/relatorio/30-dias"
+
+    def consultar(session):
+        session.get(url, timeout=300).raise_for_status()
+
+    return _carga(consultar, repeticoes, 1)
+
+
+def _dashboard_filtros():
+    inicio = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
+    return [
+        {"data_inicio": inicio, "hora_inicio": "14:00", "hora_fim": "14:59"},
+        {"data_inicio": inicio, "hora_inicio": "20:00", "hora_fim": "22:59", "tipo_resultado": "loss"},
+    ]
+
+
+def dashboard_separado(base_url: str, repeticoes: int = 5) -> Dict[str, float]:
+    """Carga do dashboard como hoje: uma requisição (e uma varredura) por painel."""
+    def carregar(session):
+        for rota in ("/estatisticas/por-horario", "/analise/melhores-horarios"):
+            session.get(f"{base_url}{rota}", params={"dias": 30}, timeout=300).raise_for_status()
+        session.get(f"{base_url}/relatorio/30-dias", timeout=300).raise_for_status()
+        for filtro in _dashboard_filtros():
+            session.post(f"{base_url}/historico/filtrado", params={"fields": "resultado"}, json=filtro, timeout=300).raise_for_status()
+
+    return _carga(carregar, repeticoes, 1)
+
+
+def dashboard_lote(base_url: str, repeticoes: int = 5) -> Dict[str, float]:
+    """Os mesmos painéis num POST /analise/lote (uma varredura)."""
+    consultas = [
+        {"nome": "por_hora", "dias": 30, "agrupar_por": "hora"},
+        {"nome": "melhores", "dias": 30, "agrupar_por": "hora", "min_total": 5, "ordenar": ["losses", "-taxa_acerto"]},
+        {"nome": "resumo", "dias": 30},
+    ] + [{"nome": f"filtro_{i}", **f} for i, f in enumerate(_dashboard_filtros())]
+
+    def carregar(session):
+        session.post(f"{base_url}/analise/lote", json={"consultas": consultas}, timeout=300).raise_for_status()
+
+    return _carga(carregar, repeticoes, 1)
+
+
+def todos_os_cenarios(rapido: bool = False) -> Dict[str, Callable[[str], Dict[str, float]]]:
+    """Nome -> função(base_url). Ordem importa: leituras analíticas antes da ingestão."""
+    rep = 2 if rapido else 5
+    cenarios: Dict[str, Callable[[str], Dict[str, float]]] = {}
+
+    for dias in (30, 90, 365):
+        cenarios[f"historico_filtrado_{dias}d"] = lambda u, d=dias: historico_filtrado(u, d, rep)
+        cenarios[f"estatisticas_por_horario_{dias}d"] = lambda u, d=dias: estatisticas_por_horario(u, d, rep)
+        cenarios[f"melhores_horarios_{dias}d"] = lambda u, d=dias: melhores_horarios(u, d, rep)
+    cenarios["relatorio_30_dias"] = lambda u: relatorio_30_dias(u, rep)
+    cenarios["dashboard_separado"] = lambda u: dashboard_separado(u, rep)
+    cenarios["dashboard_lote"] = lambda u: dashboard_lote(u, rep)
+
+    cenarios["leitores_status_16"] = lambda u: leitores_status(u, 1000 if rapido else 5000, 16)
+    cenarios["leitores_status_since_16"] = lambda u: leitores_status_since(u, 1000 if rapido else 5000, 16)
+    cenarios["ingest_serial"] = lambda u: ingest(u, 200 if rapido else 2000, 1)
+    cenarios["ingest_concorrente_8"] = lambda u: ingest(u, 400 if rapido else 4000, 8)
+    cenarios["ingest_sob_flood_analitico"] = lambda u: ingest_sob_flood_analitico(u, 200 if rapido else 500, 16)
+    return cenarios
@@ -0,0 +1,72 @@
+"""
+Compara um resultado de benchmark com a baseline salva.
+
+Latências (p50/p95/p99) piorando ou vazão (rps) caindo além da tolerância
+contam como regressão.
+"""
+import json
+from typing import Dict, List, Tuple
+
+# métrica -> True se "maior é pior"
+METRICAS = {
+    "p50_ms": True,
+    "p95_ms": True,
+    "p99_ms": True,
+    "rps": False,
+}
+
+
+def carregar(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def salvar(path: str, dados: dict) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def comparar(baseline: dict, atual: dict, tolerancia: float = 0.20) -> Tuple[List[dict], List[dict]]:
+    """Retorna (linhas do relatório, regressões)."""
+    linhas = []
+    regressoes = []
+    base_cen: Dict[str, dict] = baseline.get("cenarios", {})
+
+    for nome, atual_m in sorted(atual.get("cenarios", {}).items()):
+        base_m = base_cen.get(nome)
+        if not base_m:
+            linhas.append({"cenario": nome, "metrica": "-", "baseline": None, "atual": None, "delta_pct": None, "status": "novo"})
+            continue
+
+        for metrica, maior_pior in METRICAS.items():
+            b = base_m.get(metrica)
+            a = atual_m.get(metrica)
+            if b in (None, 0) or a is None:
+                continue
+            delta = (a - b) / b
+            piorou = delta > tolerancia if maior_pior else delta < -tolerancia
+            melhorou = delta < -tolerancia if maior_pior else delta > tolerancia
+            linha = {
+                "cenario": nome,
+                "metrica": metrica,
+                "baseline": b,
+                "atual": a,
+                "delta_pct": round(delta * 100, 1),
+                "status": "REGRESSÃO" if piorou else ("melhora" if melhorou else "ok"),
+            }
+            linhas.append(linha)
+            if piorou:
+                regressoes.append(linha)
+
+    return linhas, regressoes
+
+
+def formatar(linhas: List[dict]) -> str:
+    out = [f"{'cenário':<34} {'métrica':<8} {'baseline':>12} {'atual':>12} {'delta':>8}  status"]
+    for ln in linhas:
+        delta = "" if ln["delta_pct"] is None else f"{ln['delta_pct']:+.1f}%"
+        base = "" if ln["baseline"] is None else f"{ln['baseline']:.3f}"
+        atual = "" if ln["atual"] is None else f"{ln['atual']:.3f}"
+        out.append(f"{ln['cenario']:<34} {ln['metrica']:<8} {base:>12} {atual:>12} {delta:>8}  {ln['status']}")
+    return "\n".join(out)
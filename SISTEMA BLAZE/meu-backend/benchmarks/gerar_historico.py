@@ -0,0 +1,100 @@
+"""
+Gera uma base sintética de historico_resultados para os benchmarks.
+
+As rodadas seguem a distribuição real do Double (números 0-14 uniformes,
+cor via cor_do_numero) em cadência fixa; o resultado do sinal simula
+entrada na cor alvo com 1 gale (WIN se a cor sair na rodada ou na seguinte).
+"""
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, insert
+
+from app.models.historico import HistoricoResultado
+from app.core.game import cor_do_numero
+
+historico = HistoricoResultado.__table__
+COLUNAS = ("numero", "cor", "hora", "mensagem", "timestamp_recebimento", "data_hora_real", "resultado")
+
+
+def gerar_historico(
+    database_url: str,
+    linhas: int = 1_000_000,
+    dias: int = 365,
+    cor_alvo: str = "red",
+    seed: int = 42,
+    lote: int = 50_000,
+) -> dict:
+    """
+    Recria historico_resultados em database_url (SQLite ou PostgreSQL) com
+    `linhas` rodadas espalhadas pelos últimos `dias` dias. Os índices do
+    modelo são criados depois da carga.
+    """
+    rng = random.Random(seed)
+    fim = datetime.now().replace(microsecond=0)
+    inicio = fim - timedelta(days=dias)
+    passo = (fim - inicio).total_seconds() / max(linhas, 1)
+
+    engine = create_engine(database_url)
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def _carga_rapida(dbapi_conn, _record):
+            dbapi_conn.execute("PRAGMA synchronous = OFF")
+
+    historico.drop(engine, checkfirst=True)
+    historico.create(engine)
+    # carga sem índices (bem mais rápida); recriados no fim
+    for indice in historico.indexes:
+        indice.drop(engine)
+
+    t0 = time.perf_counter()
+    wins = 0
+    buf = []
+    proxima_cor = cor_do_numero(rng.randint(0, 14))
+
+    for i in range(linhas):
+        numero = rng.randint(0, 14)
+        cor = cor_do_numero(numero)
+        cor_gale, proxima_cor = proxima_cor, cor_do_numero(rng.randint(0, 14))
+
+        win = cor == cor_alvo or cor_gale == cor_alvo
+        wins += win
+        resultado = "WIN" if win else "LOSS"
+
+        ts = inicio.timestamp() + i * passo
+        dt = datetime.fromtimestamp(ts)
+        buf.append((
+            numero,
+            cor,
+            dt.strftime("%H:%M"),
+            f"{resultado} {cor_alvo.upper()}",
+            ts,
+            dt.strftime("%Y-%m-%d %H:%M:%S"),
+            resultado,
+        ))
+
+        if len(buf) >= lote:
+            _inserir(engine, buf)
+            buf = []
+
+    if buf:
+        _inserir(engine, buf)
+
+    for indice in historico.indexes:
+        indice.create(engine)
+    engine.dispose()
+
+    return {
+        "database_url": engine.url.render_as_string(hide_password=True),
+        "linhas": linhas,
+        "dias": dias,
+        "wins": wins,
+        "losses": linhas - wins,
+        "segundos": round(time.perf_counter() - t0, 2),
+    }
+
+
+def _inserir(engine, rows):
+    with engine.begin() as conn:
+        conn.execute(insert(historico), [dict(zip(COLUNAS, r)) for r in rows])
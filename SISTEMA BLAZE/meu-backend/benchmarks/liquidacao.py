@@ -0,0 +1,127 @@
+"""
+Liquidação set-based de um evento com apostas sintéticas (padrão: 100k).
+
+    python -m benchmarks liquidacao --apostas 100000 --usuarios 5000
+
+Monta uma base SQLite temporária com usuários, carteiras e apostas nas três
+cores, liquida o evento com resolve_event e confere o resultado contra o
+esperado: saldo de cada carteira, um lançamento 'win' por aposta vencedora,
+saldo final do ledger batendo com a carteira e snapshots coerentes. Sai com
+código 1 se algo não bater.
+"""
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.core.game import PAGAMENTOS
+from app.models import Bet, Event, User, Wallet, WalletSnapshot, WalletTransaction
+from app.services.event_service import resolve_event
+from app.services.wallet_service import reconcile
+
+
+COR_SORTEADA = "red"
+
+
+def _popular(engine, apostas: int, usuarios: int, seed: int):
+    rng = random.Random(seed)
+    saldo_inicial = 1_000_00
+    esperado = {uid: saldo_inicial for uid in range(1, usuarios + 1)}
+    agora = datetime.utcnow()
+
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {"id": uid, "username": f"u{uid}", "password": "x", "is_admin": False}
+            for uid in esperado
+        ])
+        conn.execute(insert(Wallet.__table__), [
+            {"user_id": uid, "balance_cents": saldo_inicial, "tx_since_snapshot": 0}
+            for uid in esperado
+        ])
+        conn.execute(insert(Event.__table__), [{"id": 1, "status": "open"}])
+
+        linhas = []
+        vencedoras = 0
+        for i in range(1, apostas + 1):
+            uid = rng.randint(1, usuarios)
+            cents = rng.randint(1, 50) * 100
+            cor = rng.choice(("red", "black", "white"))
+            retorno = cents * PAGAMENTOS[cor]
+            linhas.append({
+                "id": i,
+                "user_id": uid,
+                "event_id": 1,
+                "amount_cents": cents,
+                "possible_return_cents": retorno,
+                "color": cor,
+            })
+            if cor == COR_SORTEADA:
+                esperado[uid] += retorno
+                vencedoras += 1
+        conn.execute(insert(Bet.__table__), linhas)
+
+        # ledger inicial coerente com o saldo (um depósito por usuário)
+        conn.execute(insert(WalletTransaction.__table__), [
+            {"user_id": uid, "amount_cents": saldo_inicial, "balance_after_cents": saldo_inicial,
+             "type": "deposit", "created_at": agora}
+            for uid in range(1, usuarios + 1)
+        ])
+
+    return esperado, vencedoras
+
+
+def liquidacao(apostas: int = 100_000, usuarios: int = 5_000, seed: int = 7) -> dict:
+    fd, db_file = tempfile.mkstemp(suffix=".db", prefix="liquidacao_")
+    os.close(fd)
+    engine = create_engine(f"sqlite:///{db_file}")
+    try:
+        Base.metadata.create_all(engine)
+
+        t0 = time.perf_counter()
+        esperado, vencedoras = _popular(engine, apostas, usuarios, seed)
+        preparo = time.perf_counter() - t0
+
+        Session = sessionmaker(bind=engine)
+        with Session() as db:
+            relatorio = resolve_event(db, db.get(Event, 1), COR_SORTEADA)
+
+            saldos = dict(db.execute(select(Wallet.user_id, Wallet.balance_cents)).all())
+            wins = db.execute(
+                select(func.count()).where(WalletTransaction.type == "win")
+            ).scalar()
+            ultimo_saldo = dict(db.execute(
+                select(WalletTransaction.user_id, WalletTransaction.balance_after_cents)
+                .where(WalletTransaction.id.in_(
+                    select(func.max(WalletTransaction.id)).group_by(WalletTransaction.user_id)
+                ))
+            ).all())
+            snapshots = db.execute(select(func.count()).select_from(WalletSnapshot)).scalar()
+            amostra = [reconcile(db, uid) for uid in range(1, min(usuarios, 50) + 1)]
+
+        falhas = []
+        if saldos != esperado:
+            falhas.append("saldo das carteiras diverge do esperado")
+        if wins != vencedoras:
+            falhas.append(f"{wins} lançamentos 'win' para {vencedoras} apostas vencedoras")
+        if any(ultimo_saldo.get(uid, saldos[uid]) != saldo for uid, saldo in saldos.items()):
+            falhas.append("balance_after_cents do último lançamento difere da carteira")
+        if not all(r["ok"] for r in amostra):
+            falhas.append("reconcile falhou na amostra")
+
+        return {
+            "apostas": apostas,
+            "usuarios": usuarios,
+            "vencedoras": vencedoras,
+            "preparo_s": round(preparo, 2),
+            "liquidacao": relatorio,
+            "snapshots": snapshots,
+            "falhas": falhas,
+        }
+    finally:
+        engine.dispose()
+        os.remove(db_file)
@@ -1,5 +1,13 @@
 #!/bin/bash
 
-python -u -m app.services.scraper &
+# junta bancos antigos no DATABASE_URL (idempotente)
+python -m app.migrar_bancos
 
-uvicorn app.main:app --host 0.0.0.0 --port 8000
+# SCRAPER_EMBUTIDO=True: o scraper roda como thread dentro da API (sem o
+# segundo processo nem o POST por localhost)
+if [ "${SCRAPER_EMBUTIDO:-False}" != "True" ]; then
+    python -u -m app.services.scraper &
+fi
+
+# IP real do cliente atrás do proxy (limites por IP da admissão)
+uvicorn app.main:app --host 0.0.0.0 --port 8000 --proxy-headers --forwarded-allow-ips='*'